@@ -5,8 +5,20 @@ from flask import Flask
 def create_app():
     app = Flask(__name__)
 
+    # Kompaktes JSON (orjson, falls installiert) für alle jsonify-Antworten
+    from .wire import JSONProvider
+    app.json = JSONProvider(app)
+
     # Blueprints oder einfache Routen importieren
     from .routes import routes
     app.register_blueprint(routes)
 
+    # Pro Request eine Verbindung aus dem Pool, am Ende zurückgeben
+    from . import database
+    database.init_app(app)
+
+    # Latenz/In-Flight pro Route für /metrics
+    from . import metrics
+    metrics.init_app(app)
+
     return app
\ No newline at end of file
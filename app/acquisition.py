@@ -0,0 +1,186 @@
+# app/acquisition.py
+#
+# Messplan für die Sensoren: jeder Sensor hat eine eigene Abtastperiode und
+# eine Deadline auf der monotonen Uhr. Fällige Sensoren werden nach
+# Multiplexer-Kanal sortiert gelesen, sodass jeder Kanal pro Zyklus nur
+# einmal angewählt wird. Die nächste Deadline ergibt sich aus der alten plus
+# Periode – die Lesedauer verschiebt den Takt also nicht. Wird eine Deadline
+# verpasst, zählt das als Overrun und der Takt springt auf den nächsten Slot.
+#
+# Sensoren mit langer Wandlungszeit (z.B. SCD4x Single-Shot, 5 s) werden
+# zweiphasig gelesen: zur Deadline stößt task.start() die Messung an, erst
+# nach `conversion` Sekunden holt task.read() sie ab – dazwischen laufen die
+# übrigen Sensoren normal weiter, statt auf den langsamsten zu warten.
+
+import threading
+import time
+
+
+class SensorStats:
+    """Lesedauer, Verspätung und Fehler eines Sensors."""
+
+    __slots__ = ("reads", "errors", "overruns", "latency_last", "latency_max",
+                 "latency_total", "lateness_max", "lateness_total")
+
+    def __init__(self):
+        self.reads = self.errors = self.overruns = 0
+        self.latency_last = self.latency_max = self.latency_total = 0.0
+        self.lateness_max = self.lateness_total = 0.0
+
+    def as_dict(self):
+        samples = max(self.reads + self.errors, 1)
+        return {
+            "reads": self.reads,
+            "errors": self.errors,
+            "overruns": self.overruns,
+            "latency_last_ms": round(self.latency_last * 1000, 3),
+            "latency_avg_ms": round(self.latency_total / samples * 1000, 3),
+            "latency_max_ms": round(self.latency_max * 1000, 3),
+            "lateness_avg_ms": round(self.lateness_total / samples * 1000, 3),
+            "lateness_max_ms": round(self.lateness_max * 1000, 3),
+        }
+
+
+class Task:
+    __slots__ = ("key", "channel", "period", "read", "start", "conversion", "next_due", "fetch_due", "stats")
+
+    def __init__(self, key, channel, period, read, next_due, start=None, conversion=0.0):
+        self.key = key
+        self.channel = channel
+        self.period = period
+        self.read = read
+        self.start = start            # None = einphasig (read() misst und liest)
+        self.conversion = conversion  # Sekunden zwischen start() und read()
+        self.next_due = next_due
+        self.fetch_due = None         # gesetzt, solange eine Messung läuft
+        self.stats = SensorStats()
+
+    @property
+    def due(self):
+        return self.next_due if self.fetch_due is None else self.fetch_due
+
+
+class Scheduler:
+    """Deadline-basierter Messplan.
+
+    select_channel(channel) schaltet den Multiplexer, task.read() liefert die
+    Messwerte oder wirft. on_sample(key, ts_ms, values) wird pro Messwert,
+    on_cycle({key: (ts_ms, values)}) einmal pro Zyklus aufgerufen.
+    """
+
+    def __init__(self, select_channel, on_sample, on_cycle=None, clock=time.monotonic):
+        self._select_channel = select_channel
+        self._on_sample = on_sample
+        self._on_cycle = on_cycle
+        self._clock = clock
+        self._channel = None   # aktuell angewählter Mux-Kanal
+        self._stop = threading.Event()
+        self.tasks = []
+        self.cycles = 0
+        self.mux_selects = 0
+        self.callback_errors = 0   # fehlgeschlagene on_sample/on_cycle-Aufrufe
+
+    def add(self, key, channel, period, read, start=None, conversion=0.0):
+        self.tasks.append(Task(key, channel, period, read, self._clock(), start, conversion))
+
+    def clear(self):
+        self.tasks = []
+        self._channel = None
+
+    def _select(self, channel):
+        if channel is None or channel == self._channel:
+            return
+        self._channel = None
+        self._select_channel(channel)
+        self._channel = channel
+        self.mux_selects += 1
+
+    def run_cycle(self):
+        """Alle fälligen Sensoren lesen; gibt die Wartezeit bis zur nächsten Deadline zurück."""
+        now = self._clock()
+        due = [task for task in self.tasks if task.due <= now]
+        if not due:
+            return min((task.due for task in self.tasks), default=now + 1.0) - now
+
+        samples = {}
+        # Nach Kanal gruppieren: jeder Mux-Kanal wird nur einmal angewählt
+        due.sort(key=lambda task: (task.channel != self._channel, task.channel, task.due))
+        for task in due:
+            stats = task.stats
+            started = self._clock()
+            if task.fetch_due is None:
+                # Verspätung zählt zur Deadline, bei zweiphasigen Sensoren also beim Anstoßen
+                lateness = started - task.next_due
+                stats.lateness_total += lateness
+                stats.lateness_max = max(stats.lateness_max, lateness)
+                if task.start is not None:
+                    try:
+                        self._select(task.channel)
+                        task.start()
+                    except Exception:
+                        self._channel = None
+                        stats.errors += 1
+                        self._advance(task, stats)
+                    else:
+                        task.fetch_due = self._clock() + task.conversion
+                    continue
+            task.fetch_due = None
+            try:
+                self._select(task.channel)
+                values = task.read()
+            except Exception:
+                self._channel = None   # Mux-Zustand nach Busfehler unbekannt
+                values = None
+            latency = self._clock() - started
+            stats.latency_last = latency
+            stats.latency_total += latency
+            stats.latency_max = max(stats.latency_max, latency)
+            if values is None:
+                stats.errors += 1
+            else:
+                stats.reads += 1
+                ts_ms = time.time_ns() // 1_000_000
+                samples[task.key] = (ts_ms, values)
+                self._callback(self._on_sample, task.key, ts_ms, values)
+            self._advance(task, stats)
+
+        self.cycles += 1
+        if self._on_cycle and samples:
+            self._callback(self._on_cycle, samples)
+        return max(0.0, min(task.due for task in self.tasks) - self._clock())
+
+    def _callback(self, fn, *args):
+        """Fehler der Weiterverarbeitung zählen, der Messplan läuft weiter."""
+        try:
+            fn(*args)
+        except Exception as e:
+            self.callback_errors += 1
+            print(f"[ERROR] Messplan: {fn.__name__} fehlgeschlagen: {e!r}")
+
+    def _advance(self, task, stats):
+        # Nächste Deadline driftfrei aus der alten; verpasste Slots überspringen
+        task.next_due += task.period
+        now = self._clock()
+        if task.next_due <= now:
+            missed = int((now - task.next_due) // task.period) + 1
+            stats.overruns += missed
+            task.next_due += missed * task.period
+
+    def run(self):
+        """Bis stop() Zyklen fahren."""
+        self._stop.clear()
+        while not self._stop.is_set():
+            wait = self.run_cycle()
+            if wait > 0:
+                self._stop.wait(wait)
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {
+            "cycles": self.cycles,
+            "mux_selects": self.mux_selects,
+            "callback_errors": self.callback_errors,
+            "sensors": {task.key: {"period": task.period, **task.stats.as_dict()} for task in self.tasks},
+        }
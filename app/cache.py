@@ -0,0 +1,64 @@
+# app/cache.py
+#
+# Letzter Messwert pro Sensor im Speicher. Der Ingest-Pfad aktualisiert ihn
+# bei jedem Messwert, /data und /sensor/<id> lesen nur noch hier statt
+# aus SQLite.
+
+import os
+import threading
+import time
+from . import database
+
+
+class LatestCache:
+    """Prozessweiter Cache {sensor_id: {"timestamp": ms, "temp": ..., "hum": ..., ...}} mit Versionszähler."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self.version = 0
+        # Prozess-Kennung im ETag, damit ein Neustart keine falschen 304 erzeugt
+        self._tag = f"{os.getpid():x}.{time.time_ns() // 1_000_000:x}"
+
+    def update(self, sensor_id, timestamp, *values):
+        """Messwert (Werte in database.CHANNELS-Reihenfolge) übernehmen; ältere als der aktuelle werden ignoriert."""
+        sensor_id = str(sensor_id)
+        # Einträge werden nie verändert, nur ersetzt – Leser sehen immer einen vollständigen Wert
+        entry = database.entry(timestamp, values)
+        with self._lock:
+            current = self._values.get(sensor_id)
+            if current is not None and current["timestamp"] > timestamp:
+                return False
+            self._values[sensor_id] = entry
+            self.version += 1
+        return True
+
+    def snapshot(self):
+        """(version, {sensor_id: {...}}) als konsistenter Stand."""
+        with self._lock:
+            return self.version, dict(self._values)
+
+    def get(self, sensor_id):
+        return self._values.get(str(sensor_id))
+
+    def etag(self, version):
+        return f"{self._tag}.{version}"
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self.version += 1
+
+    def warm(self):
+        """Cache einmalig aus der Datenbank füllen (Start)."""
+        latest = database.get_latest_readings()
+        with self._lock:
+            for sensor_id, entry in latest.items():
+                current = self._values.get(sensor_id)
+                if current is None or current["timestamp"] < entry["timestamp"]:
+                    self._values[sensor_id] = entry
+            self.version += 1
+        print(f"[INFO] Latest-Cache: {len(latest)} Sensoren geladen")
+
+
+latest = LatestCache()
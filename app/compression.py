@@ -0,0 +1,225 @@
+# app/compression.py
+#
+# Optionale Kompression zwischen Erfassung und readings: gespeichert werden
+# nur Stützpunkte, aus denen sich die Reihe durch lineare Interpolation bis
+# auf eine Toleranz (~Sensorrauschen) pro Sensor und Kanal wiederherstellen
+# lässt.
+#
+#   deadband       – Stützpunkt, sobald ein Wert mehr als die Toleranz vom
+#                    zuletzt gespeicherten abweicht; davor ein Stützpunkt
+#                    mit dem alten Wert, damit die Linie bis zum Sprung flach
+#                    bleibt
+#   swinging_door  – Swinging-Door-Trending: Stützpunkt erst, wenn keine
+#                    Gerade vom letzten Stützpunkt mehr alle Werte seitdem
+#                    auf ±Toleranz trifft. Gespeichert wird der Punkt einer
+#                    solchen Geraden zum Zeitpunkt des letzten Werts, der
+#                    noch passte – nicht der Rohwert, der selbst bis zu einer
+#                    Toleranz daneben liegen darf
+#
+# In beiden Fällen weicht die lineare Interpolation der Stützpunkte um
+# höchstens die Toleranz von jedem Messwert ab (bench/bench_compression.py).
+#
+# Gespeichert wird zeilenweise: braucht ein Kanal einen Stützpunkt, kommt
+# die ganze Zeile in readings, und alle Kanäle setzen dort neu an. Spätestens
+# nach MAX_GAP wird eine Zeile geschrieben (Heartbeat) – größere Abstände
+# zwischen Stützpunkten sind also Ausfälle und werden beim Lesen nicht
+# überbrückt (reconstruct). Die Rollups rechnet ingest weiterhin aus jedem
+# Messwert; Mittelwerte, Min und Max in Buckets bleiben exakt.
+
+import math
+import os
+import numpy as np
+from . import database
+
+# --- Einstellungen ---
+METHOD = os.environ.get("INGEST_COMPRESSION", "off")   # "off", "deadband" oder "swinging_door"
+METHODS = {}               # Abweichend pro Sensor, z.B. {"CH1-0x77": "deadband"}
+TOLERANCES = {"temperature": 0.05, "humidity": 0.3, "pressure": 0.05, "co2": 10}   # ± in Kanal-Einheiten
+SENSOR_TOLERANCES = {}     # Pro Sensor und Kanal, z.B. {"CH0-0x76": {"humidity": 0.5}}
+MAX_GAP = 600_000          # ms; spätestens so oft ein Stützpunkt (Heartbeat)
+OUTAGE = 2 * MAX_GAP       # größere Abstände zwischen Stützpunkten = Sensor ausgefallen
+METHOD_NAMES = ("off", "deadband", "swinging_door")
+
+
+def check():
+    """Einstellungen prüfen (ingest.start), bevor der Writer-Thread daran scheitert."""
+    for name in (METHOD, *METHODS.values()):
+        if name not in METHOD_NAMES:
+            raise ValueError(f"Kompression: eines von {', '.join(METHOD_NAMES)}, nicht {name}")
+
+
+def enabled():
+    """True, wenn für mindestens einen Sensor komprimiert wird (readings enthält dann nur Stützpunkte)."""
+    return any(name != "off" for name in (METHOD, *METHODS.values()))
+
+
+def method(sensor_id):
+    name = METHODS.get(sensor_id, METHOD)
+    return None if name == "off" else name
+
+
+def tolerance(sensor_id, channel):
+    """Toleranz eines Kanals; Kanäle ohne Eintrag werden bei jeder Änderung gespeichert."""
+    return SENSOR_TOLERANCES.get(sensor_id, {}).get(channel, TOLERANCES.get(channel, 0.0))
+
+
+class _State:
+    """Letzter Stützpunkt, zurückgehaltene Zeile und Türwinkel eines Sensors."""
+
+    __slots__ = ("method", "tolerances", "anchor", "held", "upper", "lower")
+
+    def __init__(self, sensor_id, row):
+        self.method = method(sensor_id)
+        self.tolerances = [tolerance(sensor_id, channel) for channel in database.CHANNELS]
+        self.set_anchor(row)
+
+    def set_anchor(self, row):
+        self.anchor = row
+        self.held = None   # zuletzt gesehene, noch nicht gespeicherte Zeile
+        self.upper = [math.inf] * len(self.tolerances)
+        self.lower = [-math.inf] * len(self.tolerances)
+
+
+def _pairs(a, b):
+    """Kanalwerte zweier Zeilen (sensor_id, ts, *values) paarweise, kürzere mit None aufgefüllt."""
+    n = max(len(a), len(b)) - 2
+    return [
+        (a[i] if i < len(a) else None, b[i] if i < len(b) else None)
+        for i in range(2, 2 + n)
+    ]
+
+
+def _flat(state, row):
+    """row mit den Werten des letzten Stützpunkts (deadband: alle Werte seitdem liegen in dessen Band)."""
+    return (row[0], row[1], *(a for a, _ in _pairs(state.anchor, row)))
+
+
+def _on_line(state, row):
+    """row auf eine Gerade vom Stützpunkt aus, die alle Werte seitdem auf ±Toleranz trifft.
+
+    Pro Kanal die Steigung zum Rohwert, in die Türen [lower, upper] geklemmt.
+    """
+    dt = row[1] - state.anchor[1]
+    values = []
+    for i, (a, v) in enumerate(_pairs(state.anchor, row)):
+        if a is None or v is None or i >= len(state.upper):
+            values.append(v)
+            continue
+        slope = min(max((v - a) / dt, state.lower[i]), state.upper[i])
+        values.append(a + slope * dt)
+    return (row[0], row[1], *values)
+
+
+class Compressor:
+    """Zustand pro Sensor; nur aus einem Thread benutzen (ingest-Writer)."""
+
+    def __init__(self):
+        self._states = {}
+
+    def add(self, row):
+        """Messwert-Zeile (sensor_id, ts, *values) annehmen → Liste der zu speichernden Zeilen (0–2)."""
+        sensor_id, ts = row[0], row[1]
+        state = self._states.get(sensor_id)
+        if state is None or state.method is None or ts <= state.anchor[1]:
+            if state is None:
+                state = self._states[sensor_id] = _State(sensor_id, row)
+            state.set_anchor(row)
+            return [row]
+        if state.method == "deadband":
+            return self._deadband(state, row)
+        return self._swinging_door(state, row)
+
+    def _tolerance(self, state, i):
+        return state.tolerances[i] if i < len(state.tolerances) else 0.0
+
+    def _deadband(self, state, row):
+        exceeded = any(
+            (a is None) != (v is None) or (v is not None and abs(v - a) > self._tolerance(state, i))
+            for i, (a, v) in enumerate(_pairs(state.anchor, row))
+        )
+        if exceeded:
+            out = [_flat(state, state.held), row] if state.held is not None else [row]
+            state.set_anchor(row)
+            return out
+        if row[1] - state.anchor[1] >= MAX_GAP:
+            knot = _flat(state, row)   # Heartbeat, Linie bleibt auf dem gespeicherten Wert
+            state.set_anchor(knot)
+            return [knot]
+        state.held = row
+        return []
+
+    def _door_open(self, state, row):
+        """Türen vom Stützpunkt um row enger stellen; False (Türen unverändert), sobald ein Kanal keine Gerade mehr hat."""
+        dt = row[1] - state.anchor[1]
+        upper, lower = list(state.upper), list(state.lower)
+        for i, (a, v) in enumerate(_pairs(state.anchor, row)):
+            if a is None or v is None:
+                if (a is None) != (v is None):   # Kanal fällt aus bzw. kommt zurück
+                    return False
+                continue
+            if i >= len(upper):
+                upper.append(math.inf)
+                lower.append(-math.inf)
+            e = self._tolerance(state, i)
+            upper[i] = min(upper[i], (v + e - a) / dt)
+            lower[i] = max(lower[i], (v - e - a) / dt)
+            if lower[i] > upper[i]:
+                return False
+        state.upper, state.lower = upper, lower
+        return True
+
+    def _swinging_door(self, state, row):
+        if self._door_open(state, row):
+            if row[1] - state.anchor[1] < MAX_GAP:
+                state.held = row
+                return []
+            knot = _on_line(state, row)   # Heartbeat
+            state.set_anchor(knot)
+            return [knot]
+        held = state.held
+        if held is None:
+            # Kanal fällt direkt nach dem Stützpunkt aus bzw. kommt zurück: Rohwert speichern
+            state.set_anchor(row)
+            return [row]
+        # Zum Zeitpunkt des letzten passenden Werts auf eine Gerade innerhalb der Türen; row setzt dort neu an
+        knot = _on_line(state, held)
+        state.set_anchor(knot)
+        if self._door_open(state, row):
+            state.held = row
+            return [knot]
+        state.set_anchor(row)
+        return [knot, row]
+
+    def flush(self):
+        """Zurückgehaltene Zeilen aller Sensoren (z.B. beim Beenden), danach setzen alle dort neu an."""
+        out = []
+        for state in self._states.values():
+            if state.held is not None:
+                knot = _flat(state, state.held) if state.method == "deadband" else _on_line(state, state.held)
+                out.append(knot)
+                state.set_anchor(knot)
+        return out
+
+    def reset(self):
+        self._states.clear()
+
+
+# --- Lesen ---
+def reconstruct(ts, values, start, end, outage=OUTAGE):
+    """Stützpunkte eines Sensors (inkl. je eines Punkts vor/nach dem Fenster) → Reihe in [start, end).
+
+    An start und end - 1 wird linear interpoliert, damit ein Fenster, das
+    mitten zwischen zwei Stützpunkten beginnt oder endet, nicht leer bzw. zu
+    kurz bleibt. Über Ausfälle (> outage) wird nicht interpoliert; zwischen
+    den Stützpunkten zeichnen die Charts ohnehin Geraden.
+    """
+    inside = (ts >= start) & (ts < end)
+    parts = [(ts[inside], values[inside])]
+    for edge, position in ((start, 0), (end - 1, 1)):
+        i = int(np.searchsorted(ts, edge, side="right"))   # erster Punkt hinter edge
+        if i == 0 or i == ts.size or ts[i - 1] == edge or ts[i] - ts[i - 1] > outage:
+            continue
+        w = (edge - ts[i - 1]) / (ts[i] - ts[i - 1])
+        point = values[i - 1] + w * (values[i] - values[i - 1])
+        parts.insert(position * len(parts), (np.array([edge], dtype=np.int64), point[None, :]))
+    return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
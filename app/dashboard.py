@@ -44,13 +44,19 @@ def init_db():
                         pressure REAL
                         )''')
 
+CLEANUP_INTERVAL = 3600  # Sekunden; Aufräumen nicht mehr bei jedem Insert
+_last_cleanup = -CLEANUP_INTERVAL   # erster Insert räumt auf, auch kurz nach dem Booten (monotonic ~ 0)
+
 def cleanup_old_data():
     cutoff = datetime.now() - timedelta(days=40)
     with sqlite3.connect(DB_FILE) as conn:
         conn.execute("DELETE FROM readings WHERE timestamp < ?", (cutoff,))
 
 def store_reading(sensor_name, data):
-    cleanup_old_data()
+    global _last_cleanup
+    if time.monotonic() - _last_cleanup > CLEANUP_INTERVAL:
+        _last_cleanup = time.monotonic()
+        cleanup_old_data()
     ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     with sqlite3.connect(DB_FILE) as conn:
         conn.execute("INSERT INTO readings VALUES (?,?,?,?,?)",
@@ -1,109 +1,472 @@
 # app/database.py
 
+import re
 import sqlite3
-import io
-import csv
-from flask import send_file
+import threading
+import time
+from contextlib import contextmanager
+from flask import Response, g, has_app_context
 from datetime import datetime
-from . import config
+from . import config, metrics
+
+# --- Einstellungen ---
+POOL_SIZE = 8              # Max. gleichzeitig offene Verbindungen
+POOL_TIMEOUT = 10.0        # Sekunden warten auf eine freie Verbindung, danach 503
+STREAM_SLOTS = 4           # Gleichzeitige Streaming-Exporte (eigene Verbindungen außerhalb des Pools)
+BUSY_TIMEOUT = 5.0         # Sekunden warten, wenn die DB gesperrt ist
+STATEMENT_CACHE = 256      # Prepared Statements pro Verbindung
+PRAGMAS = (
+    ("synchronous", "NORMAL"),         # bei WAL sicher, spart fsyncs
+    ("cache_size", -8000),             # 8 MiB Page-Cache
+    ("mmap_size", 64 * 1024 * 1024),   # 64 MiB memory-mapped I/O
+    ("temp_store", "MEMORY"),
+)
+CHANNELS = ("temperature", "humidity")   # Messkanäle = REAL-Spalten in readings (siehe load_channels)
+CHANNEL_KEYS = {"temperature": "temp", "humidity": "hum"}   # Kurznamen in JSON/Events; sonst der Kanalname
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+# ts (Epoch-ms, UTC) als lokale Zeit "YYYY-MM-DD HH:MM:SS", direkt in SQLite formatiert
+TS_TEXT = "strftime('%Y-%m-%d %H:%M:%S', ts / 1000, 'unixepoch', 'localtime')"
+
+# --- Verbindungen ---
+def connect():
+    """Neue Verbindung im WAL-Modus mit abgestimmten Pragmas."""
+    conn = sqlite3.connect(
+        config.DB_FILE,
+        timeout=BUSY_TIMEOUT,
+        check_same_thread=False,   # Verbindungen wandern über den Pool zwischen Threads
+        cached_statements=STATEMENT_CACHE,
+    )
+    # Muss vor WAL stehen und wirkt nur auf neue DB-Dateien;
+    # bestehende stellt retention.enable_incremental_vacuum() um
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("PRAGMA journal_mode=WAL")
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+class PoolTimeout(Exception):
+    """Keine Verbindung frei (→ 503 über init_app)."""
+
+
+class ConnectionPool:
+    """Kleiner Pool langlebiger Verbindungen, geteilt von Requests und Hintergrund-Threads."""
+
+    def __init__(self, size):
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=POOL_TIMEOUT):
+        if not self._slots.acquire(timeout=timeout):
+            raise PoolTimeout(f"keine DB-Verbindung frei nach {timeout:g}s")
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        try:
+            return connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+        else:
+            with self._lock:
+                self._idle.append(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+pool = ConnectionPool(POOL_SIZE)
+_streams = threading.BoundedSemaphore(STREAM_SLOTS)
+
+
+@contextmanager
+def connection():
+    """Verbindung für die Dauer des Blocks; innerhalb eines Requests eine pro Request."""
+    if has_app_context():
+        if "db" not in g:
+            g.db = pool.acquire()
+        yield g.db
+        return
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+def release_request_connection(exc=None):
+    """Request-Verbindung an den Pool zurückgeben (teardown_appcontext)."""
+    conn = g.pop("db", None)
+    if conn is not None:
+        pool.release(conn)
+
+
+def init_app(app):
+    app.teardown_appcontext(release_request_connection)
+    app.register_error_handler(PoolTimeout, _busy)
+
+
+def _busy(e):
+    return Response(f"Datenbank ausgelastet: {e}", status=503, headers={"Retry-After": "5"})
+
+# --- Zeitstempel ---
+def now_ms():
+    return time.time_ns() // 1_000_000
+
+def to_epoch_ms(value):
+    """Epoch-ms, datetime oder "YYYY-MM-DD HH:MM:SS" (lokale Zeit) → Epoch-Millisekunden."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        if value.isdigit():
+            return int(value)
+        value = datetime.fromisoformat(value)
+    return int(value.timestamp() * 1000)
+
+def format_ts(ms):
+    """Epoch-ms → "YYYY-MM-DD HH:MM:SS" (lokale Zeit)."""
+    return datetime.fromtimestamp(ms / 1000).strftime(TS_FORMAT)
 
 # --- Setup ---
-def init_db():
-    conn = sqlite3.connect(config.DB_FILE)
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS readings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            sensor_id INTEGER,
-            timestamp TEXT,
-            temperature REAL,
-            humidity REAL
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS readings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        sensor_id TEXT NOT NULL,
+        ts INTEGER NOT NULL,            -- Epoch-Millisekunden (UTC)
+        temperature REAL,
+        humidity REAL
+    );
+    -- Covering-Index: Abfragen pro Sensor und Zeitbereich lesen nur den Index
+    CREATE INDEX IF NOT EXISTS idx_readings_sensor_ts
+        ON readings (sensor_id, ts, temperature, humidity);
+    CREATE INDEX IF NOT EXISTS idx_readings_ts ON readings (ts);
+    CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+"""
+
+def schema_version(conn):
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+def _executescript(conn, script):
+    # executescript() würde die laufende Transaktion committen
+    for statement in script.split(";"):
+        if statement.strip():
+            conn.execute(statement)
+
+def _upgrade_v2(conn):
+    """readings mit Epoch-ms und Indizes. Eine v1-Tabelle (timestamp TEXT) wird
+    nur umbenannt (readings_v1); die Zeilen kopiert app.migrate in kleinen Chunks."""
+    if "timestamp" in _columns(conn, "readings"):
+        conn.execute("ALTER TABLE readings RENAME TO readings_v1")
+        print("[INFO] readings v1 gefunden, Migration auf Schema v2 startet im Hintergrund")
+    _executescript(conn, SCHEMA)
+    if "timestamp" in _columns(conn, "readings_v1"):
+        # Neue IDs hinter die alten legen, damit migrierte Zeilen ihre ID behalten
+        conn.execute(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT 'readings', MAX(id) FROM readings_v1 HAVING MAX(id) IS NOT NULL"
         )
-    """)
-    conn.commit()
-    conn.close()
+
+def _upgrade_v3(conn):
+    """Rollup-Tabellen; vorhandene Zeilen füllt rollups.backfill() nach."""
+    from . import rollups
+    _executescript(conn, SCHEMA)
+    rollups.create_tables(conn)
+
+UPGRADES = {2: _upgrade_v2, 3: _upgrade_v3}
+SCHEMA_VERSION = max(UPGRADES)
+
+@metrics.timed_query
+def init_db():
+    """Schema anlegen bzw. schrittweise auf SCHEMA_VERSION heben."""
+    with connection() as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER PRIMARY KEY, applied_at INTEGER)")
+        for version, upgrade in sorted(UPGRADES.items()):
+            if schema_version(conn) >= version:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                upgrade(conn)
+                conn.execute("INSERT INTO schema_version (version, applied_at) VALUES (?, ?)", (version, now_ms()))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    load_channels()
+
+@metrics.timed_query
+def migration_pending():
+    """True, solange noch v1-Zeilen in readings_v1 auf die Migration warten."""
+    with connection() as conn:
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'readings_v1'"
+        ).fetchone() is not None
+
+# --- Messkanäle ---
+# Jeder Kanal ist eine REAL-Spalte in readings (und vier Spalten pro
+# Rollup-Tabelle). Neue Kanäle (pressure, co2, ...) hängt ensure_channels()
+# an, sobald ein Treiber sie liefert; Spalten werden nie entfernt, ältere
+# Zeilen haben dort NULL. Der Covering-Index bleibt bei temperature/humidity.
+_CHANNEL = re.compile(r"^[a-z][a-z0-9_]*$")
+
+def channel_key(channel):
+    return CHANNEL_KEYS.get(channel, channel)
+
+def entry(timestamp, values):
+    """{"timestamp": ms, "temp": ..., "hum": ..., ...} zu Werten in CHANNELS-Reihenfolge."""
+    result = {"timestamp": timestamp}
+    for i, channel in enumerate(CHANNELS):
+        result[channel_key(channel)] = values[i] if i < len(values) else None
+    return result
+
+def entry_values(entry):
+    """Umkehrung von entry(): Werte in CHANNELS-Reihenfolge (fehlende Kanäle → None)."""
+    return tuple(entry.get(channel_key(channel)) for channel in CHANNELS)
+
+def load_channels():
+    """CHANNELS aus den Spalten von readings lesen (auch in den Web-Workern)."""
+    global CHANNELS
+    with connection() as conn:
+        columns = _columns(conn, "readings")
+    if columns:
+        CHANNELS = tuple(column for column in columns if column not in ("id", "sensor_id", "ts"))
+    return CHANNELS
+
+@metrics.timed_query
+def ensure_channels(names):
+    """Fehlende Kanäle an readings und die Rollup-Tabellen anhängen; liefert CHANNELS."""
+    from . import rollups
+    missing = [name for name in dict.fromkeys(names) if name not in CHANNELS]
+    if not missing:
+        return CHANNELS
+    bad = [name for name in missing if not _CHANNEL.match(name)]
+    if bad:
+        raise ValueError(f"Ungültige Kanalnamen: {bad}")
+    with connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            present = _columns(conn, "readings")
+            for name in missing:
+                if name in present:   # von einem anderen Prozess schon angelegt
+                    continue
+                conn.execute(f"ALTER TABLE readings ADD COLUMN {name} REAL")
+                rollups.add_channel(conn, name)
+                print(f"[INFO] Neuer Messkanal: {name}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return load_channels()
 
 # --- Schreiben ---
-def store_reading(sensor_id, timestamp, temperature, humidity):
-    conn = sqlite3.connect(config.DB_FILE)
-    c = conn.cursor()
-    c.execute(
-        "INSERT INTO readings (sensor_id, timestamp, temperature, humidity) VALUES (?, ?, ?, ?)",
-        (sensor_id, timestamp, temperature, humidity)
-    )
-    conn.commit()
-    conn.close()
+def store_reading(sensor_id, timestamp, *values):
+    store_readings([(sensor_id, timestamp, *values)])
+
+def _insert_sql():
+    columns = ", ".join(CHANNELS)
+    return f"INSERT INTO readings (sensor_id, ts, {columns}) VALUES (?, ?, {', '.join('?' * len(CHANNELS))})"
+
+def _padded(rows):
+    width = len(CHANNELS)
+    return [
+        (sensor_id, to_epoch_ms(ts), *values, *(None,) * (width - len(values)))
+        for sensor_id, ts, *values in rows
+    ]
+
+@metrics.timed_query
+def store_readings(rows, archive=None):
+    """Mehrere Messwerte [(sensor_id, timestamp, *channels), ...] in einer Transaktion schreiben.
+
+    Fehlende Kanäle am Zeilenende werden als NULL geschrieben. Die Rollups
+    werden in derselben Transaktion aus allen rows fortgeschrieben; mit
+    archive (Stützpunkte der Kompression) kommen nur diese Zeilen in readings.
+    """
+    from . import rollups
+    rows = _padded(rows)
+    archive = rows if archive is None else _padded(archive)
+    with connection() as conn, conn:
+        conn.executemany(_insert_sql(), archive)
+        rollups.apply(conn, rows)
 
 # --- Lesen ---
-def get_readings(limit=100):
-    conn = sqlite3.connect(config.DB_FILE)
-    c = conn.cursor()
-    c.execute(
-        "SELECT sensor_id, timestamp, temperature, humidity FROM readings ORDER BY id DESC LIMIT ?",
-        (limit,)
-    )
-    rows = c.fetchall()
-    conn.close()
-    return rows
+@metrics.timed_query
+def get_readings(limit=100, ts_text=True):
+    """Neueste Messwerte [(sensor_id, timestamp, *CHANNELS), ...]; ts_text=False liefert Epoch-ms."""
+    with connection() as conn:
+        return conn.execute(
+            f"SELECT sensor_id, {TS_TEXT if ts_text else 'ts'}, {', '.join(CHANNELS)} FROM readings ORDER BY id DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
 
+@metrics.timed_query
 def get_latest_by_sensor(sensor_id):
-    conn = sqlite3.connect(config.DB_FILE)
-    c = conn.cursor()
-    c.execute(
-        "SELECT timestamp, temperature, humidity FROM readings WHERE sensor_id = ? ORDER BY id DESC LIMIT 1",
-        (sensor_id,)
-    )
-    row = c.fetchone()
-    conn.close()
-    return row
+    with connection() as conn:
+        return conn.execute(
+            f"SELECT {TS_TEXT}, temperature, humidity FROM readings WHERE sensor_id = ? ORDER BY ts DESC LIMIT 1",
+            (sensor_id,)
+        ).fetchone()
 
+@metrics.timed_query
 def get_latest_readings():
-    """Letzte Messwerte pro Sensor als Dict {sensor_id: {...}}."""
-    conn = sqlite3.connect(config.DB_FILE)
-    c = conn.cursor()
-    rows = c.execute("""
-        SELECT sensor_id, timestamp, temperature, humidity
-        FROM readings
-        WHERE id IN (
-            SELECT MAX(id) FROM readings GROUP BY sensor_id
-        )
-    """).fetchall()
-    conn.close()
+    """Letzte Messwerte pro Sensor als Dict {sensor_id: {"timestamp": ms, "temp": ..., "hum": ..., ...}}."""
+    with connection() as conn:
+        # Von Sensor zu Sensor über den Index springen statt die Tabelle zu gruppieren
+        rows = conn.execute(f"""
+            WITH RECURSIVE sensors(sid) AS (
+                SELECT MIN(sensor_id) FROM readings
+                UNION ALL
+                SELECT (SELECT MIN(sensor_id) FROM readings WHERE sensor_id > sid)
+                FROM sensors WHERE sid IS NOT NULL
+            )
+            SELECT sensor_id, ts, {', '.join(CHANNELS)}
+            FROM sensors JOIN readings ON readings.id = (
+                SELECT id FROM readings WHERE sensor_id = sid ORDER BY ts DESC LIMIT 1
+            )
+        """).fetchall()
     # Keys als Strings
-    return {str(sensor_id): {"timestamp": ts, "temp": temp, "hum": hum} for sensor_id, ts, temp, hum in rows}
+    return {str(sensor_id): entry(ts, values) for sensor_id, ts, *values in rows}
 
 
 # --- Wartung ---
+@metrics.timed_query
 def clear_data():
-    conn = sqlite3.connect(config.DB_FILE)
-    c = conn.cursor()
-    c.execute("DELETE FROM readings")
-    conn.commit()
-    conn.close()
-
-def csvdump():
-    conn = sqlite3.connect(config.DB_FILE)
-    c = conn.cursor()
-    rows = c.execute("SELECT timestamp, sensor_id, temperature, humidity FROM readings ORDER BY timestamp ASC").fetchall()
-    conn.close()
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["timestamp", "sensor_id", "temperature", "humidity"])
-    writer.writerows(rows)
-    return send_file(
-        io.BytesIO(output.getvalue().encode()),
-        mimetype="text/csv",
-        download_name="sensor_data.csv",
-        as_attachment=True
-    )
+    from . import rollups
+    with connection() as conn, conn:
+        conn.execute("DELETE FROM readings")
+        rollups.clear(conn)
+
+@metrics.timed_query
+def iter_readings(start, end, sensor_id=None, ts_text=True, chunk_rows=5000, with_count=False, with_sensors=False):
+    """Messwerte (timestamp, sensor_id, *channels) mit start <= ts < end, zeitlich sortiert, in Chunks.
+
+    Läuft über einen Cursor mit fetchmany() auf einer eigenen Verbindung
+    außerhalb des Pools: ein langsamer Download hält sie bis zum Ende, ohne
+    /data oder /history die Pool-Verbindungen wegzunehmen. Höchstens
+    STREAM_SLOTS gleichzeitig, sonst PoolTimeout beim ersten next().
+    Mit with_count=True kommt zuerst die Zeilenzahl, mit with_sensors=True
+    (danach) die Liste aller Sensor-IDs – beides aus demselben Lese-Snapshot.
+    """
+    where = "WHERE ts >= ? AND ts < ?"
+    params = [start, end]
+    if sensor_id is not None:
+        where += " AND sensor_id = ?"
+        params.append(sensor_id)
+    if not _streams.acquire(timeout=POOL_TIMEOUT):
+        raise PoolTimeout(f"{STREAM_SLOTS} Exporte laufen bereits")
+    try:
+        conn = connect()
+    except Exception:
+        _streams.release()
+        raise
+    cursor = conn.cursor()
+    try:
+        if with_count or with_sensors:
+            cursor.execute("BEGIN")  # Zählung, Sensoren und Zeilen aus demselben Snapshot
+        if with_count:
+            yield cursor.execute(f"SELECT COUNT(*) FROM readings {where}", params).fetchone()[0]
+        if with_sensors:
+            yield _sensor_ids(cursor)
+        cursor.execute(
+            f"SELECT {TS_TEXT if ts_text else 'ts'}, sensor_id, {', '.join(CHANNELS)} "
+            f"FROM readings {where} ORDER BY ts",
+            params
+        )
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()  # Lese-Snapshot freigeben, auch bei Abbruch
+        conn.close()
+        _streams.release()
+
+@metrics.timed_query
+def get_range(start, end):
+    """Messwerte [(ts_ms, sensor_id, temperature, humidity), ...] mit start <= ts < end, zeitlich sortiert."""
+    with connection() as conn:
+        return conn.execute(
+            "SELECT ts, sensor_id, temperature, humidity FROM readings WHERE ts >= ? AND ts < ? ORDER BY ts ASC",
+            (start, end)
+        ).fetchall()
+
+@metrics.timed_query
+def get_sensor_range(sensor_id, start, end):
+    """[(ts_ms, *channels), ...] eines Sensors mit start <= ts < end – reiner Scan im Covering-Index."""
+    with connection() as conn:
+        return conn.execute(
+            f"SELECT ts, {', '.join(CHANNELS)} FROM readings WHERE sensor_id = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            (sensor_id, start, end)
+        ).fetchall()
+
+@metrics.timed_query
+def get_sensor_edges(sensor_id, start, end):
+    """Letzte Zeile vor start und erste ab end [(ts_ms, *channels) oder None] – Stützpunkte für compression.reconstruct."""
+    columns = ", ".join(CHANNELS)
+    with connection() as conn:
+        before = conn.execute(
+            f"SELECT ts, {columns} FROM readings WHERE sensor_id = ? AND ts < ? ORDER BY ts DESC LIMIT 1",
+            (sensor_id, start)
+        ).fetchone()
+        after = conn.execute(
+            f"SELECT ts, {columns} FROM readings WHERE sensor_id = ? AND ts >= ? ORDER BY ts LIMIT 1",
+            (sensor_id, end)
+        ).fetchone()
+    return before, after
+
+@metrics.timed_query
+def last_id():
+    """Höchste vergebene readings-ID – Cursor für /history?since=."""
+    with connection() as conn:
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'readings'").fetchone()
+    return row[0] if row else 0
+
+@metrics.timed_query
+def get_since(after_id):
+    """Neue Messwerte [(id, sensor_id, ts, *channels), ...] mit id > after_id – Bereichsscan über die rowid."""
+    with connection() as conn:
+        return conn.execute(
+            f"SELECT id, sensor_id, ts, {', '.join(CHANNELS)} FROM readings WHERE id > ? ORDER BY id",
+            (after_id,)
+        ).fetchall()
+
+@metrics.timed_query
+def sensor_ids():
+    """Alle Sensor-IDs, per Sprung durch den Index statt Tabellenscan."""
+    with connection() as conn:
+        return _sensor_ids(conn)
+
+def _sensor_ids(conn):
+    rows = conn.execute("""
+        WITH RECURSIVE sensors(sid) AS (
+            SELECT MIN(sensor_id) FROM readings
+            UNION ALL
+            SELECT (SELECT MIN(sensor_id) FROM readings WHERE sensor_id > sid)
+            FROM sensors WHERE sid IS NOT NULL
+        )
+        SELECT sid FROM sensors WHERE sid IS NOT NULL
+    """).fetchall()
+    return [sid for (sid,) in rows]
+
+def today_start():
+    return to_epoch_ms(datetime.combine(datetime.today(), datetime.min.time()))
 
+@metrics.timed_query
 def today_readings():
-    today_start = datetime.combine(datetime.today(), datetime.min.time())
-    conn = sqlite3.connect(config.DB_FILE)
-    c = conn.cursor()
-    rows = c.execute(
-        "SELECT timestamp, sensor_id, temperature, humidity FROM readings WHERE timestamp >= ? ORDER BY timestamp ASC",
-        (today_start.strftime("%Y-%m-%d %H:%M:%S"),)
-    ).fetchall()
-    conn.close()
-    return rows
+    """Heutige Messwerte [(ts_ms, sensor_id, temperature, humidity), ...], zeitlich sortiert."""
+    return get_range(today_start(), now_ms() + 1)
@@ -0,0 +1,110 @@
+# app/downsample.py
+#
+# Downsampling für die Charts, vektorisiert mit NumPy. Alle Kanäle eines
+# Sensors (temp, hum, ...) laufen in einem Durchgang über dieselben Buckets
+# und teilen sich die Zeitachse; die Ausgabe ist immer zeitlich sortiert.
+#
+#   minmax – Min- und Max-Punkt jedes Kanals pro Bucket (Spitzen bleiben sichtbar)
+#   lttb   – Largest-Triangle-Three-Buckets (ein Punkt pro Bucket, formtreu)
+#   avg    – Mittelwert pro Bucket (glatt)
+
+import warnings
+import numpy as np
+
+ALGORITHMS = ("minmax", "lttb", "avg")
+
+
+def as_columns(rows):
+    """SQLite-Zeilen [(ts, ch1, ch2, ...), ...] → (ts int64[n], values float64[n, k]); NULL wird NaN."""
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty((0, 0))
+    data = np.array(rows, dtype=np.float64)
+    return data[:, 0].astype(np.int64), data[:, 1:]
+
+
+def _buckets(n, n_buckets):
+    """Bucket-Größe und -Anzahl, sodass jeder Bucket mindestens einen echten Wert hat."""
+    size = -(-n // n_buckets)
+    return size, -(-n // size)
+
+
+def _padded(values, size, count):
+    """values[n, k] → [count, size, k], aufgefüllt mit NaN."""
+    n, k = values.shape
+    out = np.full((count * size, k), np.nan)
+    out[:n] = values
+    return out.reshape(count, size, k)
+
+
+def minmax_indices(values, max_points):
+    n, k = values.shape
+    size, count = _buckets(n, max(1, max_points // (2 * max(k, 1))))
+    blocks = _padded(values, size, count)
+    nan = np.isnan(blocks)
+    offsets = (np.arange(count) * size)[:, None]
+    lo = np.where(nan, np.inf, blocks).argmin(axis=1) + offsets    # [count, k]
+    hi = np.where(nan, -np.inf, blocks).argmax(axis=1) + offsets
+    # Vereinigung über alle Kanäle; unique sortiert gleich mit
+    return np.unique(np.concatenate([lo.ravel(), hi.ravel()]).clip(0, n - 1))
+
+
+def lttb_indices(ts, values, max_points):
+    n, k = values.shape
+    if max_points < 3:
+        return np.array([0, n - 1])
+    # Zeit und Kanäle auf [0, 1] normieren, damit alle Kanäle gleich gewichtet werden
+    x = (ts - ts[0]) / max(ts[-1] - ts[0], 1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # Kanal nur mit NULL
+        lo = np.nanmin(values, axis=0)
+        span = np.nanmax(values, axis=0) - lo
+    y = np.nan_to_num((values - lo) / np.where(span > 0, span, 1))
+    n_buckets = max_points - 2   # erster und letzter Punkt sind fest
+    edges = np.linspace(1, n - 1, n_buckets + 1).astype(np.int64)
+    out = np.empty(max_points, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_buckets):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        # Punkt c: Mittelwert des nächsten Buckets bzw. der letzte Punkt
+        if i + 1 < n_buckets:
+            next_end = max(edges[i + 2], end + 1)
+            cx, cy = x[end:next_end].mean(), y[end:next_end].mean(axis=0)
+        else:
+            cx, cy = x[-1], y[-1]
+        # Dreiecksfläche (a, j, c) je Kanal, summiert
+        area = np.abs(
+            (x[a] - cx) * (y[start:end] - y[a]) - (x[a] - x[start:end, None]) * (cy - y[a])
+        ).sum(axis=1)
+        a = start + int(area.argmax())
+        out[i + 1] = a
+    return np.unique(out)
+
+
+def average(ts, values, max_points):
+    n, _ = values.shape
+    size, count = _buckets(n, max_points)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # Buckets nur mit NULL
+        means = np.nanmean(_padded(values, size, count), axis=1)
+        times = np.nanmean(_padded(ts[:, None].astype(np.float64), size, count), axis=1)[:, 0]
+    return times.round().astype(np.int64), means
+
+
+def downsample(ts, values, max_points, algo="minmax"):
+    """Auf höchstens ~max_points Punkte reduzieren → (ts int64[m], values float64[m, k])."""
+    n = len(ts)
+    if n <= max_points or n == 0:
+        return ts, values
+    if algo == "avg":
+        return average(ts, values, max_points)
+    if algo == "lttb":
+        idx = lttb_indices(ts, values, max_points)
+    else:
+        idx = minmax_indices(values, max_points)
+    return ts[idx], values[idx]
+
+
+def to_list(array):
+    """NumPy-Spalte → JSON-taugliche Liste (NaN → None)."""
+    return [None if v != v else v for v in array.tolist()]
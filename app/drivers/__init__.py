@@ -0,0 +1,98 @@
+# app/drivers/__init__.py
+#
+# Registry der Sensor-Treiber. Ein Treiber beschreibt einen Sensortyp:
+# Messkanäle, I2C-Adressen für den Bus-Scan, kürzestes sinnvolles
+# Messintervall und Oversampling-/Messmodus. Eingebaute Treiber und solche
+# aus anderen Paketen (Entry-Point-Gruppe "sensor_dashboard.drivers", Wert
+# "paket.modul:Klasse") werden erst importiert, wenn sie konfiguriert sind –
+# ein BME280-Setup braucht weder smbus2-Erweiterungen für den SCD4x noch
+# die GPIO-Bibliotheken für den DHT22.
+
+import importlib
+import re
+from importlib import metadata
+
+# --- Einstellungen ---
+ENTRY_POINT_GROUP = "sensor_dashboard.drivers"
+BUILTIN = {
+    "bme280": "app.drivers.bosch:BME280",
+    "bmp280": "app.drivers.bosch:BMP280",
+    "scd4x": "app.drivers.scd4x:SCD4x",
+    "dht22": "app.drivers.dht22:DHT22",
+}
+_CHANNEL = re.compile(r"^[a-z][a-z0-9_]*$")   # Kanalnamen werden zu DB-Spalten
+
+# --- Globale Variablen ---
+_registered = {}   # Name → Klasse oder "modul:Klasse" (register())
+_loaded = {}       # Name → Klasse
+
+
+class Driver:
+    """Basisklasse; ein Objekt pro gefundenem Sensor."""
+
+    name = None
+    channels = ()            # Messkanäle in Ausgabe-Reihenfolge, z.B. ("temperature", "humidity")
+    addresses = ()           # I2C-Adressen für den Bus-Scan; leer = nicht am Bus (GPIO)
+    min_interval = 1.0       # Sekunden; kürzere Intervalle werden darauf angehoben
+    oversampling = None      # Treiber-spezifischer Mess-/Oversampling-Modus
+    conversion_time = 0.0    # > 0: start() stößt an, read() holt nach so vielen Sekunden ab
+
+    def __init__(self, bus, address, oversampling=None, **options):
+        self.bus = bus
+        self.address = address
+        if oversampling is not None:
+            self.oversampling = oversampling
+        self.options = options
+
+    @classmethod
+    def probe(cls, bus, address):
+        """True, wenn an address ein Sensor dieses Typs antwortet (Mux-Kanal ist angewählt)."""
+        bus.read_byte(address)
+        return True
+
+    def start(self):
+        """Messung anstoßen (nur bei conversion_time > 0)."""
+
+    def read(self):
+        """{Kanal: Wert}; nicht gemessene Kanäle dürfen fehlen. Fehler als Exception."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def register(name, driver):
+    """Treiber zur Laufzeit anmelden (Klasse oder "modul:Klasse")."""
+    _registered[name] = driver
+    _loaded.pop(name, None)
+
+
+def _entry_points():
+    return {entry.name: entry for entry in metadata.entry_points(group=ENTRY_POINT_GROUP)}
+
+
+def available():
+    """Alle bekannten Treibernamen, ohne einen davon zu importieren."""
+    return sorted({*BUILTIN, *_entry_points(), *_registered})
+
+
+def load(name):
+    """Treiberklasse zu name – importiert beim ersten Aufruf genau dieses Modul."""
+    if name in _loaded:
+        return _loaded[name]
+    spec = _registered.get(name) or BUILTIN.get(name)
+    if spec is None:
+        entry = _entry_points().get(name)
+        if entry is None:
+            raise ValueError(f"Unbekannter Sensor-Treiber: {name} (bekannt: {', '.join(available())})")
+        cls = entry.load()
+    elif isinstance(spec, str):
+        module, _, attr = spec.partition(":")
+        cls = getattr(importlib.import_module(module), attr)
+    else:
+        cls = spec
+    bad = [channel for channel in cls.channels if not _CHANNEL.match(channel)]
+    if not cls.channels or bad:
+        raise ValueError(f"Treiber {name}: ungültige Kanäle {bad or '(keine)'}")
+    _loaded[name] = cls
+    return cls
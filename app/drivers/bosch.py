@@ -0,0 +1,57 @@
+# app/drivers/bosch.py
+#
+# Bosch BME280 (Temperatur, Feuchte, Luftdruck) und BMP280 (ohne Feuchte)
+# über das bme280-Paket – bzw. über app.simbus, wenn der Bus simuliert ist.
+# Beide Typen sitzen auf 0x76/0x77 und werden beim Scan an der Chip-ID
+# (Register 0xD0) unterschieden.
+
+import importlib
+from . import Driver
+
+# Oversampling-Faktor → Registerwert (osrs_t/osrs_p/osrs_h)
+OVERSAMPLING = {"x1": 1, "x2": 2, "x4": 3, "x8": 4, "x16": 5}
+CHIP_ID_REGISTER = 0xD0
+
+
+def _library(bus):
+    from .. import simbus
+    if isinstance(bus, simbus.SimBus):
+        return simbus
+    return importlib.import_module("bme280")
+
+
+class BME280(Driver):
+    name = "bme280"
+    channels = ("temperature", "humidity", "pressure")
+    addresses = (0x76, 0x77)
+    chip_id = 0x60
+    min_interval = 0.0        # Forced Mode: read() wartet die Messzeit selbst ab (x1 ~10 ms)
+    oversampling = "x1"       # x16 rauscht weniger, misst aber ~110 ms
+
+    def __init__(self, bus, address, **options):
+        super().__init__(bus, address, **options)
+        if self.oversampling not in OVERSAMPLING:
+            raise ValueError(f"{self.name}: oversampling eines von {', '.join(OVERSAMPLING)}")
+        self._lib = _library(bus)
+        self._calibration = None
+
+    @classmethod
+    def probe(cls, bus, address):
+        return bus.read_byte_data(address, CHIP_ID_REGISTER) == cls.chip_id
+
+    def read(self):
+        try:
+            # Kalibrierdaten nur einmal pro Sensor laden
+            if self._calibration is None:
+                self._calibration = self._lib.load_calibration_params(self.bus, self.address)
+            data = self._lib.sample(self.bus, self.address, self._calibration, OVERSAMPLING[self.oversampling])
+        except Exception:
+            self._calibration = None   # z.B. Sensor getauscht: beim nächsten Mal neu laden
+            raise
+        return {channel: round(getattr(data, channel), 2) for channel in self.channels}
+
+
+class BMP280(BME280):
+    name = "bmp280"
+    channels = ("temperature", "pressure")
+    chip_id = 0x58
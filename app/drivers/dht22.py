@@ -0,0 +1,33 @@
+# app/drivers/dht22.py
+#
+# DHT22/AM2302 an einem GPIO-Pin (adafruit-circuitpython-dht). Nicht am
+# I2C-Bus, also kein Scan: Konfiguration über sensors.STATIC_SENSORS mit
+# der Pin-Nummer als "address". Ein Lesezugriff blockiert einige ms bis
+# ~250 ms (Bit-Banging, Prüfsummenfehler) – deshalb läuft er im eigenen
+# Messplan-Thread und bremst die I2C-Sensoren nicht.
+
+import importlib
+from . import Driver
+
+
+class DHT22(Driver):
+    name = "dht22"
+    channels = ("temperature", "humidity")
+    addresses = ()
+    min_interval = 2.0   # Datenblatt: höchstens alle 2 s
+
+    def __init__(self, bus, address, **options):
+        super().__init__(bus, address, **options)
+        board = importlib.import_module("board")
+        adafruit_dht = importlib.import_module("adafruit_dht")
+        self._device = adafruit_dht.DHT22(getattr(board, f"D{address}"), use_pulseio=False)
+
+    def read(self):
+        temperature = self._device.temperature
+        humidity = self._device.humidity
+        if temperature is None or humidity is None:
+            raise OSError("DHT22: keine gültige Antwort")
+        return {"temperature": round(temperature, 2), "humidity": round(humidity, 2)}
+
+    def close(self):
+        self._device.exit()
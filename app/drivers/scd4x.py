@@ -0,0 +1,93 @@
+# app/drivers/scd4x.py
+#
+# Sensirion SCD40/SCD41: CO2 (ppm), Temperatur und Feuchte. Der Sensor
+# spricht 16-Bit-Kommandos mit CRC-geschützten Antwortwörtern, deshalb
+# direkt über smbus2.i2c_rdwr statt über Register-Zugriffe.
+#
+# Modi (oversampling):
+#   "periodic"    – misst selbst alle 5 s, read() holt nur ab (~1 ms)
+#   "single_shot" – nur SCD41, stromsparend; start() stößt an, der Messplan
+#                   holt nach 5 s ab und liest in der Zwischenzeit die
+#                   übrigen Sensoren
+
+import importlib
+import time
+from . import Driver
+
+START_PERIODIC = 0x21B1
+STOP_PERIODIC = 0x3F86
+READ_MEASUREMENT = 0xEC05
+GET_SERIAL = 0x3682
+MEASURE_SINGLE_SHOT = 0x219D
+MODES = {"periodic": 0.0, "single_shot": 5.0}   # Modus → Wandlungszeit in s
+
+
+def crc8(data):
+    crc = 0xFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x31) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+class SCD4x(Driver):
+    name = "scd4x"
+    channels = ("co2", "temperature", "humidity")
+    addresses = (0x62,)
+    min_interval = 5.0        # schneller liefert der Sensor keine neuen Werte
+    oversampling = "periodic"
+
+    def __init__(self, bus, address, **options):
+        super().__init__(bus, address, **options)
+        if self.oversampling not in MODES:
+            raise ValueError(f"{self.name}: oversampling eines von {', '.join(MODES)}")
+        self.conversion_time = MODES[self.oversampling]
+        if self.oversampling == "periodic":
+            _command(bus, address, START_PERIODIC)
+
+    @classmethod
+    def probe(cls, bus, address):
+        # Eine laufende periodische Messung beantwortet keine anderen Kommandos
+        _command(bus, address, STOP_PERIODIC, wait=0.5)
+        _command(bus, address, GET_SERIAL)
+        _read_words(bus, address, 3)   # wirft bei CRC-Fehler → kein SCD4x
+        return True
+
+    def start(self):
+        _command(self.bus, self.address, MEASURE_SINGLE_SHOT, wait=0)
+
+    def read(self):
+        _command(self.bus, self.address, READ_MEASUREMENT)
+        co2, temperature, humidity = _read_words(self.bus, self.address, 3)
+        return {
+            "co2": co2,
+            "temperature": round(-45 + 175 * temperature / 65535, 2),
+            "humidity": round(100 * humidity / 65535, 2),
+        }
+
+    def close(self):
+        try:
+            _command(self.bus, self.address, STOP_PERIODIC, wait=0.5)
+        except OSError:
+            pass
+
+
+def _command(bus, address, command, wait=0.001):
+    smbus2 = importlib.import_module("smbus2")
+    bus.i2c_rdwr(smbus2.i2c_msg.write(address, [command >> 8, command & 0xFF]))
+    if wait:
+        time.sleep(wait)
+
+
+def _read_words(bus, address, count):
+    smbus2 = importlib.import_module("smbus2")
+    message = smbus2.i2c_msg.read(address, 3 * count)
+    bus.i2c_rdwr(message)
+    data = list(message)
+    words = []
+    for i in range(0, len(data), 3):
+        if crc8(data[i:i + 2]) != data[i + 2]:
+            raise OSError(f"SCD4x an {hex(address)}: CRC-Fehler")
+        words.append(data[i] << 8 | data[i + 1])
+    return words
@@ -0,0 +1,114 @@
+# app/events.py
+#
+# In-Process Publish/Subscribe für Live-Werte und der passende
+# Server-Sent-Events-Stream für /events. sensor_loop publiziert jeden
+# Messzyklus einmal, jeder Client hat eine eigene begrenzte Queue.
+
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+# --- Einstellungen ---
+QUEUE_SIZE = 100      # Events pro Client; wer nicht hinterherkommt, fliegt raus
+REPLAY_SIZE = 500     # Events für Last-Event-ID-Wiederaufnahme
+HEARTBEAT = 15.0      # Sekunden bis zum Keepalive-Kommentar
+RETRY_MS = 3000       # Reconnect-Wartezeit für den Browser
+
+
+class Subscription:
+    __slots__ = ("queue", "closed")
+
+    def __init__(self, size):
+        self.queue = queue.Queue(maxsize=size)
+        self.closed = False
+
+
+class Broker:
+    """Verteilt Events an alle Abonnenten; langsame Abonnenten werden entfernt statt zu blockieren."""
+
+    def __init__(self, queue_size=QUEUE_SIZE, replay_size=REPLAY_SIZE):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._history = deque(maxlen=replay_size)
+        self._queue_size = queue_size
+        # IDs starten bei der Startzeit in ms, damit sie auch über Neustarts hinweg wachsen
+        self._next_id = time.time_ns() // 1_000_000
+        self.stats = {"published": 0, "evicted": 0}
+
+    def publish(self, event, data):
+        payload = json.dumps(data, separators=(",", ":"))
+        with self._lock:
+            message = (self._next_id, event, payload)
+            subscribers = self._record(message)
+        self._deliver(message, subscribers)
+
+    def relay(self, message):
+        """Fertige Nachricht (id, event, payload) aus dem Acquisition-Prozess verteilen; die ID bleibt erhalten."""
+        with self._lock:
+            subscribers = self._record(message)
+        self._deliver(message, subscribers)
+
+    def _record(self, message):
+        self._next_id = message[0] + 1
+        self._history.append(message)
+        self.stats["published"] += 1
+        return list(self._subscribers)
+
+    def _deliver(self, message, subscribers):
+        for sub in subscribers:
+            try:
+                sub.queue.put_nowait(message)
+            except queue.Full:
+                self._evict(sub)
+
+    def subscribe(self, last_id=None):
+        """Neues Abo; mit last_id werden verpasste Events nachgeliefert (oder ein "reset")."""
+        sub = Subscription(self._queue_size)
+        with self._lock:
+            if last_id is not None:
+                missed = [m for m in self._history if m[0] > last_id]
+                oldest = self._history[0][0] if self._history else self._next_id
+                if last_id < oldest - 1 or last_id >= self._next_id:
+                    # Lücke nicht mehr im Puffer (oder ID aus einem früheren Lauf) – Client lädt neu
+                    missed = [(self._next_id - 1, "reset", "{}")]
+                for message in missed[-self._queue_size:]:
+                    sub.queue.put_nowait(message)
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        sub.closed = True
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def _evict(self, sub):
+        if not sub.closed:
+            self.unsubscribe(sub)
+            with self._lock:
+                self.stats["evicted"] += 1
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
+
+
+broker = Broker()
+
+
+# --- SSE ---
+def stream(last_id=None):
+    """Generator für eine text/event-stream-Response."""
+    sub = broker.subscribe(last_id)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while not sub.closed:
+            try:
+                event_id, event, payload = sub.queue.get(timeout=HEARTBEAT)
+            except queue.Empty:
+                yield ": ping\n\n"
+                continue
+            yield f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+    finally:
+        broker.unsubscribe(sub)
@@ -0,0 +1,255 @@
+# app/export.py
+#
+# /export als Streaming-Response: die Zeilen werden chunkweise aus dem
+# Cursor gelesen, als CSV formatiert und optional on-the-fly gzip-
+# komprimiert. Speicherbedarf bleibt konstant, das erste Byte geht sofort raus.
+#
+# Für die Auswertung gibt es dieselben Daten spaltenweise und typisiert
+# (ts int64 Epoch-ms, sensor_id, Kanäle float32) als Parquet, Arrow-IPC-
+# Stream oder NPZ; load() liest alle drei Formate wieder ein.
+
+import csv
+import io
+import itertools
+import zipfile
+import zlib
+import numpy as np
+from flask import Response
+from . import database
+
+# --- Einstellungen ---
+CHUNK_ROWS = 5000             # Zeilen pro fetchmany()/Ausgabe-Chunk (CSV)
+COLUMNAR_CHUNK_ROWS = 65536   # Zeilen pro Record-Batch / Row-Group
+GZIP_LEVEL = 6
+FORMATS = {
+    # Format: (MIME-Typ, Dateiendung)
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "npz": ("application/octet-stream", "npz"),
+}
+
+
+def csv_chunks(start, end, sensor_id=None):
+    """CSV als Folge von Byte-Chunks (Header + je ein Chunk pro fetchmany)."""
+    batches = database.iter_readings(start, end, sensor_id, chunk_rows=CHUNK_ROWS)
+    first = next(batches, [])   # Verbindung vor dem Header öffnen (PoolTimeout → 503 statt abgebrochenem Download)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["timestamp", "sensor_id", *database.CHANNELS])
+    yield buffer.getvalue().encode()
+    for rows in itertools.chain([first], batches):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks, level=GZIP_LEVEL):
+    """Byte-Chunks als gzip-Stream komprimieren."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = gzip-Header
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# --- Spaltenformate ---
+class _Sink(io.RawIOBase):
+    """Nicht-seekbares Schreibziel, aus dem der Generator die fertigen Bytes abholt."""
+
+    def __init__(self):
+        self._parts = []
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _columns(rows, codes):
+    """Zeilen (ts, sensor_id, *channels) → (ts int64, sensor int16-Code, values float32[n, k])."""
+    n = len(rows)
+    ts = np.fromiter((row[0] for row in rows), np.int64, n)
+    sensor = np.fromiter((codes[row[1]] for row in rows), np.int16, n)
+    values = np.array([row[2:] for row in rows], dtype=np.float32).reshape(n, len(database.CHANNELS))
+    return ts, sensor, values
+
+
+def _arrow_schema(pa):
+    return pa.schema(
+        [("ts", pa.int64()), ("sensor_id", pa.dictionary(pa.int16(), pa.string()))]
+        + [(ch, pa.float32()) for ch in database.CHANNELS]
+    )
+
+
+def arrow_chunks(batches, sensors, fmt="arrow"):
+    """Arrow-IPC-Stream bzw. Parquet (eine Row-Group pro Batch) als Byte-Chunks."""
+    import pyarrow as pa   # optional, nur für diese Formate nötig
+    schema = _arrow_schema(pa)
+    dictionary = pa.array(sensors, pa.string())
+    sink = _Sink()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        write = lambda batch: writer.write_table(pa.Table.from_batches([batch]))
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+        write = writer.write_batch
+    codes = {name: i for i, name in enumerate(sensors)}
+    for rows in batches:
+        ts, sensor, values = _columns(rows, codes)
+        arrays = [pa.array(ts), pa.DictionaryArray.from_arrays(pa.array(sensor), dictionary)]
+        arrays += [pa.array(values[:, i]) for i in range(values.shape[1])]
+        write(pa.record_batch(arrays, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def npz_chunks(total, batches, sensors):
+    """NPZ mit sensors.npy (Namen) und readings.npy (Record-Array), gestreamt.
+
+    Der .npy-Header braucht die Zeilenzahl vorab, deshalb `total`.
+    """
+    dtype = np.dtype(
+        [("ts", "<i8"), ("sensor", "<i2")] + [(ch, "<f4") for ch in database.CHANNELS]
+    )
+    codes = {name: i for i, name in enumerate(sensors)}
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        names = io.BytesIO()
+        np.save(names, np.array(sensors, dtype=str))
+        archive.writestr("sensors.npy", names.getvalue())
+        with archive.open("readings.npy", "w", force_zip64=True) as entry:
+            np.lib.format.write_array_header_1_0(entry, {
+                "descr": np.lib.format.dtype_to_descr(dtype),
+                "fortran_order": False,
+                "shape": (total,),
+            })
+            written = 0
+            for rows in batches:
+                rows = rows[:total - written]
+                ts, sensor, values = _columns(rows, codes)
+                record = np.empty(len(rows), dtype=dtype)
+                record["ts"], record["sensor"] = ts, sensor
+                for i, ch in enumerate(database.CHANNELS):
+                    record[ch] = values[:, i]
+                entry.write(record.tobytes())
+                written += len(rows)
+                yield sink.drain()
+    yield sink.drain()
+
+
+def columnar_chunks(fmt, start, end, sensor_id=None):
+    """Messwerte im Zeitraum als Parquet/Arrow/NPZ-Byte-Chunks."""
+    # Sensor-IDs aus dem Lese-Snapshot der Zeilen: ein neuer Sensor mittendrin hätte sonst keinen Code
+    rows = database.iter_readings(
+        start, end, sensor_id, ts_text=False, chunk_rows=COLUMNAR_CHUNK_ROWS,
+        with_count=True, with_sensors=sensor_id is None,
+    )
+    total = next(rows)
+    sensors = [sensor_id] if sensor_id is not None else next(rows)
+    if fmt == "npz":
+        return npz_chunks(total, rows, sensors)
+    return arrow_chunks(rows, sensors, fmt)
+
+
+def load(path):
+    """Export-Datei (Parquet, Arrow-Stream oder NPZ) → {spalte: numpy-Array}."""
+    if str(path).endswith(".npz"):
+        with np.load(path) as data:
+            sensors, record = data["sensors"], data["readings"]
+        columns = {"ts": record["ts"], "sensor_id": sensors[record["sensor"]]}
+        columns.update({ch: record[ch] for ch in record.dtype.names[2:]})
+        return columns
+    import pyarrow as pa
+    if str(path).endswith(".parquet"):
+        import pyarrow.parquet as pq
+        table = pq.read_table(path)
+    else:
+        with pa.OSFile(str(path)) as source:
+            table = pa.ipc.open_stream(source).read_all()
+    columns = {}
+    for name in table.column_names:
+        column = table.column(name)
+        if pa.types.is_dictionary(column.type):
+            column = column.cast(column.type.value_type)
+        columns[name] = column.to_numpy()
+    return columns
+
+
+def available(fmt):
+    """Parquet/Arrow brauchen das optionale pyarrow."""
+    if fmt in ("parquet", "arrow"):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return False
+    return fmt in FORMATS
+
+
+def response(fmt, start, end, sensor_id=None, compress=False):
+    """Download-Response im gewünschten Format."""
+    if fmt == "csv":
+        return csv_response(start, end, sensor_id, compress)
+    return columnar_response(fmt, columnar_chunks(fmt, start, end, sensor_id))
+
+
+def rows_response(fmt, rows):
+    """Bereits geladene Zeilen (ts, sensor_id, *channels) als Spaltenformat."""
+    sensors = sorted({row[1] for row in rows})
+    if fmt == "npz":
+        return columnar_response(fmt, npz_chunks(len(rows), [rows], sensors))
+    return columnar_response(fmt, arrow_chunks([rows], sensors, fmt))
+
+
+def columnar_response(fmt, body):
+    mimetype, extension = FORMATS[fmt]
+    return Response(
+        body,
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="sensor_data.{extension}"'},
+    )
+
+
+def _started(chunks):
+    """Ersten Chunk noch im Request erzeugen: Fehler beim Öffnen (PoolTimeout) werden zum Statuscode."""
+    first = next(chunks)
+
+    def body():
+        try:
+            yield first
+            yield from chunks
+        finally:
+            chunks.close()   # Verbindung auch bei abgebrochenem Download freigeben
+    return body()
+
+
+def csv_response(start, end, sensor_id=None, compress=False):
+    body = csv_chunks(start, end, sensor_id)
+    body = _started(body)
+    filename = "sensor_data.csv"
+    mimetype = "text/csv"
+    if compress:
+        body = gzip_chunks(body)
+        filename += ".gz"
+        mimetype = "application/gzip"
+    return Response(
+        body,
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,304 @@
+# app/hls.py
+#
+# HLS-Auslieferung aus dem RAM: ein Watcher (inotify, sonst Polling)
+# beobachtet OUTPUT_DIR. Sobald ffmpeg eine Playlist fertig geschrieben hat,
+# werden sie und alle darin referenzierten Segmente in einen begrenzten
+# Cache geladen; löscht ffmpeg ein Segment (delete_segments), fliegt es
+# auch aus dem Cache. Jeder Zuschauer bekommt die Bytes damit aus dem
+# Speicher statt von der SD-Karte.
+#
+# Playlist-Requests mit ?_HLS_msn=N (Blocking Playlist Reload) warten, bis
+# Segment N in der Playlist steht, statt dass der Client pollt.
+
+import ctypes
+import ctypes.util
+import os
+import re
+import struct
+import threading
+import time
+from collections import OrderedDict
+from flask import Response, request, send_from_directory, abort
+from . import config, metrics
+
+# --- Einstellungen ---
+MAX_BYTES = 64 * 1024 * 1024   # Obergrenze für den Segment-Cache
+POLL_INTERVAL = 0.2            # Sekunden, nur ohne inotify
+BLOCK_TIMEOUT = 6.0            # Max. Wartezeit für ?_HLS_msn
+PLAYLIST_CACHE = "no-cache"    # immer per ETag revalidieren
+SEGMENT_CACHE = "public, max-age=60"
+MIMETYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+    ".m4s": "video/iso.segment",
+    ".mp4": "video/mp4",
+}
+
+# inotify-Konstanten (linux/inotify.h)
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_DELETE = 0x200
+_EVENT = struct.Struct("iIII")
+_URI = re.compile(r'URI="([^"]+)"')
+
+
+class Entry:
+    __slots__ = ("data", "etag", "mimetype")
+
+    def __init__(self, data, etag, mimetype):
+        self.data = data
+        self.etag = etag
+        self.mimetype = mimetype
+
+
+class Playlist:
+    __slots__ = ("entry", "sequence", "segments", "uris")
+
+    def __init__(self, entry, sequence, segments, uris):
+        self.entry = entry
+        self.sequence = sequence   # Media Sequence Number des ersten Segments
+        self.segments = segments   # [(Dauer, URI), ...]
+        self.uris = uris           # alle referenzierten Dateien (inkl. EXT-X-MAP usw.)
+
+    @property
+    def last_msn(self):
+        return self.sequence + len(self.segments) - 1
+
+
+def parse_playlist(text):
+    """(Media Sequence, [(Dauer, URI), ...], referenzierte Dateien) einer Media-Playlist."""
+    sequence, segments, uris, duration = 0, [], [], 0.0
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#EXT-X-MEDIA-SEQUENCE:"):
+            sequence = int(line.split(":", 1)[1])
+        elif line.startswith("#EXTINF:"):
+            duration = float(line[8:].split(",", 1)[0])
+        elif line.startswith("#"):
+            uris += _URI.findall(line)   # EXT-X-MAP, EXT-X-PART, Preload-Hints
+        elif line:
+            segments.append((duration, line))
+            uris.append(line)
+    return sequence, segments, uris
+
+
+class SegmentCache:
+    """Playlists und Segmente aus OUTPUT_DIR im RAM, LRU-begrenzt auf MAX_BYTES."""
+
+    def __init__(self, directory, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._segments = OrderedDict()   # Name → Entry
+        self._playlists = {}             # Name → Playlist
+        self._bytes = 0
+        self._changed = threading.Condition()
+        self.stats = {"hits": 0, "misses": 0, "loads": 0, "evictions": 0, "mode": None}
+
+    # --- Laden / Verwerfen ---
+    def _read(self, name):
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                data = f.read()
+        except OSError:
+            return None
+        mimetype = MIMETYPES.get(os.path.splitext(name)[1], "application/octet-stream")
+        self.stats["loads"] += 1
+        return Entry(data, f"{stat.st_mtime_ns:x}-{len(data):x}", mimetype)
+
+    def refresh(self, name):
+        """Playlist neu laden und fehlende Segmente daraus nachladen."""
+        entry = self._read(name)
+        if entry is None:
+            return
+        sequence, segments, uris = parse_playlist(entry.data.decode(errors="replace"))
+        for uri in uris:
+            if "/" in uri or uri in self._segments:
+                continue
+            segment = self._read(uri)   # noch nicht vorhanden (Preload-Hint) → später
+            if segment is not None:
+                self._store(uri, segment)
+        with self._changed:
+            self._playlists[name] = Playlist(entry, sequence, segments, uris)
+            self._changed.notify_all()
+
+    def _store(self, name, entry):
+        with self._changed:
+            old = self._segments.pop(name, None)
+            if old is not None:
+                self._bytes -= len(old.data)
+            self._segments[name] = entry
+            self._bytes += len(entry.data)
+            while self._bytes > self.max_bytes and len(self._segments) > 1:
+                _, evicted = self._segments.popitem(last=False)
+                self._bytes -= len(evicted.data)
+                self.stats["evictions"] += 1
+
+    def evict(self, name):
+        with self._changed:
+            entry = self._segments.pop(name, None)
+            if entry is not None:
+                self._bytes -= len(entry.data)
+                self.stats["evictions"] += 1
+            self._playlists.pop(name, None)
+
+    def on_change(self, name):
+        if name.endswith(".m3u8"):
+            self.refresh(name)
+
+    # --- Lesen ---
+    def get(self, name, msn=None, timeout=BLOCK_TIMEOUT, block=False):
+        """Entry aus dem Cache.
+
+        Playlists mit msn warten, bis das Segment in der Playlist steht;
+        Segmente mit block=True (Preload-Hint), bis ffmpeg sie geschrieben hat.
+        """
+        with self._changed:
+            if name.endswith(".m3u8"):
+                if msn is not None:
+                    self.wait_for(name, lambda playlist: playlist.last_msn >= msn, timeout)
+                playlist = self._playlists.get(name)
+                entry = playlist.entry if playlist else None
+            else:
+                if block:
+                    self._changed.wait_for(lambda: name in self._segments, timeout)
+                entry = self._segments.get(name)
+                if entry is not None:
+                    self._segments.move_to_end(name)
+        self.stats["hits" if entry else "misses"] += 1
+        return entry
+
+    def playlist(self, name):
+        return self._playlists.get(name)
+
+    def wait_for(self, name, predicate, timeout=BLOCK_TIMEOUT):
+        """Warten, bis predicate(Playlist) erfüllt ist; liefert die Playlist (oder None)."""
+        with self._changed:
+            self._changed.wait_for(lambda: name in self._playlists and predicate(self._playlists[name]), timeout)
+            return self._playlists.get(name)
+
+    @property
+    def bytes(self):
+        return self._bytes
+
+
+# --- Watcher ---
+def _inotify(directory, on_change, on_delete):
+    """inotify-Schleife über ctypes; False, wenn inotify nicht verfügbar ist."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return False
+    if fd < 0:
+        return False
+    mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE | IN_MOVED_FROM
+    if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+        os.close(fd)
+        return False
+
+    def loop():
+        while True:
+            buffer = os.read(fd, 64 * 1024)
+            offset = 0
+            while offset < len(buffer):
+                _, event_mask, _, length = _EVENT.unpack_from(buffer, offset)
+                offset += _EVENT.size
+                name = buffer[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+                offset += length
+                try:
+                    if event_mask & (IN_DELETE | IN_MOVED_FROM):
+                        on_delete(name)
+                    else:
+                        on_change(name)
+                except Exception as e:
+                    print(f"[ERROR] HLS-Watcher: {e}")
+
+    threading.Thread(target=loop, name="hls-inotify", daemon=True).start()
+    return True
+
+
+def _poll(directory, on_change, on_delete, interval=POLL_INTERVAL):
+    def loop():
+        seen = {}
+        while True:
+            try:
+                current = {
+                    entry.name: (entry.stat().st_mtime_ns, entry.stat().st_size)
+                    for entry in os.scandir(directory)
+                }
+            except OSError:
+                current = {}
+            for name in seen.keys() - current.keys():
+                on_delete(name)
+            for name, state in current.items():
+                if seen.get(name) != state:
+                    on_change(name)
+            seen = current
+            time.sleep(interval)
+
+    threading.Thread(target=loop, name="hls-poll", daemon=True).start()
+
+
+# --- Globale Variablen ---
+_caches = {}   # Verzeichnis → SegmentCache (eins pro Kamera)
+_lock = threading.Lock()
+
+
+def cache(directory=None):
+    """Prozessweiter Cache für ein Ausgabeverzeichnis; der Watcher startet beim ersten Zugriff."""
+    directory = directory or config.OUTPUT_DIR
+    with _lock:
+        segment_cache = _caches.get(directory)
+        if segment_cache is None:
+            os.makedirs(directory, exist_ok=True)
+            segment_cache = _caches[directory] = SegmentCache(directory)
+            for name in os.listdir(directory):   # vorhandener Stand
+                segment_cache.on_change(name)
+            if _inotify(directory, segment_cache.on_change, segment_cache.evict):
+                segment_cache.stats["mode"] = "inotify"
+            else:
+                _poll(directory, segment_cache.on_change, segment_cache.evict)
+                segment_cache.stats["mode"] = "poll"
+        return segment_cache
+
+
+def _cache_requests():
+    totals = {("hit",): 0, ("miss",): 0}
+    for segment_cache in list(_caches.values()):
+        totals[("hit",)] += segment_cache.stats["hits"]
+        totals[("miss",)] += segment_cache.stats["misses"]
+    return totals
+
+
+metrics.Callback(
+    "hls_cache_bytes", "Belegter Speicher in den HLS-Segment-Caches",
+    lambda: sum(segment_cache.bytes for segment_cache in list(_caches.values())),
+)
+metrics.Callback(
+    "hls_cache_requests_total", "HLS-Requests aus dem Cache bzw. von der Platte",
+    _cache_requests, ("result",), "counter",
+)
+
+
+def serve(filename, directory=None):
+    """Response für eine HLS-Datei – aus dem Cache, sonst von der Platte."""
+    msn = request.args.get("_HLS_msn")
+    try:
+        msn = int(msn) if msn is not None else None
+    except ValueError:
+        abort(400, "_HLS_msn: Ganzzahl erwartet")
+
+    directory = directory or config.OUTPUT_DIR
+    entry = cache(directory).get(filename, msn)
+    if entry is None:
+        response = send_from_directory(directory, filename)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    response = Response(entry.data, mimetype=entry.mimetype)
+    response.set_etag(entry.etag)
+    response.headers["Cache-Control"] = PLAYLIST_CACHE if filename.endswith(".m3u8") else SEGMENT_CACHE
+    return response.make_conditional(request, accept_ranges=True, complete_length=len(entry.data))
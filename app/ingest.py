@@ -0,0 +1,182 @@
+# app/ingest.py
+#
+# Write-behind für Messwerte: sensor_loop legt Werte nur in eine Queue,
+# ein eigener Writer-Thread schreibt sie gebündelt (executemany, eine
+# Transaktion pro Batch) in die Datenbank. Optional lässt der Writer
+# nur die Stützpunkte der Kompression (app/compression.py) in readings,
+# die Rollups bekommen trotzdem jeden Messwert.
+
+import queue
+import threading
+import time
+from . import database, cache, compression, metrics
+
+# --- Einstellungen ---
+QUEUE_SIZE = 10000      # Max. wartende Messwerte
+BATCH_SIZE = 200        # Flush, sobald so viele Werte gesammelt sind ...
+FLUSH_INTERVAL = 2.0    # ... oder spätestens nach so vielen Sekunden
+PUT_TIMEOUT = 0.5       # Backpressure: so lange wartet submit() bei voller Queue
+DEBUG = True
+
+# --- Globale Variablen ---
+_queue = queue.Queue(maxsize=QUEUE_SIZE)
+_thread = None
+compressor = compression.Compressor()   # gehört dem Writer-Thread
+_STOP = object()
+_RESET = object()
+_lock = threading.Lock()
+stats = {
+    "queued": 0,    # angenommene Messwerte
+    "written": 0,   # geschriebene Messwerte (inkl. Rollups)
+    "archived": 0,  # davon als Zeile in readings (< written bei Kompression)
+    "dropped": 0,   # verworfen (Queue voll / Schreibfehler)
+    "batches": 0,   # Anzahl Commits
+    "errors": 0,    # fehlgeschlagene Commits
+}
+
+
+metrics.Callback("ingest_queue_depth", "Wartende Messwerte in der Ingest-Queue", _queue.qsize)
+metrics.Callback(
+    "ingest_values_total", "Messwerte nach Verbleib", lambda: {(key,): stats[key] for key in ("queued", "written", "archived", "dropped")},
+    ("state",), "counter",
+)
+
+
+def _count(key, n=1):
+    with _lock:
+        stats[key] += n
+
+
+# --- Annehmen ---
+def submit(sensor_id, timestamp, *values):
+    """Messwert (Werte in database.CHANNELS-Reihenfolge) einreihen.
+
+    False, wenn die Queue voll blieb und der Wert verworfen wurde.
+    """
+    timestamp = database.to_epoch_ms(timestamp)
+    # Latest-Cache sofort aktualisieren, nicht erst nach dem Commit
+    cache.latest.update(sensor_id, timestamp, *values)
+    try:
+        _queue.put((sensor_id, timestamp, *values), timeout=PUT_TIMEOUT)
+    except queue.Full:
+        _count("dropped")
+        if DEBUG:
+            print(f"[WARN] Ingest-Queue voll, Messwert von {sensor_id} verworfen")
+        return False
+    _count("queued")
+    return True
+
+
+# --- Schreiben ---
+def _write(batch, archive):
+    """Batch schreiben (archive = davon zu speichernde Zeilen); bei Fehler bleibt beides für den nächsten Versuch."""
+    try:
+        database.store_readings(batch, archive=archive)
+    except Exception as e:
+        _count("errors")
+        print(f"[ERROR] Ingest-Batch ({len(batch)} Werte): {e}")
+        # Nicht endlos puffern, wenn die DB dauerhaft nicht schreibbar ist
+        overflow = len(batch) - QUEUE_SIZE
+        if overflow > 0:
+            del batch[:overflow]
+            # archive ist nicht indexgleich mit batch: Stützpunkte vor dem ältesten verbliebenen Wert verwerfen
+            oldest = min(row[1] for row in batch)
+            archive[:] = [row for row in archive if row[1] >= oldest]
+            _count("dropped", overflow)
+        return False
+    _count("written", len(batch))
+    _count("archived", len(archive))
+    _count("batches")
+    batch.clear()
+    archive.clear()
+    return True
+
+
+def _writer():
+    batch, archive = [], []
+    deadline = None
+    while True:
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            item = _queue.get(timeout=timeout)
+        except queue.Empty:
+            item = None  # Zeitbudget abgelaufen
+
+        if item is _STOP:
+            archive.extend(compressor.flush())   # zurückgehaltene letzte Werte nicht verlieren
+            if batch or archive:
+                _write(batch, archive)
+            return
+        if item is _RESET:   # nach /clear: nicht an gelöschte Stützpunkte anknüpfen
+            compressor.reset()
+            continue
+        if isinstance(item, threading.Event):  # flush()
+            if batch:
+                _write(batch, archive)
+            item.set()
+            deadline = None if not batch else time.monotonic() + FLUSH_INTERVAL
+            continue
+        if item is not None:
+            batch.append(item)
+            archive.extend(compressor.add(item))
+            if deadline is None:
+                deadline = time.monotonic() + FLUSH_INTERVAL
+            if len(batch) < BATCH_SIZE:
+                continue
+
+        _write(batch, archive)
+        deadline = None if not batch else time.monotonic() + FLUSH_INTERVAL
+
+
+# --- Steuerung ---
+def start():
+    """Writer-Thread starten (idempotent)."""
+    global _thread
+    if _thread and _thread.is_alive():
+        return
+    compression.check()
+    _thread = threading.Thread(target=_writer, name="ingest-writer", daemon=True)
+    _thread.start()
+
+
+def flush(timeout=5.0):
+    """Alles bisher Eingereihte schreiben und warten, bis es committed ist."""
+    if not (_thread and _thread.is_alive()):
+        return False
+    done = threading.Event()
+    try:
+        _queue.put(done, timeout=timeout)
+    except queue.Full:
+        print("[WARN] Ingest-Queue voll, flush() abgebrochen")
+        return False
+    return done.wait(timeout)
+
+
+def reset(timeout=5.0):
+    """Kompressions-Zustand verwerfen (nach dem Löschen der Messwerte)."""
+    if not (_thread and _thread.is_alive()):
+        return False
+    try:
+        _queue.put(_RESET, timeout=timeout)
+    except queue.Full:
+        print("[WARN] Ingest-Queue voll, Kompressions-Zustand nicht zurückgesetzt")
+        return False
+    return True
+
+
+def stop(timeout=5.0):
+    """Restliche Werte schreiben und Writer-Thread beenden."""
+    global _thread
+    if not (_thread and _thread.is_alive()):
+        return
+    try:
+        _queue.put(_STOP, timeout=timeout)
+    except queue.Full:
+        print("[WARN] Ingest-Queue voll, Writer-Thread nicht beendet")
+        return
+    _thread.join(timeout)
+    if _thread.is_alive():
+        print("[WARN] Ingest-Writer nicht rechtzeitig beendet")
+    else:
+        print(f"[INFO] Ingest beendet: {stats['written']} geschrieben ({stats['archived']} gespeichert), {stats['dropped']} verworfen")
+    _thread = None
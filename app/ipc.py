@@ -0,0 +1,322 @@
+# app/ipc.py
+#
+# Produktionsmodus mit getrennten Prozessen: der Acquisition-Prozess
+# (run.py --daemon) besitzt I2C-Bus, ffmpeg und Ingest und verteilt über
+# einen Unix-Socket die Live-Werte an die Web-Worker. Jeder Worker hält
+# damit seine eigene Kopie von cache.latest, sensors.live_data, den
+# SSE-Events, den Messplan-Statistiken und dem Kamera-Status – ohne
+# Bus-Zugriff und ohne DB-Abfrage. Beim Verbinden gibt es zuerst einen
+# Snapshot, danach nur noch die einzelnen Events. Die Messwerte selbst liest der Worker wie
+# gehabt aus SQLite (WAL erlaubt parallele Leser).
+#
+# Über den Socket gehen Pickles; wer verbinden darf, kann im Empfänger Code
+# ausführen. Socket und Schlüssel liegen deshalb in einem privaten
+# Verzeichnis (0700, nur der eigene Benutzer), der Schlüssel ist pro Start
+# des Acquisition-Prozesses zufällig (0600-Datei) oder kommt aus
+# SENSOR_IPC_KEY.
+
+import json
+import os
+import queue
+import secrets
+import stat
+import tempfile
+import threading
+import time
+from multiprocessing.connection import Client, Listener, AuthenticationError
+from . import cache, database, events, ingest, sensors, stream
+from .ringbuffer import RingBuffer
+
+# --- Einstellungen ---
+RUNTIME_DIR = os.environ.get("SENSOR_IPC_DIR") or os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir(), f"sensor-dashboard-{os.getuid()}"
+)
+SOCKET_PATH = os.environ.get("SENSOR_IPC") or os.path.join(RUNTIME_DIR, "ipc.sock")   # Verzeichnis muss privat sein
+AUTHKEY = os.environ.get("SENSOR_IPC_KEY", "").encode() or None   # fest vorgegeben statt der Schlüsseldatei (key_file)
+CLIENT_QUEUE = 1000    # Nachrichten pro Worker; wer nicht hinterherkommt, wird getrennt
+STATS_INTERVAL = 5.0   # Sekunden zwischen zwei Messplan-Statistiken
+RECONNECT = 2.0        # Sekunden bis zum nächsten Verbindungsversuch
+
+# --- Globale Variablen ---
+publisher = None   # im Acquisition-Prozess
+mirror = None      # im Web-Worker
+
+
+# --- Schlüssel und Verzeichnis ---
+def private_dir(path):
+    """Verzeichnis anlegen bzw. prüfen: gehört uns und ist für niemanden sonst zugänglich."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"IPC-Verzeichnis {path} muss dem eigenen Benutzer gehören und 0700 sein")
+    return path
+
+
+def key_file(socket_path):
+    """Zufallsschlüssel liegt neben dem Socket im selben privaten Verzeichnis."""
+    return socket_path + ".key"
+
+
+def create_key(path):
+    """Neuen Zufallsschlüssel als 0600-Datei ablegen (Acquisition-Prozess); SENSOR_IPC_KEY hat Vorrang."""
+    if AUTHKEY:
+        return AUTHKEY
+    key = secrets.token_bytes(32)
+    tmp = f"{path}.{os.getpid()}"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    os.replace(tmp, path)   # Worker lesen nie eine halbe Datei
+    return key
+
+
+def read_key(path):
+    """Schlüssel des laufenden Acquisition-Prozesses (Web-Worker); None, solange es keinen gibt."""
+    if AUTHKEY:
+        return AUTHKEY
+    try:
+        with open(path, "rb") as f:
+            return f.read() or None
+    except FileNotFoundError:
+        return None
+
+
+# --- Acquisition-Prozess ---
+def snapshot():
+    """Aktueller Stand für einen neu verbundenen Worker."""
+    _, latest = cache.latest.snapshot()
+    live = {name: (buffer.capacity, *buffer.snapshot()) for name, buffer in sensors.live_data.items()}
+    return {
+        "latest": latest,
+        "live": live,
+        "acquisition": sensors.acquisition_stats(),
+        "cameras": stream.supervisor.status(),
+    }
+
+
+class _Client:
+    __slots__ = ("conn", "queue", "closed")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.queue = queue.Queue(maxsize=CLIENT_QUEUE)
+        self.closed = False
+
+
+class Publisher:
+    """Nimmt Worker-Verbindungen an und verteilt Snapshot, Events und Statistiken."""
+
+    def __init__(self, path=SOCKET_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._clients = set()
+        self._stop = threading.Event()
+        self._listener = None
+
+    def start(self):
+        private_dir(os.path.dirname(os.path.abspath(self.path)))
+        key = create_key(key_file(self.path))
+        if os.path.exists(self.path):
+            os.unlink(self.path)   # Socket eines früheren Laufs
+        self._listener = Listener(self.path, "AF_UNIX", authkey=key)
+        for target in (self._accept, self._forward, self._stats):
+            threading.Thread(target=target, name=f"ipc{target.__name__}", daemon=True).start()
+        print(f"[INFO] IPC: warte auf Web-Worker an {self.path}")
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            clients, self._clients = self._clients, set()
+        for client in clients:
+            self._close(client)
+        if self._listener:
+            self._listener.close()
+            for path in (self.path, key_file(self.path)):
+                if os.path.exists(path):
+                    os.unlink(path)
+
+    def broadcast(self, kind, payload):
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                client.queue.put_nowait((kind, payload))
+            except queue.Full:
+                print("[WARN] IPC: Worker kommt nicht hinterher, Verbindung getrennt")
+                self._drop(client)
+
+    def _drop(self, client):
+        with self._lock:
+            self._clients.discard(client)
+        self._close(client)
+
+    def _close(self, client):
+        if not client.closed:
+            client.closed = True
+            try:
+                client.queue.put_nowait(None)   # Sender-Thread wecken und beenden
+            except queue.Full:
+                pass
+            client.conn.close()
+
+    def _accept(self):
+        while not self._stop.is_set():
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                continue
+            client = _Client(conn)
+            # Snapshot zuerst in die Queue, erst dann Events – unter dem Lock geht keins verloren
+            with self._lock:
+                client.queue.put_nowait(("snapshot", snapshot()))
+                self._clients.add(client)
+            threading.Thread(target=self._send, args=(client,), daemon=True).start()
+            threading.Thread(target=self._receive, args=(client,), daemon=True).start()
+
+    def _send(self, client):
+        while True:
+            message = client.queue.get()
+            if message is None or client.closed:
+                return
+            try:
+                client.conn.send(message)
+            except (OSError, ValueError):
+                self._drop(client)
+                return
+
+    def _receive(self, client):
+        """Kommandos der Worker (derzeit nur "clear" nach /clear)."""
+        while not client.closed:
+            try:
+                kind, _ = client.conn.recv()
+            except (OSError, EOFError, ValueError):
+                self._drop(client)
+                return
+            if kind == "clear":
+                ingest.reset()
+                cache.latest.clear()
+                for buffer in sensors.live_data.values():
+                    buffer.clear()
+                self.broadcast("clear", None)
+
+    def _forward(self):
+        sub = events.broker.subscribe()
+        while not self._stop.is_set():
+            if sub.closed:   # vom Broker entfernt, neu abonnieren
+                sub = events.broker.subscribe()
+            try:
+                message = sub.queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            self.broadcast("event", message)
+        events.broker.unsubscribe(sub)
+
+    def _stats(self):
+        while not self._stop.wait(STATS_INTERVAL):
+            self.broadcast("stats", sensors.acquisition_stats())
+            self.broadcast("cameras", stream.supervisor.status())
+
+
+def serve(path=SOCKET_PATH):
+    """Publisher im Acquisition-Prozess starten (idempotent)."""
+    global publisher
+    if publisher is None:
+        publisher = Publisher(path)
+        publisher.start()
+    return publisher
+
+
+# --- Web-Worker ---
+class Mirror:
+    """Hält die Live-Zustände eines Workers mit dem Acquisition-Prozess synchron."""
+
+    def __init__(self, path=SOCKET_PATH):
+        self.path = path
+        self.acquisition = None   # letzte Messplan-Statistik
+        self.cameras = None       # letzter Status der Kamera-Pipelines
+        self.connected = False
+        self._conn = None
+
+    def start(self):
+        threading.Thread(target=self._run, name="ipc-mirror", daemon=True).start()
+
+    def send(self, kind, payload=None):
+        try:
+            self._conn.send((kind, payload))
+            return True
+        except (AttributeError, OSError, ValueError):
+            return False
+
+    def _run(self):
+        while True:
+            key = read_key(key_file(self.path))
+            try:
+                if key is None:
+                    raise FileNotFoundError("kein IPC-Schlüssel")   # Acquisition-Prozess noch nicht gestartet
+                self._conn = Client(self.path, "AF_UNIX", authkey=key)
+            except (OSError, EOFError, AuthenticationError):
+                time.sleep(RECONNECT)
+                continue
+            self.connected = True
+            try:
+                while True:
+                    self._handle(*self._conn.recv())
+            except (OSError, EOFError):
+                pass
+            except Exception as e:
+                # Fehler beim Übernehmen einer Nachricht: neu verbinden, der Snapshot stellt den Stand wieder her
+                print(f"[ERROR] IPC: Nachricht nicht verarbeitet: {e!r}")
+            self.connected = False
+            self._conn.close()
+            print("[WARN] IPC: Verbindung zum Acquisition-Prozess verloren")
+            time.sleep(RECONNECT)
+
+    def _handle(self, kind, payload):
+        if kind == "event":
+            events.broker.relay(payload)
+            _, event, data = payload
+            if event == "reading":
+                self._apply(json.loads(data))
+        elif kind == "snapshot":
+            database.load_channels()   # neue Kanäle aus dem Bus-Scan des Acquisition-Prozesses
+            for sensor_id, entry in payload["latest"].items():
+                cache.latest.update(sensor_id, entry["timestamp"], *database.entry_values(entry))
+            buffers = {}
+            for name, (capacity, ts, values) in payload["live"].items():
+                buffer = buffers[name] = RingBuffer(capacity, values.shape[1])
+                for t, row in zip(ts.tolist(), values.tolist()):
+                    buffer.append(t, row)
+            sensors.live_data = buffers
+            self.acquisition = payload["acquisition"]
+            self.cameras = payload["cameras"]
+        elif kind == "stats":
+            self.acquisition = payload
+        elif kind == "cameras":
+            self.cameras = payload
+        elif kind == "clear":
+            cache.latest.clear()
+            for buffer in sensors.live_data.values():
+                buffer.clear()
+
+    def _apply(self, readings):
+        known = {database.channel_key(channel) for channel in database.CHANNELS}
+        if any(key not in known for entry in readings.values() for key in entry if key != "timestamp"):
+            database.load_channels()   # Kanal nach dem Snapshot hinzugekommen
+        for sensor_id, entry in readings.items():
+            values = database.entry_values(entry)
+            cache.latest.update(sensor_id, entry["timestamp"], *values)
+            buffer = sensors.live_data.get(sensor_id)
+            if buffer is None:
+                continue
+            last = buffer.latest()
+            if last is None or entry["timestamp"] > last[0]:   # schon im Snapshot enthalten?
+                buffer.append(entry["timestamp"], values[:buffer.channels])
+
+
+def start_mirror(path=SOCKET_PATH):
+    """Im Web-Worker: Live-Zustände vom Acquisition-Prozess beziehen (idempotent)."""
+    global mirror
+    if mirror is None:
+        mirror = Mirror(path)
+        mirror.start()
+    return mirror
@@ -0,0 +1,230 @@
+# app/llhls.py
+#
+# Low-Latency-HLS für das Stream-Profil "ll". ffmpeg schreibt kurze
+# fMP4-Teilsegmente (part<N>.m4s) in parts.m3u8; hier wird daraus die
+# LL-Playlist live.m3u8 gebaut:
+#   - je `parts_per_segment` Teilsegmente bilden ein Segment seg/<S>.m4s,
+#     das beim Abruf aus den Teilen zusammengesetzt wird (fMP4-Fragmente
+#     lassen sich hintereinanderhängen),
+#   - die letzten Segmente tragen zusätzlich EXT-X-PART-Zeilen,
+#   - EXT-X-PRELOAD-HINT zeigt auf das nächste Teilsegment; ein Request
+#     darauf wartet, bis ffmpeg es fertig hat,
+#   - ?_HLS_msn=S&_HLS_part=P blockiert, bis Teil P von Segment S da ist,
+#   - Teile, die mit einem Keyframe beginnen (Sample-Flags im trun des
+#     moof), tragen INDEPENDENT=YES – dort kann ein Player einsteigen.
+
+import math
+import re
+import struct
+import zlib
+from flask import Response, request, abort
+from . import hls, stream
+
+# --- Einstellungen ---
+PART_SEGMENTS = 3        # Segmente am Ende der Playlist mit EXT-X-PART-Zeilen
+_NUMBER = re.compile(r"(\d+)(\.\w+)$")
+_SEGMENT = re.compile(r"^seg/(\d+)\.m4s$")
+NON_SYNC = 0x00010000    # sample_is_non_sync_sample in den ISO-BMFF-Sample-Flags
+MEMO_SIZE = 1000         # gemerkte Keyframe-Prüfungen, danach von vorn
+
+_independent = {}   # {(Verzeichnis, URI, ETag): True/False/None}
+
+
+def _parts(playlist):
+    """[(Teil-MSN, Dauer, URI), ...] aus parts.m3u8."""
+    return [(playlist.sequence + i, duration, uri) for i, (duration, uri) in enumerate(playlist.segments)]
+
+
+def _next_uri(uri):
+    """part41.m4s → part42.m4s (ffmpeg nummeriert die Teilsegmente fortlaufend)."""
+    match = _NUMBER.search(uri)
+    if not match:
+        return None
+    return uri[:match.start()] + str(int(match.group(1)) + 1) + match.group(2)
+
+
+def _boxes(data, start=0, end=None):
+    """(Typ, Inhalt-Anfang, Ende) der ISO-BMFF-Boxen in data[start:end]."""
+    end = len(data) if end is None else end
+    while start + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, start)
+        header = 8
+        if size == 1:
+            if start + 16 > end:
+                return
+            size, header = struct.unpack_from(">Q", data, start + 8)[0], 16
+        elif size == 0:
+            size = end - start   # bis zum Ende
+        if size < header or start + size > end:
+            return
+        yield kind, start + header, start + size
+        start += size
+
+
+def _first_sample_flags(data, start, end):
+    """Flags des ersten Samples eines traf (first_sample_flags, Sample-Tabelle oder Default aus tfhd)."""
+    default = None
+    for kind, body, _ in _boxes(data, start, end):
+        flags = int.from_bytes(data[body + 1:body + 4], "big")
+        if kind == b"tfhd":
+            offset = body + 8   # Version/Flags, track_ID
+            for bit, size in ((0x01, 8), (0x02, 4), (0x08, 4), (0x10, 4)):   # base_data_offset ... default_sample_size
+                if flags & bit:
+                    offset += size
+            if flags & 0x20:
+                default = struct.unpack_from(">I", data, offset)[0]
+        elif kind == b"trun":
+            if not struct.unpack_from(">I", data, body + 4)[0]:
+                return None   # keine Samples
+            offset = body + 8 + (4 if flags & 0x01 else 0)   # data_offset
+            if flags & 0x04:
+                return struct.unpack_from(">I", data, offset)[0]
+            if flags & 0x400:
+                offset += 4 * (bool(flags & 0x100) + bool(flags & 0x200))   # sample_duration, sample_size
+                return struct.unpack_from(">I", data, offset)[0]
+            return default
+    return None
+
+
+def starts_independent(data):
+    """True, wenn das erste Sample im ersten moof ein Keyframe ist; None, wenn die Flags fehlen."""
+    try:
+        for kind, body, end in _boxes(data):
+            if kind != b"moof":
+                continue
+            for kind, traf, traf_end in _boxes(data, body, end):
+                if kind == b"traf":
+                    flags = _first_sample_flags(data, traf, traf_end)
+                    return None if flags is None else not flags & NON_SYNC
+            return None
+    except struct.error:   # abgeschnittene Box
+        return None
+    return None
+
+
+def _part_independent(cache, uri):
+    entry = cache.get(uri)
+    if entry is None:
+        return None
+    key = (cache.directory, uri, entry.etag)
+    if key not in _independent:
+        if len(_independent) >= MEMO_SIZE:
+            _independent.clear()
+        _independent[key] = starts_independent(entry.data)
+    return _independent[key]
+
+
+def render(playlist, part_time, per_segment, independent=None):
+    """LL-Playlist-Text aus der Teilsegment-Playlist von ffmpeg.
+
+    independent(uri) → True für Teile, die mit einem Keyframe beginnen.
+    """
+    parts = _parts(playlist)
+    # Erst ab dem ersten vollständigen Segment (älteste Teile fallen sonst mitten heraus)
+    first = math.ceil(parts[0][0] / per_segment) if parts else 0
+    parts = [part for part in parts if part[0] >= first * per_segment]
+    groups = {}
+    for part in parts:
+        groups.setdefault(part[0] // per_segment, []).append(part)
+
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:9",
+        f"#EXT-X-TARGETDURATION:{math.ceil(part_time * per_segment)}",
+        f"#EXT-X-PART-INF:PART-TARGET={part_time:.3f}",
+        f"#EXT-X-SERVER-CONTROL:CAN-BLOCK-RELOAD=YES,PART-HOLD-BACK={3 * part_time:.3f}",
+        f"#EXT-X-MEDIA-SEQUENCE:{first}",
+        '#EXT-X-MAP:URI="init.mp4"',
+    ]
+    numbers = sorted(groups)
+    for i, number in enumerate(numbers):
+        group = groups[number]
+        if i >= len(numbers) - PART_SEGMENTS - 1:
+            lines += [
+                f'#EXT-X-PART:DURATION={duration:.3f},URI="{uri}"'
+                + (",INDEPENDENT=YES" if independent and independent(uri) else "")
+                for _, duration, uri in group
+            ]
+        if len(group) == per_segment:
+            lines += [f"#EXTINF:{sum(duration for _, duration, _ in group):.3f},", f"seg/{number}.m4s"]
+    if parts:
+        hint = _next_uri(parts[-1][2])
+        if hint:
+            lines.append(f'#EXT-X-PRELOAD-HINT:TYPE=PART,URI="{hint}"')
+    return "\n".join(lines) + "\n"
+
+
+def _int_arg(name):
+    value = request.args.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        abort(400, f"{name}: Ganzzahl erwartet")
+
+
+def playlist_response(directory, settings):
+    per_segment = settings["parts_per_segment"]
+    msn, part = _int_arg("_HLS_msn"), _int_arg("_HLS_part")
+    cache = hls.cache(directory)
+    if msn is not None:
+        # Ohne _HLS_part: warten, bis das ganze Segment fertig ist
+        target = msn * per_segment + (per_segment - 1 if part is None else part)
+        playlist = cache.wait_for(settings["playlist"], lambda p: p.last_msn >= target)
+    else:
+        playlist = cache.playlist(settings["playlist"])
+    if playlist is None or not playlist.segments:
+        abort(404, "Stream noch nicht bereit")
+
+    body = render(playlist, settings["part_time"], per_segment, lambda uri: _part_independent(cache, uri))
+    response = Response(body, mimetype=hls.MIMETYPES[".m3u8"])
+    response.set_etag(f"{zlib.crc32(body.encode()):x}")
+    response.headers["Cache-Control"] = hls.PLAYLIST_CACHE
+    return response.make_conditional(request)
+
+
+def segment_response(directory, settings, number):
+    """Segment S = Teilsegmente S*k … S*k+k-1 hintereinander."""
+    per_segment = settings["parts_per_segment"]
+    cache = hls.cache(directory)
+    playlist = cache.playlist(settings["playlist"])
+    if playlist is None:
+        abort(404)
+    uris = {msn: uri for msn, _, uri in _parts(playlist)}
+    chunks = []
+    for msn in range(number * per_segment, (number + 1) * per_segment):
+        entry = cache.get(uris[msn]) if msn in uris else None
+        if entry is None:
+            abort(404)
+        chunks.append(entry.data)
+    data = b"".join(chunks)
+    response = Response(data, mimetype=hls.MIMETYPES[".m4s"])
+    response.set_etag(f"{zlib.crc32(data):x}")
+    response.headers["Cache-Control"] = hls.SEGMENT_CACHE
+    return response.make_conditional(request, accept_ranges=True, complete_length=len(data))
+
+
+def part_response(directory, filename):
+    """Teilsegment aus dem Preload-Hint: warten, bis ffmpeg es geschrieben hat."""
+    entry = hls.cache(directory).get(filename, block=True)
+    if entry is None:
+        abort(404)
+    response = Response(entry.data, mimetype=entry.mimetype)
+    response.set_etag(entry.etag)
+    response.headers["Cache-Control"] = hls.SEGMENT_CACHE
+    return response
+
+
+def serve(filename, directory=None, settings=None):
+    """Response für LL-spezifische Pfade, sonst None (→ hls.serve)."""
+    settings = settings or stream.main_profile()
+    if settings["name"] != "ll":
+        return None
+    if filename == settings["public"]:
+        return playlist_response(directory, settings)
+    match = _SEGMENT.match(filename)
+    if match:
+        return segment_response(directory, settings, int(match.group(1)))
+    playlist = hls.cache(directory).playlist(settings["playlist"])
+    if playlist and playlist.segments and filename == _next_uri(playlist.segments[-1][1]):
+        return part_response(directory, filename)
+    return None
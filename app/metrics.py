@@ -0,0 +1,235 @@
+# app/metrics.py
+#
+# Schlanke Metriken im Prometheus-Textformat für /metrics, ohne externe
+# Abhängigkeit. Zähler und Histogramme werden beim Ereignis fortgeschrieben
+# (ein Lock, ein dict-Zugriff), alles, was ohnehin irgendwo gezählt wird
+# (Scheduler, Ingest, HLS-Dateien), liefert eine Callback-Metrik erst beim
+# Abruf von /metrics.
+
+import bisect
+import functools
+import inspect
+import threading
+import time
+from flask import g, request
+
+# --- Einstellungen ---
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        if not self.label_names and self.kind in ("counter", "gauge"):
+            self._values[()] = 0   # ohne Labels von Anfang an mit 0 exportieren
+        REGISTRY.append(self)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.label_names, key)} {_number(value)}" for key, value in items]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][i] += 1
+            state[1] += value
+
+    def render(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = self.header()
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class Callback(_Metric):
+    """Werte erst beim Abruf: fn() liefert {(label, ...): wert} bzw. einen einzelnen Wert."""
+
+    def __init__(self, name, help, fn, labels=(), kind="gauge"):
+        super().__init__(name, help, labels)
+        self.kind = kind
+        self.fn = fn
+
+    def render(self):
+        try:
+            values = self.fn()
+        except Exception:
+            return []
+        if not isinstance(values, dict):
+            values = {} if values is None else {(): values}
+        return self.header() + [
+            f"{self.name}{_labels(self.label_names, key)} {_number(value)}"
+            for key, value in sorted(values.items()) if value is not None
+        ]
+
+
+def render():
+    """Alle Metriken im Prometheus-Textformat."""
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+def serve(port, host="0.0.0.0"):
+    """/metrics auf eigenem Port (Acquisition-Prozess ohne Flask)."""
+    from wsgiref.simple_server import make_server, WSGIRequestHandler
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    def wsgi(environ, start_response):
+        start_response("200 OK", [("Content-Type", CONTENT_TYPE)])
+        return [render().encode()]
+
+    server = make_server(host, port, wsgi, handler_class=QuietHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+# --- Web-Schicht ---
+http_requests = Counter("http_requests_total", "HTTP-Requests nach Route und Status", ("route", "method", "status"))
+http_duration = Histogram(
+    "http_request_duration_seconds", "Dauer bis zur Response (Streaming: bis zum ersten Byte)", ("route", "method")
+)
+http_in_flight = Gauge("http_requests_in_flight", "Gerade laufende Requests", ("route",))
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    http_in_flight.inc(_route())
+
+
+def _after_request(response):
+    http_requests.inc(_route(), request.method, str(response.status_code))
+    return response
+
+
+def _teardown_request(exc):
+    started = g.pop("metrics_started", None)
+    if started is None:
+        return
+    route = _route()
+    http_duration.observe(time.perf_counter() - started, route, request.method)
+    http_in_flight.dec(route)
+
+
+def init_app(app):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+
+
+# --- Datenbank ---
+db_query_duration = Histogram(
+    "db_query_duration_seconds", "Laufzeit der database.*-Funktionen", ("function",), QUERY_BUCKETS
+)
+db_query_errors = Counter("db_query_errors_total", "Fehlgeschlagene database.*-Aufrufe", ("function",))
+
+
+def timed_query(fn):
+    """Decorator: Laufzeit (bei Generatoren bis zum Ende der Iteration) und Fehler messen."""
+    name = f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"   # z.B. database.get_readings
+
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def generator(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                yield from fn(*args, **kwargs)
+            except GeneratorExit:
+                raise
+            except Exception:
+                db_query_errors.inc(name)
+                raise
+            finally:
+                db_query_duration.observe(time.perf_counter() - started, name)
+        return generator
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            db_query_errors.inc(name)
+            raise
+        finally:
+            db_query_duration.observe(time.perf_counter() - started, name)
+    return wrapper
@@ -0,0 +1,74 @@
+# app/migrate.py
+#
+# Online-Migration readings v1 → v2. init_db() hat die alte Tabelle nur in
+# readings_v1 umbenannt; hier werden die Zeilen in kleinen Transaktionen
+# nach readings kopiert (timestamp TEXT → ts Epoch-ms) und aus readings_v1
+# gelöscht. Zwischen den Chunks kommt der Ingest-Writer wieder an die DB,
+# ein Abbruch ist jederzeit möglich und wird beim nächsten Start fortgesetzt.
+
+import time
+from . import database
+
+# --- Einstellungen ---
+CHUNK_ROWS = 5000   # Zeilen pro Transaktion
+PAUSE = 0.05        # Sekunden Pause zwischen den Chunks
+
+
+def step(chunk_rows=CHUNK_ROWS):
+    """Einen Chunk migrieren. Gibt die Anzahl kopierter Zeilen zurück, None wenn fertig."""
+    with database.connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            last_id = conn.execute(
+                "SELECT MAX(id) FROM (SELECT id FROM readings_v1 ORDER BY id LIMIT ?)",
+                (chunk_rows,)
+            ).fetchone()[0]
+            if last_id is None:
+                conn.execute("DROP TABLE readings_v1")
+                conn.commit()
+                return None
+            # Alte Zeitstempel sind lokale Zeit; 'utc' rechnet nach UTC um
+            copied = conn.execute("""
+                INSERT OR IGNORE INTO readings (id, sensor_id, ts, temperature, humidity)
+                SELECT id, CAST(sensor_id AS TEXT),
+                       CAST(strftime('%s', timestamp, 'utc') AS INTEGER) * 1000,
+                       temperature, humidity
+                FROM readings_v1
+                WHERE id <= ? AND strftime('%s', timestamp, 'utc') IS NOT NULL
+            """, (last_id,)).rowcount
+            skipped = conn.execute(
+                "SELECT COUNT(*) FROM readings_v1 WHERE id <= ? AND strftime('%s', timestamp, 'utc') IS NULL",
+                (last_id,)
+            ).fetchone()[0]
+            conn.execute("DELETE FROM readings_v1 WHERE id <= ?", (last_id,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    if skipped:
+        print(f"[WARN] Migration: {skipped} Zeilen mit unlesbarem Zeitstempel verworfen (IDs bis {last_id})")
+    return copied
+
+
+def run(chunk_rows=CHUNK_ROWS, pause=PAUSE):
+    """Migration bis zum Ende durchlaufen lassen."""
+    if not database.migration_pending():
+        return 0
+    total = chunks = 0
+    started = time.monotonic()
+    while True:
+        copied = step(chunk_rows)
+        if copied is None:
+            break
+        total += copied
+        chunks += 1
+        if chunks % 100 == 0:
+            print(f"[INFO] Migration: {total} Zeilen übernommen")
+        time.sleep(pause)
+    print(f"[INFO] Migration readings v1 → v2 fertig: {total} Zeilen in {time.monotonic() - started:.1f}s")
+    return total
+
+
+if __name__ == "__main__":
+    database.init_db()
+    run()
@@ -0,0 +1,162 @@
+# app/query.py
+#
+# Zeitbereichs-Abfragen für externe Tools (/api/query): ein oder alle
+# Sensoren, von/bis, optional zu Buckets gruppiert (avg/min/max/count/last).
+# Gruppiert wird in SQLite über Bereichsscans im Covering-Index bzw. – wenn
+# die Bucket-Breite ein Vielfaches einer Rollup-Auflösung ist – direkt aus
+# der Rollup-Tabelle. Große Ergebnisse werden mit Keyset-Cursorn geblättert
+# (Sensor, Zeitpunkt, ID) statt mit OFFSET: jede Seite setzt per Index genau
+# hinter der letzten Zeile der vorherigen an.
+#
+# Mit Kompression (app/compression.py) enthält readings nur Stützpunkte;
+# Buckets kommen dann ausschließlich aus den Rollups, die weiterhin jeden
+# Messwert enthalten.
+
+import base64
+import json
+import re
+from . import compression, database, metrics, rollups
+
+# --- Einstellungen ---
+AGGREGATES = ("avg", "min", "max", "count", "last")
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 10000
+UNITS = {"ms": 1, "s": 1000, "m": 60_000, "h": 3_600_000, "d": 86_400_000}
+_BUCKET = re.compile(r"^(\d+)(ms|s|m|h|d)?$")
+
+
+def parse_bucket(value):
+    """"30s", "5m", "1h", "1d" oder Millisekunden → Bucket-Breite in ms (None = Rohwerte)."""
+    if not value:
+        return None
+    match = _BUCKET.match(value.strip())
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError("bucket: z.B. 30s, 5m, 1h, 1d oder Millisekunden")
+    return int(match.group(1)) * UNITS[match.group(2) or "ms"]
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(value):
+    """Cursor → [sensor_id, ts, id]; ValueError bei fremden/kaputten Werten."""
+    if not value:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("cursor: ungültig")
+    if not (isinstance(key, list) and len(key) == 3 and isinstance(key[0], str)
+            and all(isinstance(part, int) for part in key[1:])):
+        raise ValueError("cursor: ungültig")
+    return key
+
+
+def _rollup_for(width, agg):
+    """Gröbste Rollup-Auflösung, aus der sich Buckets der Breite width exakt zusammensetzen."""
+    if agg == "last":
+        return None   # Rollups kennen keinen letzten Wert
+    for name, resolution in sorted(rollups.RESOLUTIONS.items(), key=lambda item: -item[1]):
+        if width % resolution == 0:
+            return name
+    return None
+
+
+def _columns_raw(agg):
+    channels = database.CHANNELS
+    if agg == "last":
+        # Bare Columns: SQLite liefert sie aus der Zeile mit MAX(ts)
+        return "MAX(ts), " + ", ".join(channels)
+    function = {"avg": "AVG", "min": "MIN", "max": "MAX", "count": "COUNT"}[agg]
+    return ", ".join(f"{function}({ch})" for ch in channels)
+
+
+def _columns_rollup(agg):
+    return ", ".join({
+        "avg": f"SUM({ch}_sum) / NULLIF(SUM({ch}_n), 0)",
+        "min": f"MIN({ch}_min)",
+        "max": f"MAX({ch}_max)",
+        "count": f"SUM({ch}_n)",
+    }[agg] for ch in database.CHANNELS)
+
+
+def _sql(width, agg, source):
+    """SELECT für einen Sensor ab einer Position; Ergebniszeilen (ts bzw. Bucket, id, *channels).
+
+    Rohwerte setzen hinter (ts, id) an (gleiche Zeitstempel möglich), Buckets
+    einfach beim nächsten Bucket.
+    """
+    if width is None:
+        return (
+            f"SELECT ts, id, {', '.join(database.CHANNELS)} FROM readings "
+            "WHERE sensor_id = ? AND ts >= ? AND ts < ? AND (ts > ? OR id > ?) "
+            "ORDER BY ts, id LIMIT ?"
+        )
+    if source == "raw":
+        return (
+            f"SELECT ts / {width} * {width} AS b, 0, {_columns_raw(agg)} FROM readings "
+            "WHERE sensor_id = ? AND ts >= ? AND ts < ? "
+            "GROUP BY b ORDER BY b LIMIT ?"
+        )
+    return (
+        f"SELECT bucket / {width} * {width} AS b, 0, {_columns_rollup(agg)} FROM {rollups.table(source)} "
+        "WHERE sensor_id = ? AND bucket >= ? AND bucket < ? "
+        "GROUP BY b ORDER BY b LIMIT ?"
+    )
+
+
+@metrics.timed_query
+def fetch(start, end, sensor_id=None, width=None, agg="avg", cursor=None, limit=DEFAULT_LIMIT):
+    """Eine Seite {"source", "from", "to", "columns", "rows", "next"}.
+
+    Mit Buckets werden from/to auf Bucket-Grenzen erweitert, damit jeder
+    Bucket vollständig ist (und Rollups exakt passen).
+    """
+    if agg not in AGGREGATES:
+        raise ValueError(f"agg: eines von {', '.join(AGGREGATES)}")
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    source = "raw"
+    if width is not None:
+        start = start // width * width
+        end = -(-end // width) * width
+        source = _rollup_for(width, agg) or "raw"
+        if source == "raw" and compression.enabled():
+            # Aggregate über Stützpunkte wären falsch (Mittelwert, Anzahl, letzter Messwert)
+            minimum = min(rollups.RESOLUTIONS.values()) // 1000
+            raise ValueError(
+                f"bucket: bei Kompression ein Vielfaches von {minimum}s, agg=last nicht möglich"
+            )
+    sql = _sql(width, agg, source)
+    skip = 1 if width is not None and agg == "last" else 0   # MAX(ts)-Spalte nicht ausgeben
+
+    sensors = [sensor_id] if sensor_id is not None else database.sensor_ids()
+    if cursor is not None:
+        sensors = [sensor for sensor in sensors if sensor >= cursor[0]]
+    rows = []
+    with database.connection() as conn:
+        for sensor in sensors:
+            resume = cursor is not None and sensor == cursor[0]
+            remaining = limit + 1 - len(rows)
+            if width is None:
+                after_ts, after_id = (cursor[1], cursor[2]) if resume else (start - 1, -1)
+                params = (sensor, max(start, after_ts), end, after_ts, after_id, remaining)
+            else:
+                params = (sensor, cursor[1] + width if resume else start, end, remaining)
+            rows += [(sensor, *row) for row in conn.execute(sql, params)]
+            if len(rows) > limit:
+                break
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        sensor, key, row_id = rows[-1][:3]
+        next_cursor = encode_cursor([sensor, key, row_id])
+    return {
+        "source": "raw" if source == "raw" else rollups.table(source),
+        "from": start,
+        "to": end,
+        "columns": ["sensor", "ts", *database.CHANNELS],
+        "rows": [[row[0], row[1], *row[3 + skip:]] for row in rows],
+        "next": next_cursor,
+    }
@@ -0,0 +1,143 @@
+# app/retention.py
+#
+# Aufbewahrung: ein Hintergrund-Job löscht regelmäßig alles, was älter als
+# die Policy der jeweiligen Auflösung ist – in kleinen Chunks, damit der
+# Ingest-Writer zwischendurch an die DB kommt – und gibt den Platz per
+# incremental_vacuum wieder frei.
+
+import threading
+import time
+from . import database, metrics, rollups
+
+# --- Einstellungen ---
+POLICIES = {         # Auflösung → Aufbewahrung in Tagen (None = für immer)
+    "raw": 40,
+    "1m": 365,
+    "1h": None,
+    "1d": None,
+}
+INTERVAL = 3600      # Sekunden zwischen zwei Läufen
+CHUNK_ROWS = 2000    # Zeilen pro DELETE-Transaktion
+PAUSE = 0.02         # Sekunden Pause zwischen den Chunks
+VACUUM_PAGES = 2000  # Seiten pro incremental_vacuum-Schritt
+
+# --- Globale Variablen ---
+_stop = threading.Event()
+_thread = None
+stats = {
+    "runs": 0,
+    "rows_purged": {name: 0 for name in POLICIES},
+    "pages_freed": 0,
+    "seconds": 0.0,          # Gesamtzeit aller Läufe
+    "last_run": None,        # Epoch-ms
+    "last_duration": None,   # Sekunden
+}
+
+
+metrics.Callback(
+    "retention_rows_purged_total", "Von der Aufbewahrung gelöschte Zeilen",
+    lambda: {(name,): n for name, n in stats["rows_purged"].items()}, ("resolution",), "counter",
+)
+metrics.Callback("retention_seconds_total", "Gesamtdauer der Aufbewahrungsläufe", lambda: stats["seconds"], kind="counter")
+metrics.Callback("retention_pages_freed_total", "Per incremental_vacuum freigegebene Seiten", lambda: stats["pages_freed"], kind="counter")
+
+
+def _delete_sql(name):
+    if name == "raw":
+        # Chunk über den ts-Index auswählen und per rowid löschen
+        return "DELETE FROM readings WHERE id IN (SELECT id FROM readings WHERE ts < ? ORDER BY ts LIMIT ?)"
+    table = rollups.table(name)
+    return (
+        f"DELETE FROM {table} WHERE (sensor_id, bucket) IN "
+        f"(SELECT sensor_id, bucket FROM {table} WHERE bucket < ? LIMIT ?)"
+    )
+
+
+def purge(name, cutoff, chunk_rows=CHUNK_ROWS, pause=PAUSE):
+    """Alle Zeilen der Auflösung vor `cutoff` (Epoch-ms) chunkweise löschen."""
+    sql = _delete_sql(name)
+    total = 0
+    while not _stop.is_set():
+        with database.connection() as conn, conn:
+            deleted = conn.execute(sql, (cutoff, chunk_rows)).rowcount
+        total += deleted
+        if deleted < chunk_rows:
+            break
+        time.sleep(pause)
+    return total
+
+
+def vacuum(pages=VACUUM_PAGES):
+    """Freie Seiten an das Dateisystem zurückgeben (nur mit auto_vacuum=INCREMENTAL)."""
+    freed = 0
+    with database.connection() as conn:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return 0
+        while not _stop.is_set():
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if not free:
+                break
+            # executescript läuft das Pragma bis zum Ende durch (execute() gibt nur eine Seite frei)
+            conn.executescript(f"PRAGMA incremental_vacuum({pages})")
+            freed += min(free, pages)
+            time.sleep(PAUSE)
+    return freed
+
+
+def run_once():
+    """Einen Aufbewahrungslauf über alle Policies."""
+    started = time.monotonic()
+    now = database.now_ms()
+    purged = {}
+    for name, days in POLICIES.items():
+        if days is None:
+            continue
+        purged[name] = purge(name, now - days * 86_400_000)
+        stats["rows_purged"][name] += purged[name]
+    stats["pages_freed"] += vacuum()
+    duration = time.monotonic() - started
+    stats["runs"] += 1
+    stats["seconds"] += duration
+    stats["last_run"] = now
+    stats["last_duration"] = duration
+    if any(purged.values()):
+        print(f"[INFO] Retention: {purged} gelöscht in {duration:.1f}s")
+    return purged
+
+
+def _loop():
+    while not _stop.is_set():
+        try:
+            run_once()
+        except Exception as e:
+            print(f"[ERROR] Retention: {e}")
+        _stop.wait(INTERVAL)
+
+
+def start():
+    """Retention-Job im Hintergrund starten (idempotent)."""
+    global _thread
+    if _thread and _thread.is_alive():
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, name="retention", daemon=True)
+    _thread.start()
+
+
+def stop():
+    _stop.set()
+
+
+def enable_incremental_vacuum():
+    """Bestehende DB einmalig auf auto_vacuum=INCREMENTAL umstellen (volles VACUUM, sperrt die DB)."""
+    with database.connection() as conn:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+
+
+if __name__ == "__main__":
+    import sys
+    database.init_db()
+    if "--vacuum" in sys.argv:
+        enable_incremental_vacuum()
+    print(run_once())
@@ -0,0 +1,69 @@
+# app/ringbuffer.py
+#
+# Ringpuffer fester Größe für die Live-Daten: Zeitstempel als int64
+# (Epoch-ms), Kanäle als float32 – 16 Byte pro Messwert statt eines
+# dicts pro Messwert. Ein Schreiber (sensor_loop), beliebig viele Leser
+# ohne Lock: append() veröffentlicht einen Slot erst, nachdem er
+# geschrieben ist, und snapshot() prüft nach dem Kopieren, ob der
+# Schreiber in der Zwischenzeit kopierte Slots überschrieben hat. clear()
+# (aus Web- oder IPC-Threads) setzt nur eine Untergrenze; _count schreibt
+# allein der Schreiber und wächst immer weiter.
+
+import numpy as np
+
+SLACK = 16   # Reserve-Slots, damit laufende Schreibzugriffe Leser selten zum Wiederholen zwingen
+
+
+class RingBuffer:
+    """Die letzten `capacity` Messwerte eines Sensors."""
+
+    __slots__ = ("capacity", "_size", "_ts", "_values", "_count", "_floor")
+
+    def __init__(self, capacity, channels=2):
+        self.capacity = capacity
+        self._size = capacity + SLACK
+        self._ts = np.zeros(self._size, dtype=np.int64)
+        self._values = np.full((self._size, channels), np.nan, dtype=np.float32)
+        self._count = 0   # Anzahl bisher angehängter Werte (wächst monoton, nur der Schreiber)
+        self._floor = 0   # Werte davor gelten als gelöscht (clear)
+
+    def __len__(self):
+        return max(0, min(self._count - self._floor, self.capacity))
+
+    @property
+    def channels(self):
+        return self._values.shape[1]
+
+    @property
+    def nbytes(self):
+        return self._ts.nbytes + self._values.nbytes
+
+    def append(self, ts_ms, values):
+        """Messwert anhängen (nur aus einem Thread aufrufen); None → NaN."""
+        i = self._count % self._size
+        self._ts[i] = ts_ms
+        self._values[i] = [np.nan if v is None else v for v in values]
+        self._count += 1   # erst jetzt für Leser sichtbar
+
+    def snapshot(self, n=None):
+        """Kopie der letzten n Werte als (ts int64[n], values float32[n, k]), älteste zuerst."""
+        while True:
+            end = self._count
+            available = max(0, end - self._floor)
+            count = min(self.capacity, available) if n is None else max(0, min(n, self.capacity, available))
+            start = end - count
+            index = np.arange(start, end) % self._size
+            ts, values = self._ts[index], self._values[index]   # Fancy-Indexing kopiert
+            # Schreibzugriff auf Position p überschreibt p - size; solange kein
+            # kopierter Wert betroffen ist, ist die Kopie konsistent
+            if self._count - start < self._size:
+                return ts, values
+
+    def latest(self):
+        """Letzter Messwert als (ts, values) oder None."""
+        ts, values = self.snapshot(1)
+        return (int(ts[0]), values[0]) if len(ts) else None
+
+    def clear(self):
+        """Alle bisherigen Werte verwerfen; aus jedem Thread aufrufbar, ohne dem Schreiber _count zu nehmen."""
+        self._floor = self._count
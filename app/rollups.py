@@ -0,0 +1,183 @@
+# app/rollups.py
+#
+# Voraggregierte Werte (Min/Max/Summe/Anzahl) pro Sensor und Zeit-Bucket in
+# mehreren Auflösungen. store_readings() schreibt sie im selben Commit fort,
+# backfill() rechnet vorhandene Daten nach. Lange Zeiträume in /history
+# lesen nur noch die passende Rollup-Tabelle statt aller Rohwerte.
+
+import time
+from . import database, metrics
+
+# --- Einstellungen ---
+RESOLUTIONS = {"1m": 60_000, "1h": 3_600_000, "1d": 86_400_000}   # Name → Bucket-Breite in ms
+BACKFILL_CHUNK = 20000   # readings-IDs pro Transaktion
+BACKFILL_PAUSE = 0.05    # Sekunden Pause zwischen den Chunks
+
+_sql = {}
+
+
+def table(name):
+    return f"rollup_{name}"
+
+
+def _aggregates():
+    return [f"{ch}_{agg}" for ch in database.CHANNELS for agg in ("min", "max", "sum", "n")]
+
+
+def _upsert(name, source):
+    """INSERT ... ON CONFLICT, das neue Teil-Aggregate in bestehende Buckets einrechnet."""
+    updates = []
+    for ch in database.CHANNELS:
+        updates += [
+            f"{ch}_min = MIN(COALESCE({ch}_min, excluded.{ch}_min), COALESCE(excluded.{ch}_min, {ch}_min))",
+            f"{ch}_max = MAX(COALESCE({ch}_max, excluded.{ch}_max), COALESCE(excluded.{ch}_max, {ch}_max))",
+            f"{ch}_sum = IFNULL({ch}_sum, 0) + IFNULL(excluded.{ch}_sum, 0)",
+            f"{ch}_n = {ch}_n + excluded.{ch}_n",
+        ]
+    columns = ", ".join(["sensor_id", "bucket"] + _aggregates())
+    return (
+        f"INSERT INTO {table(name)} ({columns}) {source} "
+        f"ON CONFLICT (sensor_id, bucket) DO UPDATE SET {', '.join(updates)}"
+    )
+
+
+def _live_sql(name):
+    key = ("live", name, database.CHANNELS)
+    if key not in _sql:
+        placeholders = ", ".join("?" * (2 + 4 * len(database.CHANNELS)))
+        _sql[key] = _upsert(name, f"VALUES ({placeholders})")
+    return _sql[key]
+
+
+def _backfill_sql(name):
+    key = ("backfill", name, database.CHANNELS)
+    if key not in _sql:
+        width = RESOLUTIONS[name]
+        aggs = ", ".join(
+            f"MIN({ch}), MAX({ch}), SUM({ch}), COUNT({ch})" for ch in database.CHANNELS
+        )
+        _sql[key] = _upsert(name, (
+            f"SELECT sensor_id, ts / {width} * {width}, {aggs} FROM readings "
+            f"WHERE id > ? AND id <= ? GROUP BY sensor_id, ts / {width}"
+        ))
+    return _sql[key]
+
+
+# --- Setup ---
+def create_tables(conn):
+    columns = ", ".join(
+        f"{ch}_min REAL, {ch}_max REAL, {ch}_sum REAL, {ch}_n INTEGER NOT NULL DEFAULT 0"
+        for ch in database.CHANNELS
+    )
+    for name in RESOLUTIONS:
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table(name)} (
+                sensor_id TEXT NOT NULL,
+                bucket INTEGER NOT NULL,      -- Bucket-Beginn, Epoch-ms
+                {columns},
+                PRIMARY KEY (sensor_id, bucket)
+            ) WITHOUT ROWID
+        """)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table(name)}_bucket ON {table(name)} (bucket)")
+    # Alles bis zur aktuell höchsten ID (inkl. noch zu migrierender v1-Zeilen) rechnet backfill() nach,
+    # alles danach kommt über apply()
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('rollup_backfill_cursor', 0)")
+    conn.execute("""
+        INSERT OR REPLACE INTO meta (key, value)
+        SELECT 'rollup_backfill_until', IFNULL((SELECT seq FROM sqlite_sequence WHERE name = 'readings'), 0)
+    """)
+
+
+def add_channel(conn, channel):
+    """Aggregat-Spalten für einen neuen Kanal anhängen (database.ensure_channels)."""
+    for name in RESOLUTIONS:
+        for column, kind in (("min", "REAL"), ("max", "REAL"), ("sum", "REAL"), ("n", "INTEGER NOT NULL DEFAULT 0")):
+            conn.execute(f"ALTER TABLE {table(name)} ADD COLUMN {channel}_{column} {kind}")
+
+
+def clear(conn):
+    for name in RESOLUTIONS:
+        conn.execute(f"DELETE FROM {table(name)}")
+    conn.execute("DELETE FROM meta WHERE key LIKE 'rollup_backfill_%'")
+
+
+# --- Fortschreiben ---
+def apply(conn, rows):
+    """Neue Messwerte [(sensor_id, ts_ms, *channels), ...] in alle Auflösungen einrechnen."""
+    for name, width in RESOLUTIONS.items():
+        buckets = {}
+        for sensor_id, ts, *values in rows:
+            key = (sensor_id, ts - ts % width)
+            acc = buckets.get(key)
+            if acc is None:
+                acc = buckets[key] = [None, None, 0.0, 0] * len(values)
+            for i, value in enumerate(values):
+                if value is None:
+                    continue
+                j = 4 * i
+                if acc[j] is None or value < acc[j]:
+                    acc[j] = value
+                if acc[j + 1] is None or value > acc[j + 1]:
+                    acc[j + 1] = value
+                acc[j + 2] += value
+                acc[j + 3] += 1
+        conn.executemany(_live_sql(name), [(sid, bucket, *acc) for (sid, bucket), acc in buckets.items()])
+
+
+def aggregate_ids(conn, first, last):
+    """readings mit first < id <= last per SQL in alle Auflösungen einrechnen (ohne Commit)."""
+    for name in RESOLUTIONS:
+        conn.execute(_backfill_sql(name), (first, last))
+
+
+def backfill(chunk_rows=BACKFILL_CHUNK, pause=BACKFILL_PAUSE):
+    """Vorhandene Messwerte in kleinen ID-Bereichen in die Rollups übernehmen (fortsetzbar)."""
+    if database.migration_pending():
+        print("[WARN] Rollup-Backfill erst nach der Migration möglich")
+        return False
+    total = 0
+    started = time.monotonic()
+    while True:
+        with database.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                state = dict(conn.execute("SELECT key, value FROM meta WHERE key LIKE 'rollup_backfill_%'"))
+                cursor = state.get("rollup_backfill_cursor", 0)
+                until = state.get("rollup_backfill_until", 0)
+                if cursor >= until:
+                    conn.execute("DELETE FROM meta WHERE key LIKE 'rollup_backfill_%'")
+                    conn.commit()
+                    break
+                upper = min(cursor + chunk_rows, until)
+                aggregate_ids(conn, cursor, upper)
+                conn.execute("UPDATE meta SET value = ? WHERE key = 'rollup_backfill_cursor'", (upper,))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        total += upper - cursor
+        time.sleep(pause)
+    if total:
+        print(f"[INFO] Rollup-Backfill fertig: IDs bis {until} in {time.monotonic() - started:.1f}s")
+    return True
+
+
+# --- Lesen ---
+def choose_resolution(start, end, points):
+    """Gröbste Auflösung, die den Zeitraum noch mit mindestens `points` Buckets füllt; None = Rohdaten."""
+    for name, width in sorted(RESOLUTIONS.items(), key=lambda item: -item[1]):
+        if (end - start) // width >= points:
+            return name
+    return None
+
+
+@metrics.timed_query
+def query_avg(name, start, end, sensor_id):
+    """Mittelwerte eines Sensors als [(bucket, *avg), ...] – Bereichsscan über den Primärschlüssel."""
+    width = RESOLUTIONS[name]
+    columns = ", ".join(f"{ch}_sum / NULLIF({ch}_n, 0)" for ch in database.CHANNELS)
+    with database.connection() as conn:
+        return conn.execute(
+            f"SELECT bucket, {columns} FROM {table(name)} WHERE sensor_id = ? AND bucket > ? AND bucket < ? ORDER BY bucket",
+            (sensor_id, start - width, end)
+        ).fetchall()
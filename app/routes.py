@@ -1,10 +1,15 @@
 # app/routes.py
 
-from flask import Blueprint, render_template, jsonify, send_from_directory
-from . import database, config
+import numpy as np
+from flask import Blueprint, render_template, jsonify, request, Response, abort
+from . import database, config, cache, compression, rollups, downsample, events, export, sensors, metrics, ingest, ipc, hls, llhls, stream, snapshot, query, wire
 
 routes = Blueprint("routes", __name__)
 
+# --- Einstellungen ---
+HISTORY_CURSOR = "X-History-Cursor"   # Header mit dem Cursor für /history?since=
+DELTA_MAX_ROWS = 200_000              # mehr Zeilen seit since/after → 409, Client lädt /history komplett
+
 # --- Startseite ---
 @routes.route("/")
 def index():
@@ -13,103 +18,307 @@ def index():
     # Alle Sensor-IDs aus der Datenbank ermitteln (oder fest definieren)
     sensor_ids = sorted(list({row[0] for row in readings}))  # {sensor_id, ...} → Liste
 
-    return render_template("index.html", readings=readings, SENSOR_NAMES=sensor_ids)
+    # Player-Konfiguration passend zum Profil der Hauptkamera (ts oder ll)
+    settings = stream.main_profile()
+    stream_info = {"src": stream.playlist_url(settings["name"]), "profile": settings["name"]}
+    return render_template("index.html", readings=readings, SENSOR_NAMES=sensor_ids, STREAM=stream_info)
 
 # --- HLS Stream-Dateien ---
 @routes.route("/hls/<path:filename>")
 def hls_files(filename):
-    return send_from_directory(config.OUTPUT_DIR, filename)
+    response = llhls.serve(filename)  # LL-Playlist, zusammengesetzte Segmente, Preload-Hints
+    if response is None:
+        response = hls.serve(filename)  # aus dem RAM-Cache, Fallback auf die Datei
+    return response
+
+# --- HLS weiterer Kameras ---
+@routes.route("/camera/<name>/hls/<path:filename>")
+def camera_hls_files(name, filename):
+    pipeline = stream.supervisor.get(name)
+    if pipeline is None:
+        abort(404, "Unbekannte Kamera")
+    response = llhls.serve(filename, pipeline.output_dir, pipeline.profile)
+    if response is None:
+        response = hls.serve(filename, pipeline.output_dir)
+    return response
+
+# --- Standbild aus dem Live-Stream ---
+@routes.route("/snapshot.jpg")
+def snapshot_jpg():
+    return snapshot.serve()  # ?w=320 für kleinere Bilder
+
+@routes.route("/camera/<name>/snapshot.jpg")
+def camera_snapshot_jpg(name):
+    pipeline = stream.supervisor.get(name)
+    if pipeline is None:
+        abort(404, "Unbekannte Kamera")
+    return snapshot.serve(pipeline.output_dir, pipeline.profile)
 
 
 # --- Letzte Werte aller Sensoren ---
 @routes.route("/data")
+@wire.compressed
 def data():
-    latest = database.get_latest_readings()  # dict {sensor: {timestamp, temp, hum}}
-    # Schlüssel anpassen für JS: temp/hum statt temperature/humidity
-    result = {
-    str(sid): {
-        "timestamp": vals["timestamp"],
-        "temp": vals["temp"],
-        "hum": vals["hum"]
-    }
-    for sid, vals in latest.items()
-    }
-    return jsonify(result)
+    version, latest = cache.latest.snapshot()  # {sensor: {timestamp, temp, hum, ...}}, ohne DB-Zugriff
+    compact = wire.wants_compact()
+    etag = cache.latest.etag(version) + ("-c" if compact else "")
+    if request.if_none_match.contains_weak(etag):  # auch W/"..." nach Kompression
+        return Response(status=304, headers={"ETag": f'"{etag}"', "Vary": "Accept, Accept-Encoding"})
+    response = wire.compact_response(wire.encode_latest(latest)) if compact else jsonify(latest)
+    response.vary.add("Accept")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+# --- Live-Push (Server-Sent Events) ---
+@routes.route("/events")
+def event_stream():
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_id")
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        last_id = None
+    return Response(
+        events.stream(last_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# --- Zeitraum aus ?from=&to= (Epoch-ms oder ISO-Zeit), Standard: heute ---
+def _time_range(default_start=None):
+    try:
+        start = request.args.get("from")
+        end = request.args.get("to")
+        if start:
+            start = database.to_epoch_ms(start)
+        else:
+            start = database.today_start() if default_start is None else default_start
+        end = database.to_epoch_ms(end) if end else database.now_ms() + 1
+    except ValueError:
+        abort(400, "from/to: Epoch-ms oder YYYY-MM-DD[ HH:MM:SS] erwartet")
+    return start, end
 
 
 # --- Verlauf für Charts ---
 @routes.route("/history")
+@wire.compressed
 def history():
-    rows = database.today_readings()  # [(timestamp, sensor_id, temp, hum), ...]
-
-    grouped = {}
-    for ts, sensor, temp, hum in rows:
-        grouped.setdefault(sensor, {"timestamps": [], "temp": [], "hum": []})
-        grouped[sensor]["timestamps"].append(ts)
-        grouped[sensor]["temp"].append(temp)
-        grouped[sensor]["hum"].append(hum)
-
-    def downsample(timestamps, values):
-        n = len(values)
-        if n <= config.MAX_CHART_POINTS:
-            return timestamps, values
-        step = n / config.MAX_CHART_POINTS
-        ts_ds, val_ds = [], []
-        for i in range(config.MAX_CHART_POINTS):
-            start, end = int(i * step), int((i + 1) * step)
-            window_vals, window_ts = values[start:end], timestamps[start:end]
-            if not window_vals:
+    algo = request.args.get("algo", "minmax")
+    if algo not in downsample.ALGORITHMS:
+        abort(400, f"algo: eines von {', '.join(downsample.ALGORITHMS)}")
+    if "after" in request.args:
+        return _history_after(algo)
+    if "since" in request.args:
+        return _history_delta(algo)
+    start, end = _time_range()
+    cursor = database.last_id()  # vor den Abfragen: Doppelte filtert der Client über den Zeitstempel
+    # Lange Zeiträume aus den Rollups, kurze aus den Rohwerten
+    resolution = rollups.choose_resolution(start, end, config.MAX_CHART_POINTS)
+
+    series = {}
+    for sensor in database.sensor_ids():
+        if resolution:
+            rows = rollups.query_avg(resolution, start, end, sensor)  # [(bucket, *avg), ...]
+            ts, values = downsample.as_columns(rows)
+        else:
+            rows = database.get_sensor_range(sensor, start, end)      # [(ts, *channels), ...]
+            # Bei Kompression liegt der nächste Stützpunkt evtl. außerhalb des Fensters
+            before, after = database.get_sensor_edges(sensor, start, end)
+            rows = [row for row in (before, *rows, after) if row is not None]
+            if not rows:
                 continue
-            min_idx = window_vals.index(min(window_vals))
-            max_idx = window_vals.index(max(window_vals))
-            ts_ds.extend([window_ts[min_idx], window_ts[max_idx]])
-            val_ds.extend([window_vals[min_idx], window_vals[max_idx]])
-        return ts_ds, val_ds
+            ts, values = compression.reconstruct(*downsample.as_columns(rows), start, end)
+        if not ts.size:
+            continue
+        # Alle Kanäle eines Sensors in einem Durchgang
+        series[sensor] = downsample.downsample(ts, values, config.MAX_CHART_POINTS, algo)
+
+    response = _series_response(series)
+    response.headers["X-Resolution"] = resolution or "raw"
+    response.headers[HISTORY_CURSOR] = str(cursor)
+    return response
+
 
+def _history_delta(algo):
+    """Nur die Messwerte nach dem Cursor (?since=<X-History-Cursor>), z.B. nach einem Reconnect."""
+    try:
+        since = int(request.args["since"])
+    except ValueError:
+        abort(400, "since: Cursor aus X-History-Cursor erwartet")
+    if database.last_id() - since > DELTA_MAX_ROWS:
+        abort(409, "Cursor zu alt, /history neu laden")
+    rows = database.get_since(since)
+    per_sensor = {}
+    for row in rows:
+        per_sensor.setdefault(row[1], []).append(row[2:])   # (ts, *channels)
+    series = {
+        sensor: downsample.downsample(*downsample.as_columns(sensor_rows), config.MAX_CHART_POINTS, algo)
+        for sensor, sensor_rows in per_sensor.items()
+    }
+    response = _series_response(series)
+    response.headers[HISTORY_CURSOR] = str(rows[-1][0] if rows else since)
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+def _history_after(algo):
+    """Pro Sensor nur die Messwerte nach dem zuletzt gezeichneten Punkt (?after=<sensor>:<Epoch-ms>, mehrfach).
+
+    Die Positionen führt der Client mit jedem Live-Wert nach; die Antwort
+    wächst also nur mit der Dauer der Unterbrechung, nicht mit dem Alter der Seite.
+    """
+    positions = {}
+    for value in request.args.getlist("after"):
+        sensor, _, ts = value.rpartition(":")
+        try:
+            positions[sensor] = int(ts)
+        except ValueError:
+            sensor = None
+        if not sensor:
+            abort(400, "after: <sensor>:<Epoch-ms> erwartet")
+    end = database.now_ms() + 1
+    series, total = {}, 0
+    for sensor, after in positions.items():
+        rows = database.get_sensor_range(sensor, after + 1, end)
+        total += len(rows)
+        if total > DELTA_MAX_ROWS:
+            abort(409, "Lücke zu groß, /history neu laden")
+        if rows:
+            series[sensor] = downsample.downsample(*downsample.as_columns(rows), config.MAX_CHART_POINTS, algo)
+    response = _series_response(series)
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+def _series_response(series):
+    """{sensor: (ts, values)} als Kompaktformat oder als {sensor: {timestamps, temp, hum, ...}}."""
+    if wire.wants_compact():
+        return wire.compact_response(wire.encode_series(series))
     data = {}
-    for sensor, vals in grouped.items():
-        ts_ds, temp_ds = downsample(vals["timestamps"], vals["temp"])
-        _, hum_ds = downsample(vals["timestamps"], vals["hum"])
-        data[sensor] = {
-            "timestamps": ts_ds,
-            "temp": temp_ds,
-            "hum": hum_ds,
-        }
+    for sensor, (ts, values) in series.items():
+        data[sensor] = {"timestamps": ts.tolist()}
+        for channel, column in wire.columns(values):
+            data[sensor][channel] = downsample.to_list(column)
+    response = jsonify(data)
+    response.vary.add("Accept")
+    return response
+
+# --- Live-Fenster aus den Ringpuffern (?sensor=&n=), ohne DB-Zugriff ---
+@routes.route("/live")
+@wire.compressed
+def live():
+    try:
+        n = int(request.args.get("n", config.MAX_CHART_POINTS))
+    except ValueError:
+        abort(400, "n: Ganzzahl erwartet")
+    buffers = sensors.live_data
+    sensor = request.args.get("sensor")
+    if sensor is not None:
+        if sensor not in buffers:
+            abort(404, f"Unbekannter Sensor: {sensor}")
+        buffers = {sensor: buffers[sensor]}
 
-    return jsonify(data)
+    series = {}
+    for name, buffer in buffers.items():
+        ts, values = buffer.snapshot(n)
+        series[name] = ts, values.astype(np.float64).round(2)  # float32 → die gemessenen 2 Nachkommastellen
+    return _series_response(series)
 
 # --- DB zurücksetzen ---
 @routes.route("/clear", methods=["POST"])
 def clear_db():
     database.clear_data()
+    ingest.reset()   # Kompression nicht an gelöschte Stützpunkte anknüpfen lassen
+    cache.latest.clear()
+    for buffer in sensors.live_data.values():
+        buffer.clear()
+    if ipc.mirror:
+        ipc.mirror.send("clear")   # Acquisition-Prozess und alle anderen Worker
     return jsonify({"status": "ok"})
 
-# --- Export als CSV ---
+# --- Export (?from=&to=&sensor=&format=csv|parquet|arrow|npz&gzip=1) ---
+def _format():
+    fmt = request.args.get("format", "csv")
+    if fmt not in export.FORMATS:
+        abort(400, f"format: eines von {', '.join(export.FORMATS)}")
+    if not export.available(fmt):
+        abort(501, f"format={fmt} benötigt pyarrow")
+    return fmt
+
+
 @routes.route("/export")
 def export_csv():
-    return database.csvdump()
+    fmt = _format()
+    start, end = _time_range(default_start=0)  # ohne from: alles
+    return export.response(
+        fmt, start, end,
+        sensor_id=request.args.get("sensor"),
+        compress=request.args.get("gzip") in ("1", "true"),
+    )
+
+# --- Zeitbereichs-Abfragen für externe Tools ---
+@routes.route("/api/query")
+@wire.compressed
+def api_query():
+    """?sensor=&from=&to=&bucket=5m&agg=avg|min|max|count|last&limit=&cursor="""
+    start, end = _time_range()
+    try:
+        page = query.fetch(
+            start, end,
+            sensor_id=request.args.get("sensor"),
+            width=query.parse_bucket(request.args.get("bucket")),
+            agg=request.args.get("agg", "avg"),
+            cursor=query.decode_cursor(request.args.get("cursor")),
+            limit=request.args.get("limit", query.DEFAULT_LIMIT, type=int),
+        )
+    except ValueError as e:
+        abort(400, str(e))
+    return jsonify(page)
 
 # --- Einzelner Sensor ---
-@routes.route("/sensor/<int:sensor_id>")
+@routes.route("/sensor/<sensor_id>")
 def sensor_detail(sensor_id):
-    latest = database.get_latest_by_sensor(sensor_id)
+    latest = cache.latest.get(sensor_id)  # {timestamp, temp, hum} oder None
     return render_template("sensor.html", sensor_id=sensor_id, latest=latest)
 
 # --- API für externe Tools ---
 @routes.route("/api/readings")
+@wire.compressed
 def api_readings():
+    fmt = request.args.get("format", "json")
+    if fmt != "json":
+        if _format() == "csv":
+            abort(400, "CSV-Export über /export")
+        rows = database.get_readings(limit=100, ts_text=False)
+        return export.rows_response(fmt, [(ts, sensor, *values) for sensor, ts, *values in reversed(rows)])
     rows = database.get_readings(limit=100)
     readings = [
-        {
-            "sensor": row[0],
-            "timestamp": row[1],
-            "temperature": row[2],
-            "humidity": row[3],
-        }
-        for row in rows
+        {"sensor": sensor, "timestamp": ts, **dict(zip(database.CHANNELS, values))}
+        for sensor, ts, *values in rows
     ]
     return jsonify(readings)
 
+# --- Messplan: Lesedauer, Verspätung, Overruns pro Sensor ---
+@routes.route("/api/acquisition")
+def api_acquisition():
+    if ipc.mirror:
+        return jsonify(ipc.mirror.acquisition or {})
+    return jsonify(sensors.acquisition_stats())
+
+# --- Status der Kamera-Pipelines ---
+@routes.route("/api/cameras")
+def api_cameras():
+    if ipc.mirror:
+        return jsonify(ipc.mirror.cameras or {})
+    return jsonify(stream.supervisor.status())
+
+# --- Prometheus-Metriken ---
+@routes.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 # --- Healthcheck ---
 @routes.route("/ping")
 def ping():
@@ -1,80 +1,219 @@
 # app/sensors.py
 
-import smbus2, bme280, time, threading, os
-from datetime import datetime
-from . import database   # dein database.py nutzen
+import importlib, json, math, time, threading, os
+from . import database
+from . import drivers    # Sensor-Treiber, erst beim Scan importiert
+from . import ingest     # Messwerte gehen über die Write-Behind-Queue in die DB
+from . import events     # Live-Push an /events
+from . import metrics
+from .acquisition import Scheduler
+from .ringbuffer import RingBuffer
 
 # --- Einstellungen ---
 I2C_BUS = 1
+BUS_BACKEND = os.environ.get("SENSOR_BUS", "smbus")  # "smbus" = echter Bus, "sim" = app/simbus.py
+SIM_SENSORS = int(os.environ.get("SIM_SENSORS", 4))   # Anzahl simulierter BME280 bei "sim"
 MUX_ADDR = 0x70
 SENSOR_CHANNELS = [0, 1]   # PCA9548A Kanäle, wo Sensoren hängen
-MAX_POINTS = 100           # Max. Punkte für Live-Daten
+# Treiber, deren Adressen beim Scan geprüft werden (Reihenfolge = Vorrang bei gleicher Adresse)
+DRIVERS = os.environ.get("SENSOR_DRIVERS", "bme280,bmp280").split(",")
+DRIVER_OPTIONS = {}        # Pro Treiber, z.B. {"bme280": {"oversampling": "x4"}, "scd4x": {"oversampling": "single_shot"}}
+# Sensoren ohne Scan, z.B. {"Balkon": {"driver": "dht22", "address": 4}} (GPIO-Pin);
+# mit "channel" hängen sie am Bus hinter dem Multiplexer
+STATIC_SENSORS = json.loads(os.environ.get("STATIC_SENSORS", "{}"))
+LIVE_WINDOW = 6 * 3600     # Sekunden Live-Daten pro Sensor im RAM (Ringpuffer)
+LIVE_MAX_POINTS = 100_000  # Obergrenze pro Sensor (bei sehr kurzen Intervallen)
+SAMPLE_INTERVAL = 5.0      # Sekunden zwischen zwei Messungen (Standard)
+SAMPLE_INTERVALS = {}      # Abweichende Intervalle pro Sensor, z.B. {"CH0-0x76": 2.0}
 DEBUG = True               # False = Fehler ignorieren, True = Fehler anzeigen
 
 # --- Globale Variablen ---
-bus = smbus2.SMBus(I2C_BUS)
-live_data = {}
-sensor_map = {}  # { (channel, addr): "Sensorname" }
+bus = None       # wird erst in init_sensors() geöffnet (siehe open_bus)
+live_data = {}   # { "Sensorname": RingBuffer } (ts, *database.CHANNELS)
+sensor_map = {}  # { (channel, addr): "Sensorname" } – Sensoren am Bus
+devices = {}     # { "Sensorname": Treiber-Objekt }
+
+# --- Bus öffnen ---
+def open_bus(backend=None):
+    """Bus für das gewählte Backend; smbus2 wird erst hier importiert."""
+    backend = backend or BUS_BACKEND
+    if backend == "sim":
+        from . import simbus
+        return simbus.SimBus.with_sensors(SIM_SENSORS)
+    if backend != "smbus":
+        raise ValueError(f"Unbekanntes Bus-Backend: {backend}")
+    smbus2 = importlib.import_module("smbus2")
+    return smbus2.SMBus(I2C_BUS)
+
+def use_bus(new_bus):
+    """Bus setzen (z.B. einen vorkonfigurierten SimBus aus einem Benchmark)."""
+    global bus
+    bus = new_bus
 
 # --- Multiplexer auswählen ---
 def select_channel(channel: int):
     bus.write_byte(MUX_ADDR, 1 << channel)
 
-# --- BME280 auslesen ---
-def read_bme280(address):
+# --- Bus-Scan ---
+def _open(cls, device_bus, address, name, **options):
     try:
-        cal_params = bme280.load_calibration_params(bus, address)
-        data = bme280.sample(bus, address, cal_params)
-        return round(data.temperature, 2), round(data.humidity, 2)
+        return cls(device_bus, address, **{**DRIVER_OPTIONS.get(cls.name, {}), **options})
     except Exception as e:
-        if DEBUG:
-            print(f"[ERROR] Sensor {hex(address)}: {e}")
-        return None, None
+        print(f"[ERROR] Sensor {name} ({cls.name}) nicht nutzbar: {e}")
+        return None
 
-# --- Sensoren initialisieren ---
-def init_sensors():
-    global sensor_map, live_data
-    sensor_map.clear()
-    live_data.clear()
+def _probe(classes, address):
+    """Erster Treiber, dessen probe() zustimmt; None = kein Gerät, False = unbekanntes Gerät."""
+    answered = False
+    for cls in classes:
+        try:
+            if cls.probe(bus, address):
+                return cls
+            answered = True
+        except Exception:
+            continue
+    return False if answered else None
+
+def scan():
+    """Ein Durchgang über alle Mux-Kanäle; jede Adresse wird nur mit den Treibern geprüft, die sie beanspruchen.
 
-    sensor_count = 0
+    Liefert {name: (channel, Treiber-Objekt)}; Objekte werden erzeugt, solange ihr Kanal angewählt ist.
+    """
+    candidates = {}
+    for name in DRIVERS:
+        cls = drivers.load(name.strip())
+        for address in cls.addresses:
+            candidates.setdefault(address, []).append(cls)
+
+    found = {}
     for channel in SENSOR_CHANNELS:
         select_channel(channel)
-        for addr in [0x76, 0x77]:
-            try:
-                bus.read_byte(addr)  # Test, ob Device antwortet
-                sensor_count += 1
-                name = f"CH{channel}-{hex(addr)}"
-                sensor_map[(channel, addr)] = name
-                live_data[name] = []
-            except Exception as e:
+        for address, classes in sorted(candidates.items()):
+            cls = _probe(classes, address)
+            if not cls:
                 if DEBUG:
-                    print(f"[WARN] Kein Sensor auf CH{channel}, {hex(addr)}")
+                    kind = "Unbekanntes Gerät" if cls is False else "Kein Sensor"
+                    print(f"[WARN] {kind} auf CH{channel}, {hex(address)}")
+                continue
+            name = f"CH{channel}-{hex(address)}"
+            device = _open(cls, bus, address, name)
+            if device is not None:
+                found[name] = (channel, device)
 
-    print(f"[INFO] Gefundene Sensoren: {list(sensor_map.values())}")
+    for name, spec in STATIC_SENSORS.items():
+        spec = dict(spec)
+        cls = drivers.load(spec.pop("driver"))
+        address = spec.pop("address")
+        channel = spec.pop("channel", None)
+        if channel is not None:
+            select_channel(channel)
+        device = _open(cls, bus if channel is not None else None, address, name, **spec)
+        if device is not None:
+            found[name] = (channel, device)
+    return found
 
-# --- Endlosschleife im Thread ---
-def sensor_loop():
-    while True:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        for (channel, addr), sensor_id in sensor_map.items():
-            try:
-                select_channel(channel)
-                temp, hum = read_bme280(addr)
-                if temp is None: continue
+# --- Sensoren initialisieren ---
+def init_sensors():
+    global live_data
+    for device in devices.values():
+        device.close()
+    devices.clear()
+    sensor_map.clear()
+    if bus is None:
+        use_bus(open_bus())
 
-                live_data[sensor_id].append({"time": timestamp, "temperature": temp, "humidity": hum})
-                if len(live_data[sensor_id]) > MAX_POINTS:
-                    live_data[sensor_id].pop(0)
+    found = scan()
+    # Kanäle aller gefundenen Sensoren als Spalten anlegen (pressure, co2, ...)
+    database.ensure_channels([channel for _, device in found.values() for channel in device.channels])
+    print(f"[INFO] Gefundene Sensoren: {', '.join(f'{name} ({device.name})' for name, (_, device) in found.items())}")
 
-                database.store_reading(sensor_id, timestamp, temp, hum)
-            except Exception as e:
-                if DEBUG: print(f"[ERROR] Sensorloop {sensor_id}: {e}")
+    scheduler.clear()
+    gpio_scheduler.clear()
+    buffers = {}
+    for name, (channel, device) in found.items():
+        devices[name] = device
+        if device.bus is not None:
+            sensor_map[(channel, device.address)] = name
+        # Kürzer als der Sensor neue Werte liefert, lohnt nicht
+        period = max(SAMPLE_INTERVALS.get(name, SAMPLE_INTERVAL), device.min_interval)
+        buffers[name] = RingBuffer(min(LIVE_MAX_POINTS, max(1, math.ceil(LIVE_WINDOW / period))), len(database.CHANNELS))
+        # Nicht-Bus-Sensoren (GPIO, Bit-Banging) im eigenen Thread: sie blockieren den I2C-Takt nicht
+        lane = scheduler if device.bus is not None else gpio_scheduler
+        lane.add(
+            name, channel, period, lambda name=name, device=device: _read(name, device),
+            start=device.start if device.conversion_time > 0 else None, conversion=device.conversion_time,
+        )
+    live_data = buffers   # neu binden statt leeren: Leser behalten einen konsistenten Stand
+
+# --- Messplan ---
+def _read(name, device):
+    """Messwerte als Tupel in database.CHANNELS-Reihenfolge (nicht gemessene Kanäle → None)."""
+    started = time.perf_counter()
+    try:
+        data = device.read()
+    except Exception as e:
+        read_errors.inc(name)
+        if DEBUG:
+            print(f"[ERROR] Sensor {name}: {e}")
+        return None
+    finally:
+        read_duration.observe(time.perf_counter() - started, name)
+    return tuple(data.get(channel) for channel in database.CHANNELS)
+
+def _on_sample(sensor_id, ts_ms, values):
+    live_data[sensor_id].append(ts_ms, values)
+    ingest.submit(sensor_id, ts_ms, *values)
+
+def _on_cycle(samples):
+    events.broker.publish("reading", {
+        sensor_id: database.entry(ts_ms, values) for sensor_id, (ts_ms, values) in samples.items()
+    })
+
+scheduler = Scheduler(select_channel, _on_sample, _on_cycle)
+gpio_scheduler = Scheduler(None, _on_sample, _on_cycle)   # Sensoren ohne Bus, Kanal immer None
+
+def acquisition_stats():
+    """Messplan-Statistik beider Threads, pro Sensor mit Treibername."""
+    stats = scheduler.stats()
+    gpio = gpio_scheduler.stats()
+    stats["sensors"].update(gpio["sensors"])
+    stats["gpio_cycles"] = gpio["cycles"]
+    stats["callback_errors"] += gpio["callback_errors"]
+    for name, entry in stats["sensors"].items():
+        device = devices.get(name)
+        entry["driver"] = device.name if device else None
+    return stats
+
+# --- Metriken ---
+read_duration = metrics.Histogram(
+    "sensor_read_duration_seconds", "Dauer eines Sensor-Lesezugriffs", ("sensor",),
+    (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+read_errors = metrics.Counter("sensor_read_errors_total", "Fehlgeschlagene Lesezugriffe", ("sensor",))
+metrics.Callback(
+    "sensor_overruns_total", "Verpasste Messzeitpunkte",
+    lambda: {(task.key,): task.stats.overruns for task in scheduler.tasks + gpio_scheduler.tasks}, ("sensor",), "counter",
+)
+metrics.Callback(
+    "sensor_callback_errors_total", "Fehler beim Weiterreichen von Messwerten (Ingest, Live-Puffer, Events)",
+    lambda: scheduler.callback_errors + gpio_scheduler.callback_errors, kind="counter",
+)
+metrics.Callback(
+    "sensor_lateness_max_seconds", "Größte Verspätung gegenüber der Deadline",
+    lambda: {(task.key,): task.stats.lateness_max for task in scheduler.tasks + gpio_scheduler.tasks}, ("sensor",),
+)
+
+# --- Endlosschleife im Thread ---
+def sensor_loop():
+    scheduler.run()
 
-        time.sleep(5)  # alle 5 Sekunden
+def gpio_loop():
+    gpio_scheduler.run()
 
 
 # --- Thread starten ---
 def start_loop():
     t = threading.Thread(target=sensor_loop, daemon=True)
     t.start()
+    if gpio_scheduler.tasks:
+        threading.Thread(target=gpio_loop, name="sensor-gpio", daemon=True).start()
@@ -0,0 +1,142 @@
+# app/simbus.py
+#
+# Simulierter I2C-Bus für Entwicklung, Tests und Benchmarks ohne
+# /dev/i2c-1: ein PCA9548A-Multiplexer mit BME280-Sensoren dahinter.
+# SimBus bietet die von sensors.py genutzten smbus2-Methoden, dazu
+# load_calibration_params()/sample() mit denselben Signaturen wie das
+# bme280-Paket. Latenz pro Bustransaktion und Fehlerquote sind einstellbar,
+# die Messwerte driften langsam um einen Grundwert.
+
+import errno
+import math
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+MUX_ADDR = 0x70
+BME280_ADDRS = (0x76, 0x77)
+
+
+class SimBME280:
+    """BME280 mit langsam driftenden Werten (mean-reverting Random Walk plus Tagesgang)."""
+
+    CHIP_ID = 0x60
+
+    def __init__(self, temperature=22.0, humidity=50.0, pressure=1013.0, drift=0.02, noise=0.05, rng=None):
+        self.base = (temperature, humidity, pressure)
+        self.offset = [0.0, 0.0, 0.0]
+        self.drift = drift
+        self.noise = noise
+        self.rng = rng or random.Random()
+        self.calibration = SimpleNamespace(chip_id=self.CHIP_ID)
+
+    def registers(self, register):
+        return self.CHIP_ID if register == 0xD0 else 0
+
+    def measure(self):
+        day = math.sin(time.time() / 86400 * 2 * math.pi)
+        values = []
+        for i, (base, scale) in enumerate(zip(self.base, (1.0, 3.0, 0.5))):
+            # zurück Richtung 0 ziehen, damit die Werte nicht weglaufen
+            self.offset[i] += self.rng.gauss(0, self.drift * scale) - 0.01 * self.offset[i]
+            values.append(base + scale * day + self.offset[i] + self.rng.gauss(0, self.noise * scale))
+        temperature, humidity, pressure = values
+        return SimpleNamespace(
+            temperature=temperature,
+            humidity=min(max(humidity, 0.0), 100.0),
+            pressure=pressure,
+        )
+
+
+class SimBus:
+    """smbus2-kompatibler Bus mit PCA9548A-Multiplexer.
+
+    latency: Sekunden pro Bustransaktion, failure_rate: Anteil fehlschlagender
+    Transaktionen (OSError EREMOTEIO wie beim echten Bus).
+    """
+
+    def __init__(self, mux_addr=MUX_ADDR, latency=0.0, failure_rate=0.0, measure_time=0.0, seed=None):
+        self.mux_addr = mux_addr
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.measure_time = measure_time
+        self.rng = random.Random(seed)
+        self.devices = {}          # {(channel, addr): SimBME280}
+        self.channel = None
+        self.transactions = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def with_sensors(cls, count, channels=8, **kwargs):
+        """Bus mit `count` BME280, verteilt auf Mux-Kanäle und beide Adressen."""
+        bus = cls(**kwargs)
+        slots = [(ch, addr) for ch in range(channels) for addr in BME280_ADDRS]
+        if count > len(slots):
+            raise ValueError(f"Max. {len(slots)} Sensoren bei {channels} Kanälen")
+        for i, (ch, addr) in enumerate(slots[:count]):
+            bus.add_device(ch, addr, SimBME280(
+                temperature=20.0 + 0.5 * i, humidity=45.0 + i, rng=random.Random(bus.rng.random())
+            ))
+        return bus
+
+    def add_device(self, channel, addr, device):
+        self.devices[(channel, addr)] = device
+
+    # --- Bustransaktionen ---
+    def _transfer(self, addr):
+        with self._lock:
+            self.transactions += 1
+            failed = self.failure_rate and self.rng.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            raise OSError(errno.EREMOTEIO, "Remote I/O error (simuliert)")
+        if addr == self.mux_addr:
+            return None
+        device = self.devices.get((self.channel, addr))
+        if device is None:
+            raise OSError(errno.EREMOTEIO, f"Kein Gerät an {hex(addr)}")
+        return device
+
+    def write_byte(self, addr, value):
+        self._transfer(addr)
+        if addr == self.mux_addr:
+            self.channel = value.bit_length() - 1 if value else None
+
+    def read_byte(self, addr):
+        device = self._transfer(addr)
+        return self.channel if device is None else 0
+
+    def read_byte_data(self, addr, register):
+        return self._transfer(addr).registers(register)
+
+    def write_byte_data(self, addr, register, value):
+        self._transfer(addr)
+
+    def read_i2c_block_data(self, addr, register, length):
+        self._transfer(addr)
+        return [0] * length
+
+    def close(self):
+        pass
+
+
+# --- bme280-kompatible Funktionen ---
+def load_calibration_params(bus, address):
+    # Wie das bme280-Paket: drei Blocklesezugriffe auf die Kalibrierregister
+    for _ in range(3):
+        device = bus._transfer(address)
+    return device.calibration
+
+
+def sample(bus, address, calibration_params=None, sampling=1):
+    # ctrl_hum, ctrl_meas schreiben, Messung abwarten, Datenblock lesen
+    bus._transfer(address)
+    bus._transfer(address)
+    if bus.measure_time:
+        time.sleep(bus.measure_time)
+    return bus._transfer(address).measure()
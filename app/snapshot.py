@@ -0,0 +1,130 @@
+# app/snapshot.py
+#
+# Standbild aus dem Live-Stream für Clients, denen ein aktuelles Foto
+# reicht (Handy, Statusbildschirm): /snapshot.jpg dekodiert ein Keyframe
+# aus dem neuesten Segment (Bytes aus dem HLS-Cache) und hält das JPEG,
+# bis ffmpeg das nächste Segment schreibt. Gleichzeitige Requests warten
+# auf denselben Dekodierlauf statt eigene ffmpeg-Prozesse zu starten.
+
+import subprocess
+import threading
+import time
+import zlib
+from flask import Response, request, abort
+from . import hls, metrics, stream
+
+# --- Einstellungen ---
+WIDTHS = (160, 320, 640, 1280)   # erlaubte ?w=-Werte; andere werden aufgerundet
+KEYFRAME_WINDOW = 2.0            # ll: so viele Sekunden Teilsegmente mitdekodieren
+JPEG_QUALITY = 5                 # ffmpeg -q:v (2 = beste, 31 = schlechteste)
+DECODE_TIMEOUT = 10.0
+CACHE_CONTROL = "no-cache"       # per ETag revalidieren, Bild ändert sich mit jedem Segment
+
+# --- Globale Variablen ---
+_images = {}                 # (Verzeichnis, Breite) → (Segment-URI, JPEG, ETag)
+_decode_lock = threading.Lock()   # höchstens ein Dekodierlauf gleichzeitig
+
+snapshot_requests = metrics.Counter(
+    "snapshot_requests_total", "Snapshot-Requests aus dem Cache bzw. mit Dekodierung", ("result",),
+)
+snapshot_decode = metrics.Histogram("snapshot_decode_seconds", "Dauer einer Snapshot-Dekodierung")
+
+
+def width_arg():
+    """?w= auf die nächste erlaubte Breite runden (None = Originalgröße)."""
+    value = request.args.get("w")
+    if value is None:
+        return None
+    try:
+        width = int(value)
+    except ValueError:
+        abort(400, "w: Ganzzahl erwartet")
+    return next((allowed for allowed in WIDTHS if allowed >= width), WIDTHS[-1])
+
+
+def newest_source(cache, settings):
+    """(Kennung des neuesten Segments, Eingabe-Bytes, ffmpeg-Format) oder None."""
+    playlist = cache.playlist(settings["playlist"])
+    if playlist is None or not playlist.segments:
+        return None
+    if settings["name"] != "ll":
+        # TS-Segmente beginnen mit einem Keyframe
+        entry = cache.get(playlist.segments[-1][1])
+        return (playlist.segments[-1][1], entry.data, "mpegts") if entry else None
+
+    # ll: Teilsegmente beginnen nicht unbedingt an Keyframes → init.mp4 plus
+    # die letzten KEYFRAME_WINDOW Sekunden, daraus das erste Keyframe
+    init = cache.get("init.mp4")
+    if init is None:
+        return None
+    chunks, duration = [], 0.0
+    for part_duration, uri in reversed(playlist.segments):
+        entry = cache.get(uri)
+        if entry is None:
+            break
+        chunks.append(entry.data)
+        duration += part_duration
+        if duration >= KEYFRAME_WINDOW:
+            break
+    if not chunks:
+        return None
+    return playlist.segments[-1][1], init.data + b"".join(reversed(chunks)), "mp4"
+
+
+def decode(data, fmt, width=None):
+    """Erstes Keyframe aus data als JPEG (ffmpeg über Pipes, ohne Temp-Dateien)."""
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error", "-skip_frame", "nokey",
+           "-f", fmt, "-i", "pipe:0", "-frames:v", "1"]
+    if width:
+        cmd += ["-vf", f"scale={width}:-2"]
+    cmd += ["-q:v", str(JPEG_QUALITY), "-f", "image2", "-c:v", "mjpeg", "pipe:1"]
+    result = subprocess.run(cmd, input=data, capture_output=True, timeout=DECODE_TIMEOUT)
+    if result.returncode != 0 or not result.stdout:
+        raise RuntimeError(result.stderr.decode(errors="replace").strip() or f"exit {result.returncode}")
+    return result.stdout
+
+
+def get(directory=None, settings=None, width=None):
+    """(JPEG, ETag) für das neueste Segment; None, wenn noch keins da ist."""
+    settings = settings or stream.main_profile()
+    cache = hls.cache(directory)
+    key = (cache.directory, width)
+    playlist = cache.playlist(settings["playlist"])
+    newest = playlist.segments[-1][1] if playlist and playlist.segments else None
+    cached = _images.get(key)
+    if cached and cached[0] == newest:
+        snapshot_requests.inc("hit")
+        return cached[1], cached[2]
+
+    with _decode_lock:
+        # Wer gewartet hat, findet meist schon das Ergebnis des Vorgängers vor
+        source = newest_source(cache, settings)
+        if source is None:
+            return (cached[1], cached[2]) if cached else None
+        uri, data, fmt = source
+        cached = _images.get(key)
+        if cached and cached[0] == uri:
+            snapshot_requests.inc("hit")
+            return cached[1], cached[2]
+        started = time.perf_counter()
+        try:
+            image = decode(data, fmt, width)
+        except (OSError, RuntimeError, subprocess.TimeoutExpired) as e:
+            print(f"[WARN] Snapshot: Dekodierung fehlgeschlagen: {e}")
+            return (cached[1], cached[2]) if cached else None
+        snapshot_decode.observe(time.perf_counter() - started)
+        snapshot_requests.inc("decode")
+        cached = _images[key] = (uri, image, f"{zlib.crc32(image):x}")
+        return cached[1], cached[2]
+
+
+def serve(directory=None, settings=None):
+    """Response für /snapshot.jpg[?w=320]."""
+    result = get(directory, settings, width_arg())
+    if result is None:
+        return Response("Noch kein Bild verfügbar", status=503, headers={"Retry-After": "2"})
+    image, etag = result
+    response = Response(image, mimetype="image/jpeg")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response.make_conditional(request)
@@ -1,6 +1,7 @@
 const video = document.getElementById('videoPlayer');
 const placeholder = document.getElementById('stream-placeholder');
-const videoSrc = '/hls/stream.m3u8';
+const streamInfo = window.STREAM || {src: '/hls/stream.m3u8', profile: 'ts'};
+const videoSrc = streamInfo.src;
 
 // --- Zentrale Zeitparser-Funktion ---
 function parseTimestamp(ts) {
@@ -25,6 +26,50 @@ function parseTimestamp(ts) {
     return Date.now(); // Fallback, damit kein NaN entsteht
 }
 
+// --- Kompaktformat (?fmt=compact, siehe app/wire.py) ---
+function decodeAxis(axis) {
+    const n = axis.dt ? axis.dt.length + 1 : axis.n;
+    const ts = new Array(n);
+    let t = axis.t0;
+    for (let i = 0; i < n; i++) {
+        if (i > 0) t += axis.dt ? axis.dt[i - 1] : axis.step;
+        ts[i] = t;
+    }
+    return ts;
+}
+
+function dequantize(values, q) {
+    // Ganzzahlige Vielfache von q zurück in Messwerte (null bleibt null)
+    const digits = Math.max(0, Math.round(-Math.log10(q)));
+    return values.map(v => v === null ? null : +(v * q).toFixed(digits));
+}
+
+// /history bzw. /live kompakt → {sensor: {timestamps, temp, hum, ...}} wie im JSON-Format
+function decodeCompact(payload) {
+    const axes = payload.axes.map(decodeAxis);
+    const data = {};
+    for (const name in payload.series) {
+        const s = payload.series[name];
+        data[name] = {timestamps: axes[s.axis]};
+        for (const key in payload.q) {
+            if (key in s) data[name][key] = dequantize(s[key], payload.q[key]);
+        }
+    }
+    return data;
+}
+
+// /data kompakt → {sensor: {timestamp, temp, hum, ...}}
+function decodeLatest(payload) {
+    const columns = {};
+    for (const key in payload.q) columns[key] = dequantize(payload[key], payload.q[key]);
+    const data = {};
+    payload.sensors.forEach((name, i) => {
+        data[name] = {timestamp: payload.t0 + payload.dt[i]};
+        for (const key in columns) data[name][key] = columns[key][i];
+    });
+    return data;
+}
+
 function hidePlaceholder() {
     placeholder.style.display = 'none';
 }
@@ -33,9 +78,10 @@ function hidePlaceholder() {
 async function waitForSegments(){
     while(true){
         try{
-            const res = await fetch(videoSrc);
+            // Blocking Reload: der Server antwortet, sobald das erste Segment in der Playlist steht
+            const res = await fetch(videoSrc + '?_HLS_msn=0');
             const text = await res.text();
-            if(text.includes('.ts')) break;
+            if(text.includes('#EXTINF')) break;
         } catch(e){}
         await new Promise(r => setTimeout(r,500));
     }
@@ -44,7 +90,15 @@ async function waitForSegments(){
 // --- HLS-Player starten und reconnecten ---
 async function initVideo() {
     if (Hls.isSupported()) {
-        const hls = new Hls({
+        // LL-HLS: Abstand zur Live-Kante kommt aus PART-HOLD-BACK der Playlist
+        const lowLatency = streamInfo.profile === 'll';
+        const hls = new Hls(lowLatency ? {
+            lowLatencyMode: true,
+            maxBufferLength: 2,
+            backBufferLength: 0,
+            enableWorker: true,
+            debug: false
+        } : {
             maxBufferLength: 5,
             liveSyncDurationCount: 3,
             enableWorker: true,
@@ -115,27 +169,34 @@ function updateAverages(data){
     document.getElementById('averages').innerHTML = `🌡 ${avgTemp} °C &nbsp;&nbsp; 💧 ${avgHum} %`;
 }
 
-async function initDashboard() {
-    initSensors();
+// --- Verlauf: einmal komplett, danach nur noch Deltas ---
+const MAX_POINTS = 2000;   // Punkte pro Trace; extendTraces wirft ältere heraus
+let historyLoadedAt = null; // Zeitpunkt (ms) des letzten vollständigen /history
+let traceIndex = {};       // Sensor → Trace-Index (gleich in beiden Charts)
+let lastTs = {};           // Sensor → letzter Zeitstempel im Chart (gegen Doppelte, Position für Deltas)
 
-    const res = await fetch('/history'); 
-    const data = await res.json();
+async function loadHistory() {
+    const loadedAt = Date.now();
+    const res = await fetch('/history?fmt=compact');
+    historyLoadedAt = loadedAt;
+    const data = decodeCompact(await res.json());
 
     let tempTraces = [], humTraces = [];
+    traceIndex = {};
+    lastTs = {};
 
     for (let name in data) {
         let timestamps = [];
         if (data[name].timestamps && data[name].timestamps.length) {
-            //timestamps = data[name].timestamps.map(ts => ts.replace(' ', 'T'));
-            // ✅ Hier parseTimestamp statt nur replace
             timestamps = data[name].timestamps.map(ts => parseTimestamp(ts));
         } else {
             const len = data[name].temp.length;
             const now = new Date();
-            //timestamps = data[name].temp.map((_, i) => new Date(now - (len - i) * 5000).toISOString());
             // ✅ auch hier als Unix ms
             timestamps = data[name].temp.map((_, i) => now - (len - i) * 5000);
         }
+        traceIndex[name] = tempTraces.length;
+        lastTs[name] = timestamps.length ? timestamps[timestamps.length - 1] : -Infinity;
 
         tempTraces.push({
             x: timestamps,
@@ -146,7 +207,7 @@ async function initDashboard() {
         });
 
         humTraces.push({
-            x: timestamps,
+            x: timestamps.slice(),
             y: data[name].hum,
             type: 'scatter',
             mode: 'lines+markers',
@@ -154,65 +215,128 @@ async function initDashboard() {
         });
     }
 
-    // Initial Plot
-    Plotly.newPlot('tempChart', tempTraces, {
+    // Plotly.react: beim ersten Mal wie newPlot, danach Neuaufbau ohne neues DOM
+    Plotly.react('tempChart', tempTraces, {
         title: 'Temperaturen',
         xaxis: { type: 'date' },
         yaxis: { range: [15, 35] }
     });
 
-    Plotly.newPlot('humChart', humTraces, {
+    Plotly.react('humChart', humTraces, {
         title: 'Luftfeuchtigkeit',
         xaxis: { type: 'date' },
         yaxis: { range: [20, 80] }
     });
+}
 
+async function initDashboard() {
+    initSensors();
+    await loadHistory();
     await updateData();
-    setInterval(updateData, 5000);
+    startLiveUpdates();
     initVideo();
 }
 
+// Pro Sensor nur die Messwerte nach dem letzten gezeichneten Punkt holen (Reconnect, Polling).
+// lastTs wandert mit jedem SSE-Wert mit, die Lücke ist also nur so groß wie die Unterbrechung.
+async function syncHistory() {
+    if (historyLoadedAt === null) return loadHistory();
+    const after = Object.keys(traceIndex).map(name => {
+        const ts = Number.isFinite(lastTs[name]) ? lastTs[name] : historyLoadedAt;
+        return 'after=' + encodeURIComponent(`${name}:${Math.floor(ts)}`);
+    });
+    if (!after.length) return loadHistory();
+    try {
+        const res = await fetch(`/history?${after.join('&')}&fmt=compact`);
+        if (res.status === 409) return loadHistory();   // Lücke zu groß
+        if (!res.ok) return;
+        appendPoints(decodeCompact(await res.json()));
+    } catch(e){ console.error(e); }
+}
+
+// {sensor: {timestamps, temp, hum}} anhängen: ein extendTraces pro Chart für alle Sensoren
+function appendPoints(points) {
+    const indices = [], x = [], temp = [], hum = [];
+    for (const name in points) {
+        const idx = traceIndex[name];
+        const p = points[name];
+        if (idx === undefined || !p.timestamps.length) continue;
+        // Nur, was neuer ist als der letzte Punkt (SSE und Delta können sich überschneiden)
+        const from = p.timestamps.findIndex(t => t > lastTs[name]);
+        if (from < 0) continue;
+        indices.push(idx);
+        x.push(p.timestamps.slice(from));
+        temp.push(p.temp.slice(from));
+        hum.push(p.hum.slice(from));
+        lastTs[name] = p.timestamps[p.timestamps.length - 1];
+    }
+    if (!indices.length) return;
+    Plotly.extendTraces('tempChart', { x: x, y: temp }, indices, MAX_POINTS);
+    Plotly.extendTraces('humChart', { x: x.map(a => a.slice()), y: hum }, indices, MAX_POINTS);
+}
+
 // --- Live-Daten nachführen ---
 async function updateData(){
     try{
-        const res = await fetch('/data'); 
-        const data = await res.json();
-        updateAverages(data);
+        const res = await fetch('/data?fmt=compact');
+        const data = decodeLatest(await res.json());
+        applyLatest(data);
+    } catch(e){ console.error(e); }
+}
 
-        const now = new Date().toISOString();
-        const maxPoints = 50; // nur die letzten 50 Messwerte anzeigen
+function applyLatest(data){
+    updateAverages(data);
 
-        sensors.forEach((name, idx) => {
-            const v = data[name];
-            const el = sensorElements[name]; if(!el) return;
+    const points = {};
+    sensors.forEach(name => {
+        const v = data[name];
+        const el = sensorElements[name]; if(!el || !v) return;
 
-            el.style.background = `linear-gradient(135deg, ${tempColor(v.temp)}, ${humColor(v.hum)})`;
-            document.getElementById(`${name}-temp`).innerText = `🌡 ${v.temp} °C`;
-            document.getElementById(`${name}-hum`).innerText  = `💧 ${v.hum} %`;
+        el.style.background = `linear-gradient(135deg, ${tempColor(v.temp)}, ${humColor(v.hum)})`;
+        document.getElementById(`${name}-temp`).innerText = `🌡 ${v.temp} °C`;
+        document.getElementById(`${name}-hum`).innerText  = `💧 ${v.hum} %`;
 
-            const ts = v.timestamp ? parseTimestamp(v.timestamp) : Date.now();
+        const ts = v.timestamp ? parseTimestamp(v.timestamp) : Date.now();
+        points[name] = { timestamps: [ts], temp: [v.temp], hum: [v.hum] };
+    });
+    appendPoints(points);
+}
 
-            // Neue Daten anhängen
-            Plotly.extendTraces('tempChart', { x:[[ts]], y:[[v.temp]] }, [idx]);
-            Plotly.extendTraces('humChart', { x:[[ts]], y:[[v.hum]] }, [idx]);
+// --- Live-Push per Server-Sent Events, Polling als Fallback ---
+let pollTimer = null;
 
-            // Scrollen: letzte maxPoints anzeigen
-            const tempData = document.getElementById('tempChart').data[idx].x;
-            const humData  = document.getElementById('humChart').data[idx].x;
+function startPolling(){
+    if (pollTimer) return;
+    console.warn("[SSE] nicht verfügbar, Polling alle 5s");
+    // Erst die Deltas (alle Zwischenwerte), dann die Kacheln
+    pollTimer = setInterval(async () => { await syncHistory(); await updateData(); }, 5000);
+}
 
-            if (tempData.length > maxPoints) {
-                Plotly.relayout('tempChart', {
-                    'xaxis.range': [tempData[tempData.length - maxPoints], tempData[tempData.length - 1]]
-                });
-            }
-            if (humData.length > maxPoints) {
-                Plotly.relayout('humChart', {
-                    'xaxis.range': [humData[humData.length - maxPoints], humData[humData.length - 1]]
-                });
-            }
-        });
+function stopPolling(){
+    if (!pollTimer) return;
+    clearInterval(pollTimer);
+    pollTimer = null;
+}
 
-    } catch(e){ console.error(e); }
+function startLiveUpdates(){
+    if (!window.EventSource) { startPolling(); return; }
+
+    const es = new EventSource('/events');
+    let failures = 0;
+
+    // Nach einem Reconnect die Lücke per Delta schließen statt den Tag neu zu laden
+    es.onopen = () => { if (failures) syncHistory(); failures = 0; stopPolling(); };
+    es.addEventListener('reading', e => applyLatest(JSON.parse(e.data)));
+    // Verpasste Events nicht mehr im Server-Puffer → Stand neu holen
+    es.addEventListener('reset', async () => { await syncHistory(); await updateData(); });
+    es.onerror = () => {
+        failures++;
+        // Browser versucht selbst den Reconnect; bleibt er erfolglos, auf Polling umschalten
+        if (es.readyState === EventSource.CLOSED || failures >= 3) {
+            startPolling();
+            if (es.readyState === EventSource.CLOSED) setTimeout(startLiveUpdates, 30000);
+        }
+    };
 }
 
 
@@ -1,62 +1,493 @@
 # app/stream.py
+#
+# Kamera-Streams: pro Kamera eine Pipeline (ein ffmpeg-Prozess, eigenes
+# Ausgabeverzeichnis, eigene Route /camera/<name>/hls/...), alle verwaltet
+# vom Supervisor. Jede Pipeline
+#   - liest den -progress-Kanal von ffmpeg und erkennt damit Hänger
+#     (Prozess lebt, aber keine neuen Frames bzw. keine neuen Segmente),
+#   - startet nach Absturz/Hänger mit exponentiellem Backoff samt Jitter neu
+#     und gibt nach zu vielen Neustarts pro Zeitfenster vorübergehend auf,
+#   - läuft mit nice, optionaler CPU-Affinität und begrenzten Encoder-Threads.
+#
+# Quellen: RTSP-URL, lokale Datei (läuft in Schleife) oder "lavfi:<Filter>"
+# als Testquelle ohne Kamera, z.B.
+#   python -m app.stream --source "lavfi:testsrc2=size=640x360:rate=25" --seconds 30
+
+import collections
+import json
 import os
+import random
+import shutil
 import subprocess
 import threading
 import time
 from .config import OUTPUT_DIR, RTSP_URL
+from . import metrics
+
+# --- Streaming-Profile ---
+# "ts": klassisches HLS mit MPEG-TS-Segmenten (Fallback, läuft überall).
+# "ll": Low-Latency-HLS mit fMP4/CMAF – ffmpeg schreibt kurze Teilsegmente
+#       (parts.m3u8), llhls.py baut daraus die LL-Playlist mit EXT-X-PART,
+#       Preload-Hints und Blocking Reload (live.m3u8).
+STREAM_PROFILE = os.environ.get("STREAM_PROFILE", "ts")
+PROFILES = {
+    "ts": {
+        "playlist": "stream.m3u8",     # von ffmpeg geschrieben
+        "public": "stream.m3u8",       # vom Player geladen
+        "hls_time": 1,
+        "list_size": 5,
+    },
+    "ll": {
+        "playlist": "parts.m3u8",
+        "public": "live.m3u8",
+        "part_time": 0.333,            # Dauer eines Teilsegments (PART-TARGET)
+        "parts_per_segment": 3,        # Teilsegmente pro Segment
+        "list_size": 30,               # Teilsegmente in parts.m3u8
+    },
+}
+
+# --- Einstellungen ---
+# Kameras: Name → {"source": URL/Datei/"lavfi:...", optional "profile",
+# "encode", "nice", "cpus", "threads"}. Die Kamera "main" schreibt direkt
+# nach OUTPUT_DIR (/hls/...), alle anderen nach OUTPUT_DIR/<name>.
+DEFAULT_CAMERA = "main"
+CAMERAS = json.loads(os.environ.get("STREAM_CAMERAS", "null")) or {DEFAULT_CAMERA: {"source": RTSP_URL}}
+STARTUP_TIMEOUT = 20.0   # Sekunden bis zum ersten Frame (RTSP-Verbindungsaufbau)
+STALL_TIMEOUT = 10.0     # Sekunden ohne neuen Frame → Hänger
+SEGMENT_TIMEOUT = 15.0   # Sekunden ohne neues Segment → Hänger
+CHECK_INTERVAL = 1.0     # Sekunden zwischen zwei Prüfungen
+KILL_TIMEOUT = 5.0       # Sekunden nach SIGTERM bis SIGKILL
+BACKOFF_BASE = 1.0       # erster Neustart nach ~1 s, danach verdoppelt
+BACKOFF_MAX = 60.0
+HEALTHY_AFTER = 60.0     # so lange stabil → Backoff wieder von vorn
+RESTART_BUDGET = 10      # max. Neustarts ...
+RESTART_WINDOW = 600.0   # ... pro Zeitfenster (Sekunden), sonst "failed"
+FAILED_COOLDOWN = 300.0  # Pause nach aufgebrauchtem Budget
+FFMPEG_NICE = 10         # niedrigere Priorität als Sensorloop und Web-Server
+FFMPEG_CPUS = None       # z.B. {2, 3}: ffmpeg nur auf diesen Kernen
+FFMPEG_THREADS = 2       # Encoder-/Muxer-Threads pro Prozess
+ENCODE_ARGS = ("-c:v", "libx264", "-preset", "ultrafast", "-tune", "zerolatency",
+               "-g", "25", "-pix_fmt", "yuv420p")
+
+
+def profile(name=None):
+    """Einstellungen des (aktiven) Profils, inkl. "name"."""
+    name = name or STREAM_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unbekanntes Stream-Profil: {name}")
+    return {"name": name, **PROFILES[name]}
+
+
+def playlist_url(name=None, camera=DEFAULT_CAMERA):
+    prefix = "/hls/" if camera == DEFAULT_CAMERA else f"/camera/{camera}/hls/"
+    return prefix + profile(name)["public"]
+
+
+def source_args(source):
+    """ffmpeg-Eingabeoptionen für RTSP-URL, Datei oder "lavfi:<Filter>"."""
+    if source.startswith("lavfi:"):
+        return ["-re", "-f", "lavfi", "-i", source[6:]]
+    if source.startswith("rtsp://"):
+        return ["-rtsp_transport", "tcp", "-i", source]
+    if "://" in source:
+        return ["-i", source]
+    return ["-re", "-stream_loop", "-1", "-i", source]   # Datei in Echtzeit, endlos
+
+
+def build_command(name=None, output_dir=OUTPUT_DIR, input_args=None, codec_args=("-c:v", "copy")):
+    """ffmpeg-Aufruf für ein Profil; input_args/codec_args z.B. für Testquellen."""
+    settings = profile(name)
+    if input_args is None:
+        input_args = source_args(RTSP_URL)
+    cmd = ["ffmpeg", "-nostdin", *input_args, *codec_args, "-an", "-f", "hls"]
+    if settings["name"] == "ll":
+        cmd += [
+            "-hls_time", str(settings["part_time"]),
+            "-hls_list_size", str(settings["list_size"]),
+            "-hls_segment_type", "fmp4",
+            "-hls_fmp4_init_filename", "init.mp4",
+            "-hls_segment_filename", os.path.join(output_dir, "part%d.m4s"),
+            # split_by_time: Teilsegmente müssen nicht an Keyframes beginnen
+            "-hls_flags", "delete_segments+append_list+omit_endlist+split_by_time",
+        ]
+    else:
+        cmd += [
+            "-hls_time", str(settings["hls_time"]),
+            "-hls_list_size", str(settings["list_size"]),
+            "-hls_flags", "delete_segments+append_list+omit_endlist",
+        ]
+    return cmd + [os.path.join(output_dir, settings["playlist"])]
+
+
+def segment_age(directory=OUTPUT_DIR):
+    """Sekunden seit dem neuesten HLS-Segment (None, wenn keins da ist)."""
+    newest = newest_segment(directory)
+    return None if newest is None else max(0.0, time.time() - newest)
+
+
+def newest_segment(directory):
+    """mtime des neuesten Segments in directory (None, wenn keins da ist)."""
+    try:
+        return max(
+            (entry.stat().st_mtime for entry in os.scandir(directory) if entry.name.endswith((".ts", ".m4s"))),
+            default=None,
+        )
+    except OSError:
+        return None
+
+
+def backoff(failures, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Wartezeit vor dem n-ten Neustart in Folge: exponentiell, halb fest, halb zufällig."""
+    delay = min(cap, base * 2 ** max(0, failures - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _limited(cmd, nice, cpus):
+    """(Kommando, offene Limits): Priorität und CPU-Affinität per nice/taskset vor ffmpeg.
+
+    Kein preexec_fn – zwischen fork und exec kann das Kind in diesem
+    Prozess mit vielen Threads hängen bleiben. nice/taskset gelten ab exec
+    für alle ffmpeg-Threads; fehlt eins der Tools, setzt _apply_limits den
+    Rest nach dem Start.
+    """
+    prefix = []
+    if cpus and shutil.which("taskset"):
+        prefix += ["taskset", "-c", ",".join(str(cpu) for cpu in sorted(cpus))]
+        cpus = None
+    if nice and shutil.which("nice"):
+        prefix += ["nice", "-n", str(nice)]
+        nice = 0
+    return prefix + list(cmd), (nice, cpus)
+
+
+def _apply_limits(pid, nice, cpus):
+    """Nachträglich für den laufenden Prozess (Threads, die ffmpeg schon gestartet hat, behalten ihre Werte)."""
+    try:
+        if nice:
+            os.setpriority(os.PRIO_PROCESS, pid, os.getpriority(os.PRIO_PROCESS, pid) + nice)
+        if cpus:
+            os.sched_setaffinity(pid, cpus)
+    except OSError as e:
+        print(f"[WARN] ffmpeg-Limits nicht gesetzt: {e}")
+
+
+# --- Metriken ---
+ffmpeg_starts = metrics.Counter("ffmpeg_starts_total", "FFmpeg-Starts", ("camera",))
+ffmpeg_restarts = metrics.Counter("ffmpeg_restarts_total", "FFmpeg-Neustarts nach Absturz/Ende/Hänger", ("camera",))
+ffmpeg_stalls = metrics.Counter("ffmpeg_stalls_total", "Erkannte Hänger (keine Frames/Segmente)", ("camera",))
+
+
+class Pipeline:
+    """Ein ffmpeg-Prozess für eine Kamera, mit Hänger-Erkennung und Neustart-Logik."""
+
+    def __init__(self, name, source, output_dir, profile_name=None, encode=None,
+                 nice=FFMPEG_NICE, cpus=FFMPEG_CPUS, threads=FFMPEG_THREADS):
+        self.name = name
+        self.source = source
+        self.output_dir = output_dir
+        self.profile = profile(profile_name)
+        if encode is None:
+            encode = source.startswith("lavfi:")   # Testbilder müssen kodiert werden
+        self.codec_args = ENCODE_ARGS if encode else ("-c:v", "copy")
+        self.nice = nice
+        self.cpus = set(cpus) if cpus else None
+        self.threads = threads
+
+        self.state = "stopped"    # stopped, starting, running, stalled, backoff, failed
+        self.process = None
+        self.progress = {}        # letzter vollständiger -progress-Block
+        self.started_at = None    # time.monotonic() des letzten Starts
+        self.last_frame_at = None
+        self.retry_at = None      # time.monotonic() des nächsten Versuchs
+        self.failures = 0         # Fehlschläge in Folge
+        self.last_exit = None
+        self.last_error = None    # letzte stderr-Zeile von ffmpeg
+        self._restarts = collections.deque()   # Zeitpunkte für das Budget
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- Steuerung ---
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name=f"ffmpeg-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._terminate()
+        if self._thread:
+            self._thread.join(KILL_TIMEOUT + 1)
+        self.state = "stopped"
+
+    def command(self):
+        cmd = build_command(self.profile["name"], self.output_dir, source_args(self.source), self.codec_args)
+        # -progress: Schlüssel=Wert-Blöcke auf stdout; -threads als Ausgabeoption vor die Playlist
+        return [cmd[0], "-loglevel", "error", "-progress", "pipe:1", *cmd[1:-1],
+                "-threads", str(self.threads), cmd[-1]]
+
+    # --- Ablauf ---
+    def _run(self):
+        while not self._stop.is_set():
+            if not self._within_budget():
+                self.state = "failed"
+                self.retry_at = time.monotonic() + FAILED_COOLDOWN
+                print(f"[ERROR] Kamera {self.name}: {RESTART_BUDGET} Neustarts in "
+                      f"{RESTART_WINDOW:.0f}s, Pause für {FAILED_COOLDOWN:.0f}s")
+                if self._stop.wait(FAILED_COOLDOWN):
+                    break
+                self._restarts.clear()
+                self.failures = 0
+
+            ran = self._run_once()
+            if self._stop.is_set():
+                break
+            if ran >= HEALTHY_AFTER:
+                self.failures = 0
+            self.failures += 1
+            self._restarts.append(time.monotonic())
+            ffmpeg_restarts.inc(self.name)
+            delay = backoff(self.failures)
+            self.state = "backoff"
+            self.retry_at = time.monotonic() + delay
+            print(f"[WARN] Kamera {self.name}: ffmpeg beendet ({self.last_exit}), restart in {delay:.1f}s...")
+            self._stop.wait(delay)
+        self.state = "stopped"
+
+    def _within_budget(self):
+        while self._restarts and time.monotonic() - self._restarts[0] > RESTART_WINDOW:
+            self._restarts.popleft()
+        return len(self._restarts) < RESTART_BUDGET
+
+    def _run_once(self):
+        """ffmpeg starten und überwachen; liefert die Laufzeit in Sekunden."""
+        self.state = "starting"
+        self.progress = {}
+        self.last_frame_at = None
+        self.retry_at = None
+        self.started_at = time.monotonic()
+        started_wall = time.time()
+        cmd, pending = _limited(self.command(), self.nice, self.cpus)
+        try:
+            self.process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                stdin=subprocess.DEVNULL,
+                text=True,
+                bufsize=1,
+            )
+        except OSError as e:
+            self.last_exit = str(e)
+            print(f"[ERROR] Kamera {self.name}: ffmpeg nicht startbar: {e}")
+            return 0.0
+        _apply_limits(self.process.pid, *pending)
+        ffmpeg_starts.inc(self.name)
+        print(f"[INFO] Kamera {self.name}: HLS-Stream gestartet ({self.profile['name']})")
+        process = self.process
+        threading.Thread(target=self._read_progress, args=(process,), daemon=True).start()
+        threading.Thread(target=self._read_errors, args=(process,), daemon=True).start()
+
+        while process.poll() is None and not self._stop.is_set():
+            reason = self._stalled(started_wall)
+            if reason:
+                self.state = "stalled"
+                ffmpeg_stalls.inc(self.name)
+                print(f"[WARN] Kamera {self.name}: {reason}, ffmpeg wird beendet")
+                self._terminate()
+                self.last_exit = f"stalled: {reason}"
+                break
+            self._stop.wait(CHECK_INTERVAL)
+        else:
+            if process.poll() is not None:
+                self.last_exit = f"exit {process.returncode}"
+        process.wait()
+        return time.monotonic() - self.started_at
+
+    def _stalled(self, started_wall):
+        """Grund für einen Hänger oder None."""
+        now = time.monotonic()
+        if self.last_frame_at is None:
+            if now - self.started_at > STARTUP_TIMEOUT:
+                return f"kein Frame nach {STARTUP_TIMEOUT:.0f}s"
+            return None
+        if now - self.last_frame_at > STALL_TIMEOUT:
+            return f"keine neuen Frames seit {now - self.last_frame_at:.0f}s"
+        newest = newest_segment(self.output_dir)
+        if newest is None or newest < started_wall:   # noch kein Segment dieses Laufs
+            if now - self.started_at > STARTUP_TIMEOUT + SEGMENT_TIMEOUT:
+                return "kein Segment geschrieben"
+        elif time.time() - newest > SEGMENT_TIMEOUT:
+            return f"kein neues Segment seit {time.time() - newest:.0f}s"
+        self.state = "running"
+        return None
+
+    def _read_progress(self, process):
+        """-progress-Blöcke lesen (frame=…, fps=…, out_time_us=…, speed=…, progress=continue)."""
+        block, last_frame, last_time = {}, -1, -1
+        for line in process.stdout:
+            key, _, value = line.strip().partition("=")
+            if key != "progress":
+                block[key] = value
+                continue
+            frame = _int(block.get("frame"))
+            out_time = _int(block.get("out_time_us"))
+            if frame > last_frame or out_time > last_time:   # bei -c:v copy zählt auch out_time
+                self.last_frame_at = time.monotonic()
+                last_frame, last_time = max(frame, last_frame), max(out_time, last_time)
+            self.progress = block
+            block = {}
+
+    def _read_errors(self, process):
+        for line in process.stderr:
+            if line.strip():
+                self.last_error = line.strip()[:200]
+
+    def _terminate(self):
+        process = self.process
+        if process is None or process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(KILL_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            print(f"[WARN] Kamera {self.name}: ffmpeg reagiert nicht, SIGKILL")
+            process.kill()
+            process.wait()
+
+    # --- Status ---
+    @property
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def status(self):
+        now = time.monotonic()
+        progress = self.progress
+        return {
+            "name": self.name,
+            "state": self.state,
+            "profile": self.profile["name"],
+            "playlist": playlist_url(self.profile["name"], self.name),
+            "pid": self.process.pid if self.running else None,
+            "uptime_s": round(now - self.started_at, 1) if self.running else None,
+            "frame": _int(progress.get("frame")) if progress else None,
+            "fps": _float(progress.get("fps")),
+            "speed": _float(progress.get("speed", "").rstrip("x")),
+            "last_frame_age_s": round(now - self.last_frame_at, 1) if self.last_frame_at else None,
+            "segment_age_s": _round(segment_age(self.output_dir)),
+            "failures": self.failures,
+            "restarts_in_window": len(self._restarts),
+            "retry_in_s": round(max(0.0, self.retry_at - now), 1) if self.retry_at else None,
+            "last_exit": self.last_exit,
+            "last_error": self.last_error,
+        }
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return -1
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _round(value):
+    return None if value is None else round(value, 1)
+
+
+class Supervisor:
+    """Alle Kamera-Pipelines aus CAMERAS."""
+
+    def __init__(self, cameras=None, output_dir=OUTPUT_DIR):
+        self.pipelines = {}
+        for name, camera in (cameras or CAMERAS).items():
+            directory = output_dir if name == DEFAULT_CAMERA else os.path.join(output_dir, name)
+            self.pipelines[name] = Pipeline(
+                name, camera["source"], directory,
+                profile_name=camera.get("profile"),
+                encode=camera.get("encode"),
+                nice=camera.get("nice", FFMPEG_NICE),
+                cpus=camera.get("cpus", FFMPEG_CPUS),
+                threads=camera.get("threads", FFMPEG_THREADS),
+            )
+
+    def start(self):
+        for pipeline in self.pipelines.values():
+            pipeline.start()
+
+    def stop(self):
+        for pipeline in self.pipelines.values():
+            pipeline.stop()
+
+    def get(self, name):
+        return self.pipelines.get(name)
+
+    def status(self):
+        return {name: pipeline.status() for name, pipeline in self.pipelines.items()}
+
+
+# --- Globale Variablen ---
+supervisor = Supervisor()
+
+
+def main_profile():
+    """Profil der Hauptkamera (/hls/, /snapshot.jpg); ohne DEFAULT_CAMERA in CAMERAS das aktive Profil."""
+    pipeline = supervisor.get(DEFAULT_CAMERA)
+    return pipeline.profile if pipeline else profile()
+
+
+def _per_camera(fn):
+    return lambda: {(name,): fn(pipeline) for name, pipeline in supervisor.pipelines.items()}
+
+
+metrics.Callback(
+    "hls_segment_age_seconds", "Alter des neuesten HLS-Segments",
+    _per_camera(lambda pipeline: segment_age(pipeline.output_dir)), ("camera",),
+)
+metrics.Callback("ffmpeg_running", "1, wenn FFmpeg läuft", _per_camera(lambda pipeline: int(pipeline.running)), ("camera",))
 
-ffmpeg_process = None
-stop_thread = False
 
 def start_hls_stream():
-    """Starte FFmpeg in einem eigenen Thread mit Auto-Restart."""
-    global stop_thread
-    stop_thread = False
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-    def ffmpeg_thread():
-        global ffmpeg_process
-        while not stop_thread:
-            cmd = [
-                "ffmpeg",
-                "-nostdin",
-                "-rtsp_transport", "tcp",
-                "-i", RTSP_URL,
-                "-c:v", "copy",
-                "-an",
-                "-f", "hls",
-                "-hls_time", "1",
-                "-hls_list_size", "5",
-                "-hls_flags", "delete_segments+append_list+omit_endlist",
-                os.path.join(OUTPUT_DIR, "stream.m3u8")
-            ]
-            try:
-                #with open("ffmpeg.log", "a") as log_file:
-                    ffmpeg_process = subprocess.Popen(
-                        cmd,
-                        stdout=subprocess.DEVNULL,
-                        stderr=subprocess.DEVNULL,
-                        bufsize=1,
-                        universal_newlines=True
-                    )
-                    print("[INFO] HLS-Stream gestartet")
-                    ffmpeg_process.wait()
-            except Exception as e:
-                print(f"[ERROR] FFmpeg Thread: {e}")
-
-            if not stop_thread:
-                print("[WARN] FFmpeg abgestürzt oder beendet, restart in 3s...")
-                time.sleep(3)
-
-    t = threading.Thread(target=ffmpeg_thread, daemon=True)
-    t.start()
+    """Alle Kameras starten (je ein Thread mit Überwachung und Auto-Restart)."""
+    supervisor.start()
 
 
 def stop_hls_stream():
-    """Stoppe FFmpeg und den Thread sauber."""
-    global stop_thread, ffmpeg_process
-    stop_thread = True
-    if ffmpeg_process and ffmpeg_process.poll() is None:
-        ffmpeg_process.terminate()
-        ffmpeg_process.wait()
-        print("[INFO] HLS-Stream gestoppt")
+    """Alle ffmpeg-Prozesse und Threads sauber beenden."""
+    supervisor.stop()
+    print("[INFO] HLS-Streams gestoppt")
+
+
+if __name__ == "__main__":
+    # Lokaler Test ohne Kamera: Supervisor mit Testquelle, Status jede Sekunde
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Stream-Supervisor mit lokaler Quelle testen")
+    parser.add_argument("--source", default="lavfi:testsrc2=size=640x360:rate=25",
+                        help='Datei, URL oder "lavfi:<Filter>"')
+    parser.add_argument("--cameras", type=int, default=1)
+    parser.add_argument("--profile", choices=list(PROFILES), default=STREAM_PROFILE)
+    parser.add_argument("--seconds", type=float, default=30.0)
+    args = parser.parse_args()
+
+    test = Supervisor(
+        {f"cam{i}": {"source": args.source, "profile": args.profile} for i in range(args.cameras)},
+        tempfile.mkdtemp(prefix="stream-test-"),
+    )
+    test.start()
+    try:
+        end = time.monotonic() + args.seconds
+        while time.monotonic() < end:
+            time.sleep(1.0)
+            print(json.dumps(test.status()))
+    finally:
+        test.stop()
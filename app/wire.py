@@ -0,0 +1,186 @@
+# app/wire.py
+#
+# Übertragungsformat der heißen Routen (/history, /live, /data, /api/...):
+#   - "compact" (?fmt=compact oder Accept: application/vnd.sensor.compact+json):
+#     Zeitachse als Start in Epoch-ms plus Integer-Deltas (bzw. nur Schritt
+#     und Anzahl bei gleichmäßigem Raster), Sensoren mit identischen
+#     Zeitstempeln teilen sich eine Achse, Messwerte als ganzzahlige
+#     Vielfache von QUANTUM. Dekodiert wird in db.js (decodeCompact).
+#     Zusätzliche Kanäle (pressure, co2, ...) erscheinen nur bei Sensoren,
+#     die sie messen; temp und hum sind immer dabei.
+#   - gzip bzw. Brotli (optionales Paket brotli) für große Antworten,
+#   - JSON über orjson (optional), sonst kompaktes json.dumps – nie
+#     eingerückt, auch nicht im Debug-Modus.
+
+import functools
+import gzip
+import json
+import numpy as np
+from flask import request, make_response, abort, current_app
+from flask.json.provider import DefaultJSONProvider
+from . import database
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# --- Einstellungen ---
+COMPACT_MIMETYPE = "application/vnd.sensor.compact+json"
+QUANTUM = {"temp": 0.01, "hum": 0.01, "pressure": 0.01, "co2": 1}   # Auflösung der Sensoren
+DEFAULT_QUANTUM = 0.01                   # Kanäle ohne Eintrag: 2 Nachkommastellen
+ALWAYS = ("temp", "hum")                 # auch ohne Werte senden (Dashboard erwartet sie)
+MIN_COMPRESS = 1024                      # kleinere Antworten lohnen die Kompression nicht
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5                       # schnell genug pro Request, deutlich kleiner als gzip
+COMPRESSIBLE = ("application/json", COMPACT_MIMETYPE, "text/csv")
+
+
+# --- JSON ---
+class JSONProvider(DefaultJSONProvider):
+    """Flask-JSON über orjson (falls installiert), immer ohne Leerzeichen."""
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+            except TypeError:
+                pass   # Typen, die nur der Default-Provider kennt (Decimal, dataclass, ...)
+        kwargs.setdefault("default", self.default)
+        kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+        kwargs.setdefault("separators", (",", ":"))
+        return json.dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(f"{self.dumps(obj)}\n", mimetype=self.mimetype)
+
+
+# --- Aushandeln ---
+def wants_compact():
+    """?fmt=compact|json hat Vorrang vor dem Accept-Header."""
+    fmt = request.args.get("fmt")
+    if fmt is not None:
+        if fmt not in ("json", "compact"):
+            abort(400, "fmt: json oder compact")
+        return fmt == "compact"
+    return request.accept_mimetypes[COMPACT_MIMETYPE] > request.accept_mimetypes["application/json"]
+
+
+def compact_response(payload):
+    response = current_app.response_class(current_app.json.dumps(payload), mimetype=COMPACT_MIMETYPE)
+    response.vary.add("Accept")
+    return response
+
+
+# --- Kompaktformat ---
+def quantize(values, quantum):
+    """float-Spalte → Liste ganzzahliger Vielfacher von quantum (NaN → None)."""
+    scaled = np.rint(np.asarray(values, dtype=np.float64) / quantum)
+    missing = np.isnan(scaled)
+    if not missing.any():
+        return scaled.astype(np.int64).tolist()
+    return [None if gap else int(v) for v, gap in zip(np.where(missing, 0, scaled).tolist(), missing.tolist())]
+
+
+def encode_axis(ts):
+    """int64-Zeitstempel → {"t0", "step", "n"} bei festem Raster, sonst {"t0", "dt": [...]}."""
+    ts = np.asarray(ts, dtype=np.int64)
+    if ts.size == 0:
+        return {"t0": 0, "dt": []}
+    deltas = np.diff(ts)
+    if deltas.size and (deltas == deltas[0]).all():
+        return {"t0": int(ts[0]), "step": int(deltas[0]), "n": int(ts.size)}
+    return {"t0": int(ts[0]), "dt": deltas.tolist()}
+
+
+def quantum(key):
+    return QUANTUM.get(key, DEFAULT_QUANTUM)
+
+
+def columns(values, channels=None):
+    """(Kurzname, Spalte) je Kanal von values float[n, k]; Kanäle ganz ohne Werte entfallen (außer ALWAYS)."""
+    if channels is None:
+        channels = [database.channel_key(channel) for channel in database.CHANNELS]
+    for i, key in enumerate(channels[:values.shape[1]]):
+        column = values[:, i]
+        if key in ALWAYS or not np.isnan(column).all():
+            yield key, column
+
+
+def encode_series(series, channels=None):
+    """{sensor: (ts int64[n], values float[n, k])} → Kompaktformat mit geteilten Zeitachsen."""
+    axes, keys, out, q = [], {}, {}, {}
+    for name, (ts, values) in series.items():
+        ts = np.asarray(ts, dtype=np.int64)
+        key = (ts.size, ts.tobytes())
+        if key not in keys:   # gleiche Zeitstempel (Rollups, gleicher Takt) → eine Achse
+            keys[key] = len(axes)
+            axes.append(encode_axis(ts))
+        entry = out[name] = {"axis": keys[key]}
+        for channel, column in columns(np.asarray(values, dtype=np.float64), channels):
+            q[channel] = quantum(channel)
+            entry[channel] = quantize(column, q[channel])
+    return {"v": 1, "q": q, "axes": axes, "series": out}
+
+
+def encode_latest(latest, channels=None):
+    """{sensor: {timestamp, temp, hum, ...}} (/data) → spaltenweise: Sensoren, Zeit-Deltas, Werte."""
+    if channels is None:
+        channels = [database.channel_key(channel) for channel in database.CHANNELS]
+    names = list(latest)
+    ts = [latest[name]["timestamp"] or 0 for name in names]
+    t0 = min(ts, default=0)
+    payload = {"v": 1, "q": {}, "sensors": names, "t0": t0, "dt": [t - t0 for t in ts]}
+    for channel in channels:
+        column = [latest[name].get(channel) for name in names]
+        if channel not in ALWAYS and all(value is None for value in column):
+            continue
+        payload["q"][channel] = quantum(channel)
+        payload[channel] = quantize([np.nan if value is None else value for value in column], quantum(channel))
+    return payload
+
+
+# --- Kompression ---
+def _encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def compress(response):
+    """Antwort in-place komprimieren, wenn Client, Typ und Größe passen."""
+    response.vary.add("Accept-Encoding")
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE):
+        return response
+    data = response.get_data()
+    encoding = _encoding() if len(data) >= MIN_COMPRESS else None
+    if encoding is None:
+        return response
+    if encoding == "br":
+        data = brotli.compress(data, quality=BROTLI_QUALITY)
+    else:
+        data = gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    response.set_data(data)
+    response.headers["Content-Encoding"] = encoding
+    # Andere Bytes, gleiche Darstellung: starkes ETag wird schwach (wie nginx)
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def compressed(view):
+    """Decorator für Views, deren Antworten komprimiert werden sollen."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        return compress(make_response(view(*args, **kwargs)))
+    return wrapper
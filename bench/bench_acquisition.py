@@ -0,0 +1,191 @@
+# bench/bench_acquisition.py
+#
+# Benchmark der Messkette ohne Hardware: init_sensors() + Scheduler
+# (sensor_loop) mit N simulierten BME280 am SimBus, Ingest-Queue und eine
+# frische SQLite-DB. Gemessen werden
+#   - Messwerte pro Sekunde (gesättigt, Periode ~0),
+#   - Zyklus-Jitter (Verspätung gegenüber der Deadline, getaktet),
+#   - DB-Schreiblatenz pro Ingest-Batch.
+# Mit --baseline werden die Werte gegen eine gespeicherte Baseline geprüft;
+# Exit-Code 1 bei Regression.
+#
+#   python -m bench.bench_acquisition --sensors 16 --save-baseline bench/baseline.json
+#   python -m bench.bench_acquisition --sensors 16 --baseline bench/baseline.json
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+# Ohne Hardware: Backend vor dem Import von app.sensors festlegen
+os.environ.setdefault("SENSOR_BUS", "sim")
+
+from app import config, database, ingest, sensors, simbus
+
+# Metrik → Richtung ("higher" = größer ist besser)
+METRICS = {
+    "readings_per_s": "higher",
+    "jitter_p50_ms": "lower",
+    "jitter_p99_ms": "lower",
+    "db_write_p50_ms": "lower",
+    "db_write_p95_ms": "lower",
+}
+SLACK_MS = 1.0   # absolute Toleranz für ms-Werte (Timer-Auflösung, Rauschen)
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def _instrument_reads(lateness):
+    """task.read umhüllen: Verspätung gegenüber der Deadline in ms mitschreiben."""
+    clock = sensors.scheduler._clock
+    for task in sensors.scheduler.tasks:
+        def read(task=task, inner=task.read):
+            lateness.append((clock() - task.next_due) * 1000)
+            return inner()
+        task.read = read
+
+
+def _instrument_writes(durations):
+    store_readings = database.store_readings
+
+    def timed(rows, archive=None):
+        started = time.perf_counter()
+        try:
+            return store_readings(rows, archive)
+        finally:
+            durations.append((time.perf_counter() - started) * 1000)
+
+    database.store_readings = timed
+    return lambda: setattr(database, "store_readings", store_readings)
+
+
+def run_phase(args, interval, duration):
+    """Eine Messphase mit frischem SimBus; liefert (Messwerte, Fehler, Verspätungen, Sekunden)."""
+    bus = simbus.SimBus.with_sensors(
+        args.sensors, latency=args.latency, measure_time=args.measure_time, seed=args.seed,
+    )
+    sensors.use_bus(bus)
+    sensors.SENSOR_CHANNELS = sorted({channel for channel, _ in bus.devices})
+    sensors.SAMPLE_INTERVAL = interval
+    sensors.DEBUG = False
+    sensors.init_sensors()
+    bus.failure_rate = args.failure_rate   # erst nach dem Scan, sonst fehlen Sensoren
+
+    lateness = []
+    _instrument_reads(lateness)
+    thread = threading.Thread(target=sensors.sensor_loop, daemon=True)
+    started = time.monotonic()
+    thread.start()
+    time.sleep(duration)
+    sensors.scheduler.stop()
+    thread.join()
+    elapsed = time.monotonic() - started
+
+    stats = sensors.scheduler.stats()["sensors"].values()
+    reads = sum(s["reads"] for s in stats)
+    errors = sum(s["errors"] for s in stats)
+    return reads, errors, lateness, elapsed
+
+
+def run(args):
+    tmp = tempfile.mkdtemp(prefix="bench-acq-")
+    config.DB_FILE = os.path.join(tmp, "sensors.db")
+    database.init_db()
+    ingest.BATCH_SIZE = args.batch_size
+    ingest.start()
+    write_ms = []
+    restore = _instrument_writes(write_ms)
+    try:
+        # Gesättigt: Periode ~0, der Scheduler liest so schnell er kann
+        reads, errors, _, elapsed = run_phase(args, 1e-6, args.duration)
+        throughput = reads / elapsed
+        # Getaktet: Jitter gegenüber den Deadlines
+        paced_reads, paced_errors, lateness, paced_elapsed = run_phase(args, args.interval, args.duration)
+        ingest.flush(timeout=30)
+    finally:
+        restore()
+        ingest.stop()
+        database.pool.close()
+
+    expected = args.sensors * paced_elapsed / args.interval
+    return {
+        "sensors": args.sensors,
+        "latency_ms": args.latency * 1000,
+        "failure_rate": args.failure_rate,
+        "readings_per_s": round(throughput, 1),
+        "errors": errors + paced_errors,
+        "paced_reads": paced_reads,
+        "paced_expected": round(expected),
+        "jitter_p50_ms": round(percentile(lateness, 50), 3),
+        "jitter_p99_ms": round(percentile(lateness, 99), 3),
+        "jitter_max_ms": round(max(lateness, default=0.0), 3),
+        "jitter_stdev_ms": round(statistics.pstdev(lateness), 3) if lateness else 0.0,
+        "db_batches": len(write_ms),
+        "db_write_p50_ms": round(percentile(write_ms, 50), 3),
+        "db_write_p95_ms": round(percentile(write_ms, 95), 3),
+        "db_write_max_ms": round(max(write_ms, default=0.0), 3),
+        "ingest": dict(ingest.stats),
+    }
+
+
+def check(result, baseline, tolerance):
+    """Regressionen gegenüber der Baseline als Liste von Meldungen."""
+    problems = []
+    for metric, direction in METRICS.items():
+        if metric not in baseline:
+            continue
+        old, new = baseline[metric], result[metric]
+        if direction == "higher" and new < old * (1 - tolerance):
+            problems.append(f"{metric}: {new} < {old} (-{tolerance:.0%})")
+        if direction == "lower" and new > old * (1 + tolerance) + SLACK_MS:
+            problems.append(f"{metric}: {new} > {old} (+{tolerance:.0%} +{SLACK_MS}ms)")
+    # Ohne Fehlerinjektion darf im getakteten Betrieb kein Messwert fehlen
+    if not result["failure_rate"] and result["paced_reads"] < 0.95 * result["paced_expected"]:
+        problems.append(f"paced_reads: {result['paced_reads']} von {result['paced_expected']} erwartet")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Acquisition-Benchmark mit simuliertem I2C-Bus")
+    parser.add_argument("--sensors", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0, help="Sekunden pro Phase")
+    parser.add_argument("--interval", type=float, default=0.1, help="Abtastperiode der getakteten Phase")
+    parser.add_argument("--latency", type=float, default=0.0002, help="Sekunden pro Bustransaktion")
+    parser.add_argument("--measure-time", type=float, default=0.0, help="Wartezeit pro BME280-Messung")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--batch-size", type=int, default=ingest.BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", help="Baseline-JSON; Exit 1 bei Regression")
+    parser.add_argument("--save-baseline", help="Ergebnis als Baseline speichern")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--json", action="store_true", help="Nur JSON ausgeben")
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    print(json.dumps(result, indent=None if args.json else 2))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({metric: result[metric] for metric in METRICS}, f, indent=2)
+    problems = check(result, _load(args.baseline) if args.baseline else {}, args.tolerance)
+    for problem in problems:
+        print(f"[REGRESSION] {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+# bench/bench_compression.py
+#
+# Prüfstand für app/compression.py ohne DB: synthetische Reihen (Random
+# Walk, Tagesgang mit Rauschen, Sprünge, Grenzfälle) laufen durch den
+# Compressor, danach wird jede Reihe aus den Stützpunkten linear
+# interpoliert. Ausgegeben werden Kompressionsrate und größte Abweichung
+# pro Methode; Exit-Code 1, wenn irgendwo max|interp(Stützpunkte) − Rohwert|
+# die Toleranz überschreitet.
+#
+#   python -m bench.bench_compression
+#   python -m bench.bench_compression --samples 50000 --json
+
+import argparse
+import json
+import sys
+import numpy as np
+
+from app import compression
+
+EPSILON = 1e-9   # Rundungsreserve beim Vergleich mit der Toleranz
+
+
+def series(samples, seed):
+    """{Name: (Toleranzen, Werte float[n, 2])} für temperature/humidity."""
+    rng = np.random.default_rng(seed)
+    i = np.arange(samples)
+    day = np.sin(i / samples * 2 * np.pi)
+    steps = np.where((i // 500) % 2, 1.5, 0.0)
+    return {
+        "random_walk": ((0.05, 0.3), np.column_stack([
+            21 + np.cumsum(rng.normal(0, 0.03, samples)), 45 + np.cumsum(rng.normal(0, 0.2, samples)),
+        ])),
+        "daily_noise": ((0.05, 0.3), np.column_stack([
+            21 + 2 * day + rng.normal(0, 0.01, samples), 45 - 8 * day + rng.normal(0, 0.05, samples),
+        ])),
+        "steps": ((0.05, 0.3), np.column_stack([21 + steps, 45 - 2 * steps]) + rng.normal(0, 0.005, (samples, 2))),
+        "rounded": ((0.05, 0.3), np.column_stack([
+            np.round(21 + np.cumsum(rng.normal(0, 0.02, samples)), 2), np.round(45 + day, 2),
+        ])),
+        # Rohwert als Stützpunkt läge 0.125 daneben
+        "edge_case": ((0.1, 0.1), np.column_stack([[0, -0.1, 0.1, 0.1, 0.1], [0, 0, 0, 0, 0]]).astype(float)),
+    }
+
+
+def run_one(method, tolerances, values, period_ms):
+    compression.METHOD = method
+    compression.SENSOR_TOLERANCES = {"bench": {"temperature": tolerances[0], "humidity": tolerances[1]}}
+    compressor = compression.Compressor()
+    ts = np.arange(len(values), dtype=np.int64) * period_ms
+    knots = []
+    for t, row in zip(ts.tolist(), values.tolist()):
+        knots += compressor.add(("bench", t, *row))
+    knots += compressor.flush()
+    knot_ts = np.array([knot[1] for knot in knots])
+    knot_values = np.array([knot[2:] for knot in knots], dtype=np.float64)
+    errors = [
+        float(np.abs(np.interp(ts, knot_ts, knot_values[:, i]) - values[:, i]).max())
+        for i in range(values.shape[1])
+    ]
+    return {
+        "samples": len(values),
+        "stored": len(knots),
+        "ratio": round(len(values) / len(knots), 1),
+        "max_error": [round(e, 4) for e in errors],
+        "tolerance": list(tolerances),
+        "ok": all(e <= tol + EPSILON for e, tol in zip(errors, tolerances)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kompressionsrate und Rekonstruktionsfehler von app/compression.py")
+    parser.add_argument("--samples", type=int, default=17280, help="Messwerte pro Reihe (17280 = 1 Tag à 5 s)")
+    parser.add_argument("--period", type=int, default=5000, help="Abtastperiode in ms")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Nur JSON ausgeben")
+    args = parser.parse_args(argv)
+
+    result = {}
+    for method in ("deadband", "swinging_door"):
+        for name, (tolerances, values) in series(args.samples, args.seed).items():
+            result[f"{method}/{name}"] = run_one(method, tolerances, values, args.period)
+    print(json.dumps(result, indent=None if args.json else 2))
+
+    problems = [key for key, entry in result.items() if not entry["ok"]]
+    for key in problems:
+        print(f"[REGRESSION] {key}: Abweichung {result[key]['max_error']} > Toleranz {result[key]['tolerance']}",
+              file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+# bench/bench_http.py
+#
+# End-to-End-Benchmark der Web-Schicht gegen wachsende Datenmengen: pro
+# Datensatz (Standard 1, 30 und 365 Tage) wird eine DB mit bench.seed
+# erzeugt (und unter --data-dir wiederverwendet), dann jeder Endpunkt mit
+# fester Parallelität über den Flask-Test-Client oder einen lokalen
+# WSGI-Server abgefragt. Ergebnis pro Endpunkt und Datensatz: p50/p95/p99,
+# Durchsatz und Peak-RSS – als JSON (--out), das sich zwischen Versionen
+# vergleichen lässt (--compare). Vor den Messungen werden die Kanäle aus
+# --extra-channels angelegt (wie beim Bus-Scan eines BME280), damit auch
+# Zeilen mit mehr als temperature/humidity durch alle Formate laufen;
+# Endpunkte mit Fehlerantworten führen zu Exit-Code 1.
+#
+#   python -m bench.bench_http --days 1 30 365 --concurrency 4 --out results.json
+#   python -m bench.bench_http --days 30 --compare results.json
+
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from app import config, database, cache, export, create_app
+from bench import seed
+
+# Endpunkt-Name → Pfad; {start} = Beginn der Daten (Epoch-ms)
+ENDPOINTS = {
+    "index": "/",
+    "data": "/data",
+    "history_today": "/history",
+    "history_all": "/history?from={start}",
+    "export_csv_day": "/export?from={day}",
+    "export_parquet_day": "/export?format=parquet&from={day}",
+    "api_readings": "/api/readings",
+    "api_readings_parquet": "/api/readings?format=parquet",
+    "api_readings_npz": "/api/readings?format=npz",
+}
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+# --- Speicher ---
+def _reset_peak_rss():
+    """VmHWM zurücksetzen (Linux); sonst bleibt der Peak prozessweit."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# --- Clients ---
+class TestClientDriver:
+    """Ein Flask-Test-Client pro Thread."""
+
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def get(self, path):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        try:
+            response = client.get(path)
+            size = sum(len(chunk) for chunk in response.response)  # Streaming-Bodies vollständig lesen
+        except Exception as e:   # Test-Client reicht Fehler (auch beim Streamen) durch: als Serverfehler zählen
+            print(f"[ERROR] {path}: {e!r}", file=sys.stderr)
+            return 500, 0
+        status = response.status_code
+        response.close()
+        return status, size
+
+    def close(self):
+        pass
+
+
+class WSGIDriver:
+    """Lokaler Werkzeug-Server (threaded) und echte HTTP-Requests."""
+
+    def __init__(self, app):
+        from werkzeug.serving import make_server
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)   # kein Log pro Request
+        self.server = make_server("127.0.0.1", 0, app, threaded=True)
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def get(self, path):
+        try:
+            with urllib.request.urlopen(self.base + path) as response:
+                return response.status, len(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, 0
+
+    def close(self):
+        self.server.shutdown()
+
+
+# --- Messung ---
+def measure(driver, path, requests, concurrency, warmup):
+    for _ in range(warmup):
+        driver.get(path)
+    _reset_peak_rss()
+    latencies, errors, sizes = [], 0, 0
+
+    def one(_):
+        started = time.perf_counter()
+        status, size = driver.get(path)
+        return time.perf_counter() - started, status, size
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for latency, status, size in pool.map(one, range(requests)):
+            latencies.append(latency * 1000)
+            sizes += size
+            errors += status >= 400
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies), 2),
+        "throughput_rps": round(requests / elapsed, 1),
+        "avg_bytes": sizes // requests,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def prepare(args, days):
+    """Geseedete DB für `days` Tage (wiederverwendet, falls unter --data-dir vorhanden)."""
+    name = f"seed-{args.sensors}s-{args.interval:g}i-{days:g}d.db"
+    path = os.path.join(args.data_dir, name)
+    fresh = not os.path.exists(path)
+    database.pool.close()   # alte Verbindungen zeigen noch auf die vorige DB
+    config.DB_FILE = path
+    if fresh:
+        seed.seed(path, args.sensors, args.interval, days)
+    else:
+        database.init_db()
+    database.ensure_channels(args.extra_channels)   # Kanäle zusätzlicher Treiber (pressure, co2, ...)
+    with database.connection() as conn:
+        rows, start = conn.execute("SELECT COUNT(*), MIN(ts) FROM readings").fetchone()
+    cache.latest.clear()
+    cache.latest.warm()
+    return rows, start
+
+
+def run(args):
+    app = create_app()
+    endpoints = {name: path for name, path in ENDPOINTS.items() if not args.endpoints or name in args.endpoints}
+    if not export.available("parquet"):
+        endpoints.pop("export_parquet_day", None)
+        endpoints.pop("api_readings_parquet", None)
+
+    results = []
+    for days in args.days:
+        rows, start = prepare(args, days)
+        size = sum(
+            os.path.getsize(config.DB_FILE + suffix)
+            for suffix in ("", "-wal") if os.path.exists(config.DB_FILE + suffix)
+        )
+        driver = WSGIDriver(app) if args.wsgi else TestClientDriver(app)
+        try:
+            for name, path in endpoints.items():
+                path = path.format(start=start, day=database.now_ms() - 86_400_000)
+                result = measure(driver, path, args.requests, args.concurrency, args.warmup)
+                results.append({"days": days, "rows": rows, "db_mb": round(size / 2**20, 1), "endpoint": name, **result})
+                print(f"{days:>6g}d {name:<20} p50 {result['p50_ms']:>9.2f}  p95 {result['p95_ms']:>9.2f}  "
+                      f"p99 {result['p99_ms']:>9.2f} ms  {result['throughput_rps']:>8.1f} req/s  "
+                      f"RSS {result['peak_rss_mb']:>7.1f} MB", file=sys.stderr)
+        finally:
+            driver.close()
+    database.pool.close()
+    return {"meta": _meta(args), "results": results}
+
+
+def _meta(args):
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        "revision": revision,
+        "timestamp": database.now_ms(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "driver": "wsgi" if args.wsgi else "test_client",
+        "sensors": args.sensors,
+        "interval": args.interval,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+    }
+
+
+def compare(old, new):
+    """p95 und Durchsatz alt/neu pro (Tage, Endpunkt) ausgeben."""
+    previous = {(r["days"], r["endpoint"]): r for r in old["results"]}
+    print(f"{'Tage':>6} {'Endpunkt':<20} {'p95 alt':>9} {'p95 neu':>9} {'Δ':>7}  {'req/s alt':>9} {'req/s neu':>9}")
+    for r in new["results"]:
+        o = previous.get((r["days"], r["endpoint"]))
+        if not o:
+            continue
+        delta = (r["p95_ms"] / o["p95_ms"] - 1) if o["p95_ms"] else 0.0
+        print(f"{r['days']:>6g} {r['endpoint']:<20} {o['p95_ms']:>9.2f} {r['p95_ms']:>9.2f} {delta:>+7.0%}  "
+              f"{o['throughput_rps']:>9.1f} {r['throughput_rps']:>9.1f}")
+
+
+def check(result):
+    """Endpunkte mit Fehlerantworten (z.B. Exportformate bei zusätzlichen Kanälen)."""
+    return [
+        f"{r['days']:g}d {r['endpoint']}: {r['errors']} von {r['requests']} Requests fehlgeschlagen"
+        for r in result["results"] if r["errors"]
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP/Storage-Benchmark mit synthetischen Daten")
+    parser.add_argument("--days", type=float, nargs="+", default=[1, 30, 365])
+    parser.add_argument("--sensors", type=int, default=4)
+    parser.add_argument("--interval", type=float, default=60.0, help="Sekunden zwischen Messwerten beim Seeden")
+    parser.add_argument("--requests", type=int, default=50, help="Requests pro Endpunkt")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--endpoints", nargs="*", help=f"Auswahl aus {', '.join(ENDPOINTS)}")
+    parser.add_argument("--extra-channels", nargs="*", default=["pressure"],
+                        help="Zusätzliche Kanäle vor den Messungen anlegen (leer = nur temperature/humidity)")
+    parser.add_argument("--wsgi", action="store_true", help="Lokalen WSGI-Server statt Test-Client nutzen")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "bench-http"))
+    parser.add_argument("--out", help="Ergebnis-JSON schreiben")
+    parser.add_argument("--compare", help="Mit früherem Ergebnis-JSON vergleichen")
+    args = parser.parse_args(argv)
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    result = run(args)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), result)
+    problems = check(result)
+    for problem in problems:
+        print(f"[REGRESSION] {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+# bench/bench_stream_latency.py
+#
+# Latenz der Streaming-Profile mit einer lokal erzeugten Testquelle
+# (ffmpeg lavfi testsrc2 in Echtzeit, alternativ --source Datei/RTSP-URL).
+# ffmpeg läuft mit dem Kommando aus stream.build_command(), die Playlists
+# kommen über die echten Flask-Routen (/hls/...) mit Blocking Reload.
+#
+# Gemessen wird pro neuem Segment (ts) bzw. Teilsegment (ll), wie lange nach
+# dem Ende seines Medienzeitraums es in der Playlist auftaucht
+# (Verfügbarkeitslatenz). Dazu kommt der Abstand, den der Player zur
+# Live-Kante hält (ts: 3 Segmente wie liveSyncDurationCount, ll:
+# PART-HOLD-BACK) – die Summe ist die geschätzte Glass-to-Glass-Latenz
+# ohne Netzwerk und Decoder.
+#
+#   python -m bench.bench_stream_latency --profiles ts ll --duration 30
+
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from app import config, create_app, database, hls, stream
+
+_PART = re.compile(r'#EXT-X-PART:DURATION=([\d.]+),URI="[^"]*?(\d+)\.m4s"')
+_INDEPENDENT = re.compile(r'URI="[^"]*?(\d+)\.m4s",INDEPENDENT=YES')
+_HOLD_BACK = re.compile(r"PART-HOLD-BACK=([\d.]+)")
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def source_args(args):
+    if args.source:
+        return ["-re", "-i", args.source]
+    return ["-re", "-f", "lavfi", "-i", f"testsrc2=size={args.size}:rate={args.fps}"]
+
+
+def codec_args(args):
+    if args.copy:
+        return ["-c:v", "copy"]
+    # Kamera-ähnlich: H.264 mit 1 s GOP
+    return ["-c:v", "libx264", "-preset", "ultrafast", "-tune", "zerolatency",
+            "-g", str(args.fps), "-pix_fmt", "yuv420p"]
+
+
+def _chunks_ts(text):
+    """{Segment-Nr.: Dauer} aus einer TS-Playlist."""
+    sequence, segments, _ = hls.parse_playlist(text)
+    return {sequence + i: duration for i, (duration, _) in enumerate(segments)}
+
+
+def _chunks_ll(text):
+    """{Teilsegment-Nr.: Dauer} aus der LL-Playlist."""
+    return {int(number): float(duration) for duration, number in _PART.findall(text)}
+
+
+def run_profile(args, name):
+    output = tempfile.mkdtemp(prefix=f"bench-hls-{name}-")
+    config.OUTPUT_DIR = output
+    stream.STREAM_PROFILE = name
+    stream.supervisor = stream.Supervisor(output_dir=output)   # /hls/ folgt dem Profil der Hauptkamera
+    settings = stream.profile(name)
+    client = create_app().test_client()
+
+    cmd = stream.build_command(name, output, source_args(args), codec_args(args))
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    started = time.monotonic()
+    hls.cache()
+
+    durations, latencies, hold_back = {}, [], None
+    independent = set()   # Teilsegmente mit INDEPENDENT=YES (ll)
+    media_end = {}   # Chunk-Nr. → Ende seines Medienzeitraums (s seit Start)
+    per_segment = settings.get("parts_per_segment", 1)
+    next_chunk = 0
+    try:
+        while time.monotonic() - started < args.duration:
+            if process.poll() is not None:
+                raise RuntimeError(f"ffmpeg beendet (Exit {process.returncode}): {' '.join(cmd)}")
+            # Blocking Reload auf den nächsten Chunk
+            if name == "ll":
+                url = f"{stream.playlist_url(name)}?_HLS_msn={next_chunk // per_segment}&_HLS_part={next_chunk % per_segment}"
+            else:
+                url = f"{stream.playlist_url(name)}?_HLS_msn={next_chunk}"
+            response = client.get(url)
+            now = time.monotonic() - started
+            if response.status_code != 200:
+                time.sleep(0.05)
+                continue
+            text = response.get_data(as_text=True)
+            chunks = _chunks_ll(text) if name == "ll" else _chunks_ts(text)
+            independent.update(int(number) for number in _INDEPENDENT.findall(text))
+            if name == "ll" and hold_back is None:
+                match = _HOLD_BACK.search(text)
+                hold_back = float(match.group(1)) if match else None
+            for number in sorted(chunks):
+                if number in durations:
+                    continue
+                durations[number] = chunks[number]
+                media_end[number] = sum(durations.get(n, 0.0) for n in range(number + 1))
+                if number >= next_chunk and now >= args.warmup:
+                    latencies.append(now - media_end[number])
+            if chunks:
+                next_chunk = max(next_chunk, max(chunks) + 1)
+    finally:
+        process.terminate()
+        try:
+            process.wait(5)
+        except subprocess.TimeoutExpired:   # ffmpeg reagiert nicht immer auf SIGTERM
+            process.kill()
+            process.wait()
+        shutil.rmtree(output, ignore_errors=True)
+
+    if hold_back is None:
+        hold_back = 3 * settings.get("hls_time", 1)
+    # ffmpeg-Startzeit (Prozessstart, Encoder-Init) steckt als Konstante in allen Werten
+    offset = min(latencies, default=0.0)
+    result = {
+        "profile": name,
+        "chunks": len(latencies),
+        "availability_p50_s": round(percentile(latencies, 50), 3),
+        "availability_p95_s": round(percentile(latencies, 95), 3),
+        "availability_jitter_s": round(percentile(latencies, 95) - offset, 3),
+        "hold_back_s": round(hold_back, 3),
+        "estimated_latency_s": round(percentile(latencies, 50) + hold_back, 3),
+    }
+    if name == "ll":
+        result["independent_parts"] = len(independent)   # Einstiegspunkte für den Player
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HLS-Latenz der Stream-Profile mit lokaler Testquelle")
+    parser.add_argument("--profiles", nargs="+", default=list(stream.PROFILES))
+    parser.add_argument("--duration", type=float, default=20.0, help="Sekunden pro Profil")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Sekunden, die nicht mitzählen")
+    parser.add_argument("--source", help="Datei oder RTSP-URL statt testsrc2")
+    parser.add_argument("--copy", action="store_true", help="Video nicht neu kodieren (-c:v copy)")
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--fps", type=int, default=25)
+    parser.add_argument("--out", help="Ergebnis-JSON schreiben")
+    args = parser.parse_args(argv)
+    if not shutil.which("ffmpeg"):
+        sys.exit("ffmpeg nicht gefunden")
+
+    config.DB_FILE = os.path.join(tempfile.mkdtemp(prefix="bench-hls-"), "sensors.db")
+    database.init_db()
+    results = [run_profile(args, name) for name in args.profiles]
+    text = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# bench/seed.py
+#
+# Synthetische Messwerte für Benchmarks: füllt readings (und die Rollups)
+# einer frischen oder bestehenden DB mit N Sensoren, fester Abtastrate und
+# beliebig vielen Tagen Historie bis jetzt. Werte: Tagesgang + Rauschen.
+#
+#   python -m bench.seed --db /tmp/sensors.db --sensors 4 --interval 60 --days 365
+
+import argparse
+import os
+import time
+import numpy as np
+
+from app import config, database, rollups
+
+CHUNK_ROWS = 100_000   # Zeilen pro Transaktion
+
+
+def sensor_names(count):
+    """Sensor-IDs wie init_sensors() sie vergibt: CH0-0x76, CH0-0x77, CH1-0x76, ..."""
+    return [f"CH{i // 2}-{hex(0x76 + i % 2)}" for i in range(count)]
+
+
+def generate(sensors, interval, start_ms, end_ms, chunk_rows=CHUNK_ROWS, seed=1):
+    """Zeitlich sortierte Chunks [(sensor_id, ts_ms, temperature, humidity), ...]."""
+    rng = np.random.default_rng(seed)
+    names = sensor_names(sensors)
+    step = int(interval * 1000)
+    per_chunk = max(1, chunk_rows // sensors)
+    for first in range(start_ms, end_ms, step * per_chunk):
+        ts = np.arange(first, min(first + step * per_chunk, end_ms), step, dtype=np.int64)
+        day = np.sin(ts / 86_400_000 * 2 * np.pi)[:, None]
+        offsets = np.arange(sensors)[None, :]
+        temp = np.round(21 + 0.5 * offsets + 3 * day + rng.normal(0, 0.2, (len(ts), sensors)), 2)
+        hum = np.round(45 + offsets - 8 * day + rng.normal(0, 0.8, (len(ts), sensors)), 2)
+        yield [
+            (name, t, tv, hv)
+            for t, temps, hums in zip(ts.tolist(), temp.tolist(), hum.tolist())
+            for name, tv, hv in zip(names, temps, hums)
+        ]
+
+
+def seed(path=None, sensors=4, interval=60.0, days=1.0, end_ms=None, chunk_rows=CHUNK_ROWS):
+    """DB unter `path` (Standard: config.DB_FILE) befüllen; gibt die Zeilenzahl zurück."""
+    if path:
+        config.DB_FILE = path
+    database.init_db()
+    end_ms = end_ms or database.now_ms()
+    start_ms = end_ms - int(days * 86_400_000)
+    total = 0
+    started = time.monotonic()
+    with database.connection() as conn:
+        conn.execute("PRAGMA synchronous=OFF")   # nur für den Bulk-Load
+        try:
+            for rows in generate(sensors, interval, start_ms, end_ms, chunk_rows):
+                with conn:
+                    first = conn.execute("SELECT IFNULL(MAX(id), 0) FROM readings").fetchone()[0]
+                    conn.executemany(
+                        "INSERT INTO readings (sensor_id, ts, temperature, humidity) VALUES (?, ?, ?, ?)",
+                        rows
+                    )
+                    rollups.aggregate_ids(conn, first, first + len(rows))
+                total += len(rows)
+        finally:
+            conn.execute("PRAGMA synchronous=NORMAL")
+    print(f"[INFO] {total} Messwerte ({sensors} Sensoren, {days} Tage) in {time.monotonic() - started:.1f}s")
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="readings mit synthetischen Messwerten befüllen")
+    parser.add_argument("--db", required=True, help="Ziel-DB (wird angelegt)")
+    parser.add_argument("--sensors", type=int, default=4)
+    parser.add_argument("--interval", type=float, default=60.0, help="Sekunden zwischen Messwerten")
+    parser.add_argument("--days", type=float, default=1.0)
+    parser.add_argument("--fresh", action="store_true", help="Bestehende DB vorher löschen")
+    args = parser.parse_args(argv)
+    if args.fresh:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+    seed(args.db, args.sensors, args.interval, args.days)
+    database.pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+# gunicorn.conf.py – Web-Worker für den Produktionsmodus (siehe wsgi.py)
+
+import multiprocessing
+
+bind = "0.0.0.0:5000"
+workers = multiprocessing.cpu_count()
+# Threads statt sync-Worker: /events hält pro Client eine Verbindung offen
+worker_class = "gthread"
+threads = 8
+# Jeder Worker baut seine eigene IPC-Verbindung auf, daher kein preload_app
+preload_app = False
+timeout = 60
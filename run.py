@@ -1,38 +1,65 @@
-from app import create_app, sensors, database, stream
+from app import create_app, sensors, database, stream, ingest, migrate, cache, rollups, retention, ipc, metrics
 import threading
 import signal
 import sys
 
+# --- Einstellungen ---
+METRICS_PORT = 9101   # /metrics des Acquisition-Prozesses im Produktionsmodus
+
 app = create_app()
 
 def start_sensors():
     sensors.init_sensors()
     sensors.start_loop()
 
+def start_maintenance():
+    migrate.run()       # alte v1-Daten übernehmen
+    rollups.backfill()  # danach Rollups für Bestandsdaten nachrechnen
+    retention.start()   # alte Daten regelmäßig in kleinen Chunks löschen
+
 def start_stream():
     stream.start_hls_stream()
 
+def start_backend():
+    """DB, Ingest, Wartung, Sensorloop und Stream – alles, was Bus und ffmpeg besitzt."""
+    database.init_db()
+    cache.latest.warm()
+    ingest.start()
+
+    # Wartung (Migration, Rollup-Backfill) Thread
+    threading.Thread(target=start_maintenance, daemon=True).start()
+    # Sensorloop Thread
+    threading.Thread(target=start_sensors, daemon=True).start()
+    # Stream Thread
+    threading.Thread(target=start_stream, daemon=True).start()
+
 # --- Signal-Handler zum sauberen Beenden ---
 def handle_exit(sig, frame):
     print("[INFO] Beenden...")
+    if ipc.publisher:
+        ipc.publisher.stop()
     stream.stop_hls_stream()
+    retention.stop()
+    ingest.stop()  # gepufferte Messwerte noch schreiben
+    database.pool.close()
     sys.exit(0)
 
 signal.signal(signal.SIGINT, handle_exit)
 signal.signal(signal.SIGTERM, handle_exit)
 
 if __name__ == "__main__":
-    # DB initialisieren
-    database.init_db()
+    start_backend()
 
-    # Sensorloop Thread
-    sensor_thread = threading.Thread(target=start_sensors, daemon=True)
-    sensor_thread.start()
-
-    # Stream Thread
-    stream_thread = threading.Thread(target=start_stream, daemon=True)
-    stream_thread.start()
+    if "--daemon" in sys.argv:
+        # Produktionsmodus: nur Erfassung + Stream; die Web-Worker laufen
+        # getrennt (gunicorn -c gunicorn.conf.py wsgi:app) und holen sich
+        # die Live-Werte über ipc
+        ipc.serve()
+        metrics.serve(METRICS_PORT)
+        print("[INFO] Acquisition-Prozess läuft")
+        while True:
+            signal.pause()
 
     print("[INFO] Flask-App starten...")
-    # Flask läuft im Main-Thread, Debug=True optional
-    app.run(threaded=True, debug=True, host="0.0.0.0")
+    # Flask läuft im Main-Thread; ohne Reloader, sonst liefen Sensorloop und ffmpeg doppelt
+    app.run(threaded=True, debug=True, use_reloader=False, host="0.0.0.0")
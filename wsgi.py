@@ -0,0 +1,21 @@
+# wsgi.py
+#
+# Einstiegspunkt für die Web-Worker im Produktionsmodus:
+#
+#   python run.py --daemon                 # Erfassung, Stream, Ingest (genau einmal)
+#   gunicorn -c gunicorn.conf.py wsgi:app  # zustandslose Web-Worker
+#
+# Die Worker greifen weder auf den I2C-Bus noch auf ffmpeg zu; Live-Werte
+# kommen per ipc vom Acquisition-Prozess, alles andere aus SQLite.
+
+import sqlite3
+from app import create_app, cache, database, ipc
+
+app = create_app()
+database.load_channels()   # Kanäle (pressure, co2, ...) legt der Acquisition-Prozess an
+try:
+    cache.latest.warm()   # bis zum ersten Snapshot aus der DB
+except sqlite3.OperationalError as e:
+    # Worker vor dem ersten init_db() des Acquisition-Prozesses: Cache bleibt bis zum Snapshot leer
+    print(f"[WARN] Latest-Cache nicht vorbelegt: {e}")
+ipc.start_mirror()